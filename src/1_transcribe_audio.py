@@ -1,17 +1,11 @@
-import pickle
 import stable_whisper
 
+from regroup import RegroupConfig, WordArrays
+from srt_cues import write_srt
+from transcript_store import TranscriptStore
 
-result1 = None
-
-
-# open result1 use pickle
-try:
-    with open('result1.pickle', 'rb') as handle:
-        result1 = pickle.load(handle)
-except FileNotFoundError:
-    print("File not found")
 
+audio_file = '20250604_edited.wav'
 
 initial_prompt = '''
 魔物獵人,
@@ -20,39 +14,34 @@ initial_prompt = '''
 
 '''
 
-if (result1 is None):
+# 快取以音檔內容 + 模型/提示詞/參數為鍵，不會誤用其他音檔的結果
+store = TranscriptStore()
+options = {'regroup': False, 'vad': False}
+cache_key = store.key(audio_file, 'large-v2', initial_prompt, **options)
+stored = store.load(cache_key)
+
+if (stored is None):
+    print("Transcript cache not found")
     model = stable_whisper.load_model('large-v2')
     result1 = model.transcribe(
-        '20250604_edited.wav',  regroup=False, vad=False, initial_prompt=initial_prompt)
-    (
-        result1
-
-        .split_by_punctuation([('.', ' '), '。', '?', '？', ',', '，', (',', ' '), '、'])
-
-
-
-        .split_by_gap(.3)
-
-        .split_by_punctuation([('.', ' '), '。', '?', '？'])
-    )
-    # save result1 use pickle
-
-else:
-    result1.reset()
-    result1 = (
-        result1
-
-        # .split_by_punctuation([('.', ' '), ' ', '。', '?', '？', ',', '，', (',', ' '), '、'])
-        .split_by_gap(.3)
-
-
-
-        .split_by_punctuation([('.', ' '), '。', '?', '？'])
-    )
-    print(result1, "is result1 after reset and split_by_punctuation and split_by_gap and merge_by_gap and split_by_punctuation")
-
-
-result1.to_srt_vtt('fullvoicev23.srt',  segment_level=True, word_level=False)
-
-with open('result1.pickle', 'wb') as handle:
-    pickle.dump(result1, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        audio_file, initial_prompt=initial_prompt, **options)
+    # save the unregrouped result to the transcript store
+    stored = store.save(cache_key, result1, {'audio': audio_file, 'model': 'large-v2',
+                                             'initial_prompt': initial_prompt, 'options': options})
+
+# 以字詞陣列重新分段（標點 + 間隔 0.3 秒），快取與新辨識結果的分段方式相同
+regroup = RegroupConfig(
+    max_gap=.3,
+    punctuation=(('.', ' '), '。', '?', '？', ',', '，', (',', ' '), '、'),
+    # max_chars=30,
+    # max_duration=7.0,
+)
+words = WordArrays.from_stored(stored)
+stored.close()
+table = words.regroup(regroup)
+print(f"{len(table)} cues after regrouping {len(words)} words")
+
+
+write_srt('fullvoicev23.srt', table)
+# word-level timestamps for re-timing the LLM split in step 5
+words.timeline().save('fullvoicev23_words.json')
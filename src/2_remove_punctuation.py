@@ -1,25 +1,18 @@
-import re
+from srt_cues import read_srt, write_srt
+from text_normalize import Normalizer
 
 
-def is_timestamp_line(line):
-    # Check if the line follows the SRT timestamp format
-    return bool(re.match(r'\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}', line))
+def remove_commas_from_subtitle_text(input_file_path, output_file_path, normalizer=None):
+    try:
+        table = read_srt(input_file_path)
 
+        # Only cue text is touched; timestamps live in the timing arrays.
+        # The default normalizer strips ',' and '、' in one translate pass;
+        # pass e.g. Normalizer(width="half", collapse_whitespace=True) for more.
+        normalizer = normalizer or Normalizer()
+        table.texts = [normalizer(text) for text in table.texts]
 
-def remove_commas_from_subtitle_text(input_file_path, output_file_path):
-    try:
-        with open(input_file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        modified_lines = []
-        for line in lines:
-            # Only remove commas from lines that do not contain timestamps
-            if not is_timestamp_line(line):
-                line = line.replace(',', '').replace('、', '')
-            modified_lines.append(line)
-
-        with open(output_file_path, 'w', encoding='utf-8') as file:
-            file.writelines(modified_lines)
+        write_srt(output_file_path, table)
 
         print(f"Processed file saved as {output_file_path}")
     except Exception as e:
@@ -1,5 +1,5 @@
-import re
-from datetime import datetime, timedelta
+from srt_cues import parse_srt, format_srt
+from timing import close_gaps
 
 
 def read_srt_file(filename):
@@ -12,35 +12,11 @@ def write_srt_file(filename, content):
         file.write(content)
 
 
-def parse_time(s):
-    return datetime.strptime(s, '%H:%M:%S,%f')
-
-
-def time_to_str(d):
-    return d.strftime('%H:%M:%S,%f')[:-3]
-
-
 def process_subtitles(content):
-    subtitles = content.split('\n\n')
-    for i in range(len(subtitles) - 1):
-        current_sub = subtitles[i]
-        next_sub = subtitles[i + 1]
-        current_sub_lines = current_sub.split('\n')
-        next_sub_lines = next_sub.split('\n')
-        if len(current_sub_lines) < 3 or len(next_sub_lines) < 3:
-            continue
-
-        current_end_time_str = current_sub_lines[1].split(' --> ')[1]
-        next_start_time_str = next_sub_lines[1].split(' --> ')[0]
-
-        current_end_time = parse_time(current_end_time_str)
-        next_start_time = parse_time(next_start_time_str)
-        if (next_start_time - current_end_time) < timedelta(seconds=0.5):
-            # Set current end time to the next start time directly
-            current_sub_lines[1] = current_sub_lines[1].split(
-                ' --> ')[0] + ' --> ' + next_start_time_str
-            subtitles[i] = '\n'.join(current_sub_lines)
-    return '\n\n'.join(subtitles)
+    table = parse_srt(content)
+    # Set current end time to the next start time directly when the gap < 0.5s
+    table.ends = close_gaps(table.starts, table.ends, 500)
+    return format_srt(table)
 
 
 # filename = input("Enter the filename of the .srt file: ")
@@ -1,35 +1,15 @@
-import re
-import time
-from datetime import datetime
+import logging
+import sys
+from pathlib import Path
 
-# 錯誤-正確詞彙對照字典
-correction_dict = {
-    "好鬼": "豪鬼",
-    "幻團護石": "飯糰護石",
-    "索恩龍": "鎖刃龍",
-    "斐迪南": "費迪南",
-    "天譴砂原": "天塹沙原",
-    "暑假": "蘇加",
-    "精神斗首": "精神抖擻",
-    "鬥技大揮任務": "鬥技大會任務",
-    "而塞": "耳塞",
-    "很擋路的前螢幕視窗": "全螢幕視窗",
-    "參點": "餐點",
-    "licon": "ICON",
-    "習俗修正": "係數修正",
-    "眼咒的攻擊": "演奏的攻擊",
-    "狩制響玉": "設置響玉",
-    "疊加咒擊": "疊加奏擊",
-    "大小晶": "大小金",
-    "熔垃穿甲彈": "龍熱穿甲彈",
-    "黑石龍": "黑蝕龍",
-    "黃雷龍": "煌雷龍",
-    "圓樟": "獄焰鱆",
-    "洞縫龍": "凍峰龍",
-    "進化蜜蟲": "淨化蜜蟲",
-    "鬥雞大會": "鬥技大會",
-    "赫元獸": "赫猿獸"
-}
+from checkpoint import CheckpointJournal
+from glossary import DEFAULT_GLOSSARY_DIR, GlossaryStore, project_glossary_paths
+from instrumentation import Tracer, log, setup_logging
+from srt_cues import CueTable, parse_srt, format_srt
+from stage_manifest import data_digest
+
+# 錯誤-正確詞彙對照表改放在外部詞彙檔 (glossaries/*.tsv|json|yaml)
+DEFAULT_GLOSSARY = DEFAULT_GLOSSARY_DIR / "monster_hunter_wilds.tsv"
 
 def read_srt_file(filename):
     """讀取 SRT 檔案"""
@@ -42,138 +22,117 @@ def write_srt_file(filename, content):
         file.write(content)
 
 def parse_srt_blocks(content):
-    """解析 SRT 內容為區塊列表"""
-    blocks = re.split(r'\n\n+', content.strip())
-    parsed_blocks = []
-    
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) >= 3:
-            index = lines[0]
-            timestamp = lines[1]
-            text = '\n'.join(lines[2:])
-            parsed_blocks.append({
-                'index': index,
-                'timestamp': timestamp,
-                'text': text,
-                'original_block': block
-            })
-        else:
-            parsed_blocks.append({
-                'index': '',
-                'timestamp': '',
-                'text': '',
-                'original_block': block
-            })
-    
-    return parsed_blocks
+    """解析 SRT 內容為 CueTable"""
+    return parse_srt(content)
 
-def apply_corrections(text):
-    """使用字典直接取代錯誤詞彙"""
-    corrected_text = text
-    corrections_made = []
-    
-    for wrong_term, correct_term in correction_dict.items():
-        if wrong_term in corrected_text:
-            corrected_text = corrected_text.replace(wrong_term, correct_term)
-            corrections_made.append(f"{wrong_term} -> {correct_term}")
-    
-    return corrected_text, corrections_made
+def load_glossary_store(input_filename, extra_glossaries=()):
+    """預設詞彙檔 + 指定詞彙檔 + 字幕所在資料夾的 glossary.* (後者覆蓋前者)"""
+    base = [DEFAULT_GLOSSARY, *extra_glossaries]
+    return GlossaryStore(project_glossary_paths(base, Path(input_filename).resolve().parent))
 
-def write_partial_srt(blocks, filename):
-    """即時寫入部分 SRT 內容到檔案"""
-    result_blocks = []
-    
-    for block in blocks:
-        if block['text']:
-            result_blocks.append(f"{block['index']}\n{block['timestamp']}\n{block['text']}")
-        else:
-            result_blocks.append(block['original_block'])
-    
-    content = '\n\n'.join(result_blocks)
-    write_srt_file(filename, content)
+def apply_corrections(text, matcher):
+    """單次掃描取代錯誤詞彙，回傳 (修正後文字, TermMatch 列表)"""
+    return matcher.correct(text)
+
+def partial_srt(table, count):
+    """前 count 個區塊的 SRT 內容（檢查點快照用）"""
+    partial = CueTable(table.starts[:count], table.ends[:count], table.texts[:count], table.ids[:count])
+    return format_srt(partial)
 
-def process_srt_with_corrections(blocks, output_filename=None):
-    """使用字典取代方式處理 SRT 區塊"""
-    processed_blocks = []
+def process_srt_with_corrections(table, matcher, output_filename=None, renumber=False):
+    """使用字典取代方式處理 SRT 區塊（直接修改 table.texts）
+
+    指定 output_filename 時，每個處理過的區塊 (文字與修正次數) 追加記錄到
+    <output>.journal，並定期以原子方式寫入輸出檔快照；中斷後重新執行會從紀錄接續，
+    已完成區塊的修正次數也會計入總數。完成時寫入一次最終輸出 (renumber: 重新編號)。
+    """
     total_corrections = 0
+    texts = table.texts
+    start = 0
+    journal = None
+    if output_filename:
+        # 紀錄格式為 [文字, 修正次數]；"record" 讓舊格式 (只有文字) 的紀錄不被接續
+        key = data_digest({"stage": "terms", "record": "text+count", "texts": texts, "glossary": matcher.replacements})
+        journal = CheckpointJournal(Path(output_filename), key)
+        if journal.done:
+            for i, (text, count) in journal.done.items():
+                texts[i] = text
+                total_corrections += count
+            start = max(journal.done) + 1
+            log.info(f"從檢查點接續: 已處理 {start} 個區塊")
     
-    for i, block in enumerate(blocks):
-        print(f"處理第 {i+1}/{len(blocks)} 個區塊")
-        
-        if not block['text']:
-            processed_blocks.append(block)
-            continue
-        
-        # 直接使用字典取代
-        corrected_text, corrections_made = apply_corrections(block['text'])
-        
-        if corrections_made:
-            print(f"  修正: {', '.join(corrections_made)}")
-            block['text'] = corrected_text
-            total_corrections += len(corrections_made)
-        else:
-            print(f"  無需修正")
-        
-        processed_blocks.append(block)
-        
-        # 即時寫入檔案
-        if output_filename and (i + 1) % 10 == 0:  # 每 10 個區塊寫入一次
-            write_partial_srt(processed_blocks, output_filename)
-            print(f"已更新檔案: {output_filename} (處理到第 {i+1} 個區塊)")
-    
-    print(f"總共進行了 {total_corrections} 次修正")
-    return processed_blocks
-
-def rebuild_srt_content(blocks):
-    """重建 SRT 內容並重新編號"""
-    result_blocks = []
-    valid_index = 1
+    # 逐區塊訊息只在 DEBUG 等級輸出，避免大量 stdout 拖慢處理
+    verbose = log.isEnabledFor(logging.DEBUG)
     
-    for block in blocks:
-        if block['text']:
-            result_blocks.append(f"{valid_index}\n{block['timestamp']}\n{block['text']}")
-            valid_index += 1
-        else:
-            original = block['original_block']
-            if re.match(r'^\d+_\d+', original):
-                continue
-            else:
-                result_blocks.append(original)
+    try:
+        for i in range(start, len(texts)):
+            text = texts[i]
+            count = 0
+            if text:
+                # 直接使用字典取代
+                corrected_text, corrections_made = apply_corrections(text, matcher)
+            
+                if corrections_made:
+                    if verbose:
+                        log.debug(f"第 {i+1}/{len(texts)} 個區塊 修正: {', '.join(f'{m.wrong} -> {m.correct} @{m.start}' for m in corrections_made)}")
+                    texts[i] = corrected_text
+                    count = len(corrections_made)
+                    total_corrections += count
+        
+            # 只追加本區塊的結果，快照依時間間隔寫入
+            if journal is not None:
+                journal.append(i, [texts[i], count])
+                journal.maybe_snapshot(lambda: partial_srt(table, i + 1))
+    finally:
+        if journal is not None:
+            journal.close()
     
-    return '\n\n'.join(result_blocks)
+    if journal is not None:
+        journal.finish(format_srt(table, renumber=renumber))
+    log.info(f"總共進行了 {total_corrections} 次修正")
+    return table
 
 def main():
     """主程式"""
+    setup_logging()
+    # SUBTITLE_TRACE / SUBTITLE_METRICS / SUBTITLE_PROFILE 環境變數可開啟效能紀錄
+    tracer = Tracer.from_env()
     input_filename = input("請輸入要處理的 SRT 檔案名稱: ").strip()
     if not input_filename:
         input_filename = "fullvoice23_prunedpt2.srt"
     
     try:
         # 讀取 SRT 檔案
-        print(f"讀取檔案: {input_filename}")
+        log.info(f"讀取檔案: {input_filename}")
         content = read_srt_file(input_filename)
         
+        # 載入詞彙檔（已編譯的比對器會快取於磁碟）
+        store = load_glossary_store(input_filename, sys.argv[1:])
+        matcher = store.matcher()
+        log.info(f"載入詞彙: {len(matcher)} 筆 ({', '.join(str(p) for p in store.paths)})")
+        
         # 解析 SRT 區塊
-        blocks = parse_srt_blocks(content)
-        print(f"找到 {len(blocks)} 個字幕區塊")
+        table = parse_srt_blocks(content)
+        log.info(f"找到 {len(table)} 個字幕區塊")
         
         # 儲存結果檔案名稱
         output_filename = f"fixed_terms_{input_filename}"
         
-        # 使用字典取代處理
-        processed_blocks = process_srt_with_corrections(blocks, output_filename=output_filename)
-        
-        # 最終確保檔案完整性並重新編號
-        processed_content = rebuild_srt_content(processed_blocks)
-        write_srt_file(output_filename, processed_content)
+        # 使用字典取代處理；完成時以原子方式寫入重新編號的輸出檔 (只寫一次)
+        with tracer.stage("correct_terms") as stats:
+            processed_table = process_srt_with_corrections(
+                table, matcher, output_filename=output_filename, renumber=True
+            )
+            stats.cues = len(processed_table)
         
-        print(f"處理完成！已儲存至: {output_filename}")
+        log.info(f"處理完成！已儲存至: {output_filename}")
         
     except FileNotFoundError:
-        print(f"錯誤: 找不到檔案 {input_filename}")
+        log.error(f"錯誤: 找不到檔案 {input_filename}")
     except Exception as e:
-        print(f"處理過程中發生錯誤: {e}")
+        log.error(f"處理過程中發生錯誤: {e}")
+    finally:
+        tracer.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
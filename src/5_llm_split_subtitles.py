@@ -1,8 +1,15 @@
-import re
-import requests
-from datetime import datetime, timedelta
-import math
-import time
+import logging
+import os
+from pathlib import Path
+
+from checkpoint import CheckpointJournal
+from instrumentation import Tracer, log, setup_logging
+from llm_cache import PunctuationCache
+from llm_client import LLMClient
+from llm_split import LLM_MIN_CHARS, split_cue
+from srt_cues import Cue, CueTable, parse_srt, format_srt
+from stage_manifest import data_digest
+from word_align import WordTimeline
 
 # SRT 讀取
 
@@ -14,129 +21,113 @@ def write_srt_file(filename, content):
     with open(filename, 'w', encoding='utf-8') as file:
         file.write(content)
 
-# 時間字串轉 datetime
-
-def parse_time(s):
-    return datetime.strptime(s, '%H:%M:%S,%f')
-
-def time_to_str(d):
-    return d.strftime('%H:%M:%S,%f')[:-3]
+# 呼叫本地 LLM 加入標點符號 (共用連線、批次、併發)
 
-# 呼叫本地 LLM 加入標點符號
+def call_llm_add_punctuation(text, client=None):
+    if client is None:
+        with LLMClient() as client:
+            return client.punctuate(text)
+    return client.punctuate(text)
 
-def call_llm_add_punctuation(text):
-    url = 'http://127.0.0.1:1234/v1/chat/completions'
-    headers = {'Content-Type': 'application/json'}
-    system_prompt = (
-        '你是一個字幕標點符號助手。請為下列字幕文本加入適當的標點符號，包括句號、逗號、問號、驚嘆號等。'
-        '保持原文內容不變，只加入標點符號。不要分段或換行，只在一行內加入標點符號。'
-        '只回傳加了標點符號的文本，不要加註解。'
-    )
-    data = {
-        "model": "gemma-3-12b-it-gat",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text}
-        ],
-        "temperature": 0.2
-    }
-    for _ in range(3):  # 最多重試3次
-        try:
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content'].strip()
-        except Exception as e:
-            time.sleep(1)
-    return text  # 若失敗則回傳原文
-
-# 根據標點符號分段
+# 主處理流程
 
-def split_by_punctuation(text):
-    """只根據標點符號將文本分段，並移除分段標點符號"""
-    # 定義分段用的標點符號
-    split_punctuation = ['。', '！', '？']  # 只有這些標點符號會分段
+def process_srt_lines(content, client=None, timeline=None, tracer=None, output_filename=None, window=256, min_chars=LLM_MIN_CHARS):
+    """超過 min_chars 字的長字幕每 window 句一組送 LLM（門檻可用 sweep.py 調整）；指定 output_filename 時逐句追加檢查點紀錄，
+    中斷後重新執行只處理尚未完成的字幕。"""
+    table = parse_srt(content)
+    if timeline is not None:
+        # 一次算出每個字幕區塊對應的字詞範圍
+        word_lo, word_hi = timeline.cue_ranges(table.starts, table.ends)
+    texts = [text.replace('\n', ' ') for text in table.texts]
     
-    segments = []
-    current_segment = ""
+    own_client = client is None
+    client = client or LLMClient(cache=PunctuationCache(), tracer=tracer)
     
-    for char in text:
-        current_segment += char
-        
-        # 檢查是否遇到分段標點符號
-        if char in split_punctuation:
-            # 移除標點符號後加入分段
-            segment = current_segment[:-1].strip()  # 移除最後的標點符號
-            if segment:  # 只添加非空的分段
-                segments.append(segment)
-            current_segment = ""
+    # 檢查點：已完成的字幕直接沿用分段結果
+    journal = None
+    pieces_by_index = {}
+    if output_filename:
+        key = data_digest({
+            "stage": "llm_split",
+            "content": content,
+            "model": client.model,
+            "prompt": client.system_prompt,
+            "temperature": client.temperature,
+            "min_chars": min_chars,
+            "timeline": [timeline.starts.tolist(), timeline.ends.tolist(), timeline.words] if timeline is not None else None,
+        })
+        journal = CheckpointJournal(Path(output_filename), key)
+        pieces_by_index = {i: [Cue(*piece) for piece in pieces] for i, pieces in journal.done.items()}
+        if pieces_by_index:
+            log.info(f"從檢查點接續: 已處理 {len(pieces_by_index)} 句")
     
-    # 處理剩餘的文本
-    if current_segment.strip():
-        segments.append(current_segment.strip())
+    # 快照只序列化上次之後新增的字幕，先前的部分直接沿用（避免每次重排整份表格）
+    rendered = []
+    rendered_upto = 0
     
-    # 過濾空白段落
-    segments = [seg for seg in segments if seg.strip()]
+    def render(upto):
+        nonlocal rendered_upto
+        cues = []
+        for i in range(rendered_upto, upto + 1):
+            cues.extend(pieces_by_index.get(i, [table[i]]))
+        if cues:
+            rendered.append(format_srt(CueTable.from_cues(cues)))
+        rendered_upto = max(rendered_upto, upto + 1)
+        return "\n".join(rendered)
     
-    return segments
-
-# 根據詞數調整時間戳
-
-def split_time(start, end, n):
-    start_dt = parse_time(start)
-    end_dt = parse_time(end)
-    total = (end_dt - start_dt).total_seconds()
-    if n == 1:
-        return [(start, end)]
-    step = total / n
-    times = []
-    for i in range(n):
-        seg_start = start_dt + timedelta(seconds=step * i)
-        seg_end = start_dt + timedelta(seconds=step * (i + 1)) if i < n - 1 else end_dt
-        times.append((time_to_str(seg_start), time_to_str(seg_end)))
-    return times
-
-# 主處理流程
-
-def process_srt_lines(content):
-    blocks = re.split(r'\n\n+', content.strip())
-    new_blocks = []
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) < 3:
-            new_blocks.append(block)
-            continue
-        idx, time_line, *text_lines = lines
-        text = ' '.join(text_lines)
-        
-        if len(text) > 16:
-            # 步驟1: 用 LLM 加入標點符號
-            punctuated_text = call_llm_add_punctuation(text)
-            print(f"原文: {text}")
-            print(f"加標點: {punctuated_text}")
-            
-            # 步驟2: 根據標點符號分段
-            segments = split_by_punctuation(punctuated_text)
-            print(f"分段結果: {segments}")
-            
-            if len(segments) > 1:
-                # 依分割數調整時間戳
-                start, end = time_line.split(' --> ')
-                times = split_time(start, end, len(segments))
+    # 逐句訊息只在 DEBUG 等級輸出
+    verbose = log.isEnabledFor(logging.DEBUG)
+    
+    # 步驟1: 把長字幕送給 LLM 加入標點符號（批次 + 併發，結果維持原順序）
+    long_idx = [i for i, text in enumerate(texts) if len(text) > min_chars and i not in pieces_by_index]
+    # 已處理過的相同文字直接從本地快取取得，不再呼叫 LLM
+    try:
+        for w in range(0, len(long_idx), window):
+            chunk = long_idx[w:w + window]
+            for i, punctuated in zip(chunk, client.punctuate_many([texts[i] for i in chunk])):
+                if verbose:
+                    log.debug(f"原文: {texts[i]}")
+                    log.debug(f"加標點: {punctuated}")
                 
-                for i, (seg, (seg_start, seg_end)) in enumerate(zip(segments, times)):
-                    new_blocks.append(f"{idx}_{i+1}\n{seg_start} --> {seg_end}\n{seg}")
-            else:
-                # 如果沒有分段，保持原樣
-                new_blocks.append(block)
-        else:
-            new_blocks.append(block)
-    return '\n\n'.join(new_blocks)
+                # 步驟2: 根據標點符號分段，依每段對應的字詞取得真實起訖時間
+                # （沒有逐字資料時平均切分；沒有分段則保持原樣）
+                lo, hi = (int(word_lo[i]), int(word_hi[i])) if timeline is not None else (0, 0)
+                pieces = split_cue(table[i], punctuated, timeline, lo, hi)
+                if verbose:
+                    log.debug(f"分段結果: {[piece.text for piece in pieces]}")
+                pieces_by_index[i] = pieces
+                if journal is not None:
+                    journal.append(i, [list(piece) for piece in pieces])
+            if journal is not None:
+                journal.maybe_snapshot(lambda: render(chunk[-1]))
+        if client.cache is not None:
+            log.info(f"LLM 快取: {client.cache.stats()}")
+            if tracer is not None:
+                tracer.record_cache("llm_punctuation", client.cache.hits, client.cache.misses)
+    finally:
+        if journal is not None:
+            journal.close()
+        if own_client:
+            client.close()
+            client.cache.close()
+    
+    processed_content = render(len(table) - 1)
+    if journal is not None:
+        journal.finish(processed_content)
+    return processed_content
 
 if __name__ == '__main__':
+    setup_logging()
+    # SUBTITLE_TRACE / SUBTITLE_METRICS / SUBTITLE_PROFILE 環境變數可開啟效能紀錄
+    tracer = Tracer.from_env()
     filename = 'fixed_terms_processed_fullvoice23_prunedpt2 copy.srt'
+    # 步驟1 產生的逐字時間戳（若存在則用來精準切分時間）
+    words_filename = 'fullvoicev23_words.json'
+    timeline = WordTimeline.load(words_filename) if os.path.exists(words_filename) else None
     content = read_srt_file(filename)
-    processed_content = process_srt_lines(content)
     output_filename = 'llm_split_' + filename
-    write_srt_file(output_filename, processed_content)
-    print(f"已儲存分割字幕檔：{output_filename}") 
\ No newline at end of file
+    # 結果逐句記錄於檢查點，完成時以原子方式寫入輸出檔
+    with tracer.stage("llm_split"):
+        process_srt_lines(content, timeline=timeline, tracer=tracer, output_filename=output_filename)
+    tracer.close()
+    log.info(f"已儲存分割字幕檔：{output_filename}") 
\ No newline at end of file
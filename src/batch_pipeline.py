@@ -0,0 +1,351 @@
+"""batch_pipeline.py
+Batch / folder mode: run the whole pipeline over a season of episodes.
+
+Usage
+-----
+python batch_pipeline.py \
+    --input season2/ "extras/*.wav" \
+    --output-dir subs/ \
+    --transcribe-workers 2 --text-workers 6 \
+    --glossary glossaries/monster_hunter_wilds.tsv --llm-split
+
+Every audio file becomes a job.  Jobs flow through two process pools at
+once: transcription workers (one model each, loaded on first use) and
+text-stage workers running :func:`pipeline_all_in_one.run_text_stages`.
+A job enters the text pool as soon as its transcription finishes, so
+CPU-bound text processing of episode *n* overlaps transcription of
+episode *n + 1*.
+
+Progress is appended to a JSONL journal (``batch_journal.jsonl``).  After
+a crash the same command resumes: finished jobs are skipped and jobs that
+were already transcribed go straight to the text stages.  A job is
+identified by the audio path, size, mtime and the batch settings, so a
+changed file or option reruns it.
+
+At the end a throughput summary in audio-hours per wall-hour is printed.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+import wave
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from glossary import GlossaryStore, project_glossary_paths
+from llm_cache import PunctuationCache
+from llm_client import LLMClient
+from pipeline_all_in_one import (
+    add_stage_arguments,
+    normalizer_from_args,
+    raw_srt_path_for,
+    regroup_from_args,
+    run_text_stages,
+    transcribe_audio,
+    words_path_for,
+)
+from regroup import RegroupConfig
+from stage_manifest import data_digest
+from term_matcher import TermMatcher
+from transcript_store import TranscriptStore, transcript_key
+from word_align import WordTimeline
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".aac", ".mp4", ".mkv")
+JOURNAL_NAME = "batch_journal.jsonl"
+
+# -------------------------
+# Job discovery
+# -------------------------
+
+class BatchJob(NamedTuple):
+    job_id: str
+    audio: Path
+    out_dir: Path
+
+    @property
+    def raw_srt(self) -> Path:
+        return raw_srt_path_for(self.audio, self.out_dir)
+
+    @property
+    def words_path(self) -> Path:
+        return words_path_for(self.audio, self.out_dir)
+
+    @property
+    def final_srt(self) -> Path:
+        return self.out_dir / f"{self.audio.stem}_final.srt"
+
+
+def find_audio(inputs: Sequence[str]) -> List[Path]:
+    """Expand directories and glob patterns into a sorted, de-duplicated file list."""
+    found: Dict[Path, None] = {}
+    for item in inputs:
+        path = Path(item).expanduser()
+        if path.is_dir():
+            candidates = sorted(path.iterdir())
+        else:
+            candidates = sorted(Path(p) for p in glob.glob(str(path), recursive=True))
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in AUDIO_EXTENSIONS:
+                found[candidate.resolve()] = None
+    return list(found)
+
+
+def make_jobs(audio_files: Sequence[Path], out_dir: Optional[Path], settings: Dict[str, Any]) -> List[BatchJob]:
+    jobs = []
+    for audio in audio_files:
+        st = audio.stat()
+        job_id = data_digest({"audio": str(audio), "size": st.st_size, "mtime": st.st_mtime_ns, "settings": settings})
+        jobs.append(BatchJob(job_id, audio, Path(out_dir) if out_dir is not None else audio.parent))
+    return jobs
+
+
+def audio_duration(audio: Path, words_path: Path) -> float:
+    """Length of *audio* in seconds; non-WAV files fall back to the last word end."""
+    if audio.suffix.lower() == ".wav":
+        try:
+            with wave.open(str(audio), "rb") as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    timeline = WordTimeline.load(words_path)
+    return float(timeline.ends.max()) / 1000 if len(timeline.ends) else 0.0
+
+# -------------------------
+# Job journal
+# -------------------------
+
+class JobJournal:
+    """Append-only JSONL log of job state changes; the last event per job wins."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self.state[event["job"]] = event
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def status(self, job_id: str) -> Optional[str]:
+        return self.state.get(job_id, {}).get("status")
+
+    def append(self, job: BatchJob, status: str, **fields: Any) -> None:
+        event = {"job": job.job_id, "audio": str(job.audio), "status": status, "time": time.time(), **fields}
+        self.state[job.job_id] = event
+        self._f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+# -------------------------
+# Workers
+# -------------------------
+
+_MODEL = None
+
+
+def _init_transcriber(threads: int) -> None:
+    import torch  # type: ignore
+
+    torch.set_num_threads(threads)
+
+
+def _transcribe_job(
+    job: BatchJob,
+    store_root: Path,
+    initial_prompt: str,
+    model_size: str,
+    device: Optional[str],
+    regroup: Optional[RegroupConfig] = None,
+) -> float:
+    """Transcribe one file; the model is only loaded once a cache miss needs it."""
+    global _MODEL
+    store = TranscriptStore(store_root)
+    key = transcript_key(store, job.audio, initial_prompt, model_size)
+    stored = store.load(key)
+    if stored is not None:
+        stored.close()
+    elif _MODEL is None:
+        import stable_whisper  # type: ignore
+
+        _MODEL = stable_whisper.load_model(model_size, device=device)
+    job.out_dir.mkdir(parents=True, exist_ok=True)
+    transcribe_audio(job.audio, store, initial_prompt, model_size, key=key, model=_MODEL, out_dir=job.out_dir, regroup=regroup)
+    return audio_duration(job.audio, job.words_path)
+
+
+def _text_job(job: BatchJob, matcher: Optional[TermMatcher], stage_options: Dict[str, Any]) -> int:
+    options = dict(stage_options)
+    llm_url = options.pop("llm_url")
+    client = LLMClient(url=llm_url, cache=PunctuationCache()) if llm_url else None
+    timeline = WordTimeline.load(job.words_path) if client is not None and job.words_path.exists() else None
+    try:
+        return run_text_stages(job.raw_srt, job.final_srt, matcher=matcher, client=client, timeline=timeline, **options)
+    finally:
+        if client is not None:
+            client.close()
+            client.cache.close()
+
+# -------------------------
+# Scheduler
+# -------------------------
+
+def run_batch(
+    jobs: Sequence[BatchJob],
+    journal: JobJournal,
+    matchers: Dict[Path, Optional[TermMatcher]],
+    stage_options: Dict[str, Any],
+    store_root: Path,
+    initial_prompt: str = "",
+    model_size: str = "large-v2",
+    device: Optional[str] = None,
+    transcribe_workers: int = 1,
+    text_workers: Optional[int] = None,
+    regroup: Optional[RegroupConfig] = None,
+) -> Dict[str, Any]:
+    """Run *jobs* through both pools; returns counters for the summary.
+
+    *matchers* maps each audio directory to its compiled glossary matcher;
+    *regroup* sets how transcripts are split into cues.
+    """
+    stats = {"done": 0, "skipped": 0, "failed": 0, "audio_seconds": 0.0, "cues": 0}
+    # One core budget for both pools: text stages (mostly waiting on the LLM)
+    # get a quarter by default, transcriber threads share what is left
+    cpus = os.cpu_count() or 1
+    text_workers = text_workers or max(1, cpus // 4)
+    threads = max(1, (cpus - text_workers) // transcribe_workers)
+    durations: Dict[str, float] = {}
+    ctx = mp.get_context("spawn")  # torch must not be forked
+
+    with ProcessPoolExecutor(transcribe_workers, mp_context=ctx, initializer=_init_transcriber, initargs=(threads,)) as tpool, \
+            ProcessPoolExecutor(text_workers, mp_context=ctx) as xpool:
+        pending: Dict[Future, tuple] = {}
+
+        def submit_text(job: BatchJob) -> None:
+            fut = xpool.submit(_text_job, job, matchers.get(job.audio.parent), stage_options)
+            pending[fut] = ("text", job)
+
+        for job in jobs:
+            status = journal.status(job.job_id)
+            if status == "done" and job.final_srt.exists():
+                stats["skipped"] += 1
+            elif status == "transcribed" and job.raw_srt.exists() and job.words_path.exists():
+                durations[job.job_id] = journal.state[job.job_id].get("audio_seconds", 0.0)
+                submit_text(job)
+            else:
+                fut = tpool.submit(_transcribe_job, job, store_root, initial_prompt, model_size, device, regroup)
+                pending[fut] = ("transcribe", job)
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, job = pending.pop(fut)
+                try:
+                    value = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    journal.append(job, "failed", stage=stage, error=repr(e))
+                    print(f"  ✗ {job.audio.name} ({stage}): {e!r}")
+                    continue
+                if stage == "transcribe":
+                    durations[job.job_id] = value
+                    journal.append(job, "transcribed", audio_seconds=value, raw_srt=str(job.raw_srt))
+                    print(f"  ➜ Transcribed {job.audio.name} ({value / 60:.1f} min)")
+                    submit_text(job)
+                else:
+                    seconds = durations.get(job.job_id, 0.0)
+                    stats["done"] += 1
+                    stats["cues"] += value
+                    stats["audio_seconds"] += seconds
+                    journal.append(job, "done", audio_seconds=seconds, cues=value, output=str(job.final_srt))
+                    print(f"  ➜ Generated {job.final_srt} ({value} cues)")
+    return stats
+
+
+def format_summary(stats: Dict[str, Any], wall_seconds: float) -> str:
+    audio_hours = stats["audio_seconds"] / 3600
+    wall_hours = wall_seconds / 3600
+    rate = audio_hours / wall_hours if wall_hours > 0 else 0.0
+    return (
+        f"Jobs: {stats['done']} done, {stats['skipped']} skipped, {stats['failed']} failed\n"
+        f"Audio: {audio_hours:.2f} h in {wall_seconds / 60:.1f} min wall "
+        f"→ {rate:.2f} audio-hours per wall-hour ({stats['cues']} cues)"
+    )
+
+# -------------------------
+# Command-line interface
+# -------------------------
+
+def main() -> None:  # pragma: no cover
+    p = argparse.ArgumentParser(description="Run the subtitle pipeline over a folder of episodes")
+    p.add_argument("--input", nargs="+", required=True, help="Audio directories and/or glob patterns")
+    p.add_argument("--output-dir", type=Path, default=None, help="Where to write subtitles (default: next to each audio file)")
+    p.add_argument("--transcribe-workers", type=int, default=1, help="Parallel transcription processes (one model each)")
+    p.add_argument("--text-workers", type=int, default=None, help="Processes for the text stages (default: a quarter of the CPUs; transcription threads get the rest)")
+    p.add_argument("--device", default=None, help="Device for the transcription models (e.g. cuda, cpu)")
+    p.add_argument("--journal", type=Path, default=None, help=f"Job journal (default: <output-dir or cwd>/{JOURNAL_NAME})")
+    add_stage_arguments(p)
+    args = p.parse_args()
+
+    audio_files = find_audio(args.input)
+    if not audio_files:
+        raise SystemExit("No audio files found")
+
+    normalizer = normalizer_from_args(args)
+    regroup = regroup_from_args(args)
+    stage_options = {
+        "min_gap": args.min_gap,
+        "max_duration": args.max_duration,
+        "min_duration": args.min_duration,
+        "overlap_mode": args.overlap_mode,
+        "llm_url": args.llm_url if args.llm_split else None,
+        "llm_min_chars": args.llm_min_chars,
+    }
+    # Per-directory glossary.* files are layered over the --glossary files
+    glossaries = {d: project_glossary_paths(args.glossary, d) for d in {a.parent for a in audio_files}}
+    stores = {d: GlossaryStore(paths) for d, paths in glossaries.items() if paths}
+    matchers = {d: store.matcher() for d, store in stores.items()}
+    settings = {
+        "initial_prompt": args.initial_prompt,
+        "model": args.model_size,
+        "regroup": regroup.params(),
+        "stages": stage_options,
+        "glossary": {str(d): store.content_hash for d, store in stores.items()},
+        "normalize": normalizer.digest,
+    }
+    jobs = make_jobs(audio_files, args.output_dir, settings)
+    journal = JobJournal(args.journal or (args.output_dir or Path(".")) / JOURNAL_NAME)
+
+    print(f"[Batch] {len(jobs)} audio files, journal {journal.path}")
+    t0 = time.perf_counter()
+    try:
+        stats = run_batch(
+            jobs,
+            journal,
+            matchers,
+            dict(stage_options, normalizer=normalizer),
+            args.cache_dir,
+            args.initial_prompt,
+            args.model_size,
+            args.device,
+            args.transcribe_workers,
+            args.text_workers,
+            regroup,
+        )
+    finally:
+        journal.close()
+    print(format_summary(stats, time.perf_counter() - t0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""benchmark.py
+Benchmark harness for the subtitle pipeline on synthetic long-form fixtures.
+
+Usage
+-----
+python benchmark.py --output bench.json
+python benchmark.py --sizes 1000 100000 --compare bench.json --threshold 0.15
+
+Fixtures are generated deterministically from ``--seed``:
+
+- SRT files of 1k–100k cues with mixed CJK/Latin text, commas to strip,
+  sub-``min_gap`` gaps and overlaps, with the real glossary's wrong terms
+  sprinkled in,
+- glossaries of growing size (the shipped one padded with random terms),
+- a synthetic audio track (speech-like noise bursts separated by
+  silences) and a mocked transcription model, so chunking, stitching,
+  the transcript store and cue regrouping run without stable_whisper,
+- the local stub LLM server (:mod:`llm_stub_server`) for the split stage.
+
+Every stage is timed ``--repeat`` times; the minimum and median wall
+times go to a JSON file.  ``--compare`` matches entries against an older
+run and exits non-zero when any stage is more than ``--threshold`` slower.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+import parallel_transcribe
+from glossary import DEFAULT_GLOSSARY_DIR, load_glossary
+from llm_client import LLMClient
+from llm_split import split_by_punctuation
+from llm_stub_server import start_stub_server
+from parallel_transcribe import SAMPLE_RATE, find_silences, plan_chunks, stitch_segments
+from regroup import DEFAULT_REGROUP, RegroupConfig, WordArrays
+from srt_cues import CueTable, format_srt, parse_srt
+from stream_pipeline import (
+    correct_terms,
+    fix_timing_stream,
+    llm_split,
+    normalize_text,
+    read_srt_stream,
+    write_srt_stream,
+)
+from term_matcher import TermMatcher
+from text_normalize import Normalizer
+from timing import fix_timing
+from transcript_store import TranscriptStore
+from word_align import WordTimeline
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_GLOSSARY_SIZES = (25, 1_000, 10_000)
+
+LATIN_WORDS = ("Monster", "Hunter", "Wilds", "OK", "GG", "combo", "build", "DPS", "hp", "nice")
+PUNCTUATION = (",", "、", "，", "。", "？", "")
+
+# -------------------------
+# Fixtures
+# -------------------------
+
+def _cjk_word(rng: random.Random, lo: int = 1, hi: int = 4) -> str:
+    return "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(rng.randint(lo, hi)))
+
+
+def synthetic_text(rng: random.Random, terms: Sequence[str]) -> str:
+    """One cue of 1–40 characters mixing CJK runs, Latin words and glossary terms."""
+    parts = []
+    for _ in range(rng.randint(1, 8)):
+        roll = rng.random()
+        if roll < 0.15 and terms:
+            parts.append(rng.choice(terms))
+        elif roll < 0.35:
+            parts.append(f" {rng.choice(LATIN_WORDS)} ")
+        else:
+            parts.append(_cjk_word(rng))
+        parts.append(rng.choice(PUNCTUATION))
+    return "".join(parts).strip() or _cjk_word(rng)
+
+
+def synthetic_table(n_cues: int, seed: int = 0, terms: Sequence[str] = ()) -> CueTable:
+    """*n_cues* cues with realistic gaps: mostly 0–1.5 s, some overlapping."""
+    rng = random.Random(seed)
+    nprng = np.random.default_rng(seed)
+    durations = nprng.integers(400, 8_000, n_cues)
+    gaps = nprng.integers(-300, 1_500, n_cues)
+    starts = np.cumsum(np.maximum(durations + gaps, 100)) - durations[0]
+    ends = starts + durations
+    return CueTable(starts, ends, [synthetic_text(rng, terms) for _ in range(n_cues)])
+
+
+def synthetic_glossary(size: int, seed: int = 0) -> Dict[str, str]:
+    """The shipped glossary padded with random CJK/Latin terms up to *size* entries."""
+    rng = random.Random(seed)
+    mapping = dict(load_glossary(DEFAULT_GLOSSARY_DIR / "monster_hunter_wilds.tsv"))
+    while len(mapping) < size:
+        wrong = _cjk_word(rng, 2, 5) if rng.random() < 0.8 else rng.choice(LATIN_WORDS) + _cjk_word(rng, 1, 2)
+        mapping[wrong] = _cjk_word(rng, 2, 5)
+    return dict(list(mapping.items())[:size])
+
+
+def synthetic_audio(seconds: float, seed: int = 0, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Noise bursts (speech) of 1–8 s separated by 0.2–1.5 s of near-silence."""
+    nprng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * sr), dtype=np.float32)
+    pos = 0
+    while pos < len(audio):
+        burst = int(nprng.uniform(1, 8) * sr)
+        audio[pos:pos + burst] = nprng.normal(0, 0.1, min(burst, len(audio) - pos))
+        pos += burst + int(nprng.uniform(0.2, 1.5) * sr)
+    return audio
+
+# -------------------------
+# Mocked transcription model
+# -------------------------
+
+class _MockWord:
+    __slots__ = ("word", "start", "end", "probability")
+
+    def __init__(self, word: str, start: float, end: float) -> None:
+        self.word, self.start, self.end, self.probability = word, start, end, 0.9
+
+
+class _MockSegment:
+    __slots__ = ("start", "end", "words")
+
+    def __init__(self, words: List[_MockWord]) -> None:
+        self.words = words
+        self.start, self.end = words[0].start, words[-1].end
+
+
+class MockResult:
+    """The subset of ``WhisperResult`` the store, stitching and timeline use."""
+
+    def __init__(self, segments: List[_MockSegment], language: str = "zh") -> None:
+        self.segments = segments
+        self.language = language
+
+    def all_words(self) -> List[_MockWord]:
+        return [w for seg in self.segments for w in seg.words]
+
+
+class MockWhisperModel:
+    """Emits one word every *word_seconds*, four words per segment, for any audio."""
+
+    def __init__(self, seed: int = 0, word_seconds: float = 0.4) -> None:
+        self.rng = random.Random(seed)
+        self.word_seconds = word_seconds
+
+    def transcribe(self, audio, **_: Any) -> MockResult:
+        n_words = max(1, int(len(audio) / SAMPLE_RATE / self.word_seconds))
+        words = [
+            _MockWord(_cjk_word(self.rng, 1, 2), k * self.word_seconds, (k + 0.8) * self.word_seconds)
+            for k in range(n_words)
+        ]
+        return MockResult([_MockSegment(words[i:i + 4]) for i in range(0, n_words, 4)])
+
+# -------------------------
+# Timing
+# -------------------------
+
+def time_stage(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"seconds_min": min(times), "seconds_median": statistics.median(times)}
+
+
+class Recorder:
+    def __init__(self, repeat: int) -> None:
+        self.repeat = repeat
+        self.results: List[Dict[str, Any]] = []
+
+    def run(self, stage: str, fn: Callable[[], Any], size: int, **params: Any) -> None:
+        timing = time_stage(fn, self.repeat)
+        entry = {"stage": stage, "size": size, **params, **timing}
+        entry["per_item_us"] = timing["seconds_min"] / max(size, 1) * 1e6
+        self.results.append(entry)
+        extra = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"  {stage:<22} n={size:<7} {extra:<16} {timing['seconds_min'] * 1000:10.2f} ms")
+
+# -------------------------
+# Suites
+# -------------------------
+
+def bench_text_stages(rec: Recorder, sizes: Sequence[int], glossary_sizes: Sequence[int], seed: int, work: Path) -> None:
+    base_terms = list(load_glossary(DEFAULT_GLOSSARY_DIR / "monster_hunter_wilds.tsv"))
+    for n in sizes:
+        table = synthetic_table(n, seed, base_terms)
+        content = format_srt(table)
+        srt_path = work / f"bench_{n}.srt"
+        srt_path.write_text(content, encoding="utf-8")
+        print(f"[{n} cues, {len(content) / 1e6:.1f} MB]")
+
+        rec.run("parse_srt", lambda: parse_srt(content), n)
+        rec.run("format_srt", lambda: format_srt(table), n)
+        rec.run("fix_timing", lambda: fix_timing(table.copy(), 0.5, 7.0, 1.0, "trim"), n)
+        normalizer = Normalizer(width="half", collapse_whitespace=True)
+        rec.run("normalize", lambda: [normalizer(t) for t in table.texts], n)
+        rec.run("split_by_punctuation", lambda: [split_by_punctuation(t) for t in table.texts], n)
+        rec.run(
+            "stream_fix_timing",
+            lambda: sum(1 for _ in fix_timing_stream(iter(table), 0.5, 7.0, 1.0, "trim")),
+            n,
+        )
+        for g in glossary_sizes:
+            matcher = TermMatcher(synthetic_glossary(g, seed))
+            rec.run("correct_terms", lambda: [matcher.correct(t) for t in table.texts], n, glossary=g)
+
+        matcher = TermMatcher(synthetic_glossary(max(glossary_sizes), seed))
+        out_path = work / f"bench_{n}_out.srt"
+
+        def full_pipeline() -> int:
+            cues = read_srt_stream(srt_path)
+            cues = normalize_text(cues)
+            cues = fix_timing_stream(cues, 0.5, 7.0, 1.0, "trim")
+            cues = correct_terms(cues, matcher)
+            return write_srt_stream(cues, out_path)
+
+        rec.run("text_pipeline", full_pipeline, n, glossary=max(glossary_sizes))
+
+
+def bench_glossary_compile(rec: Recorder, glossary_sizes: Sequence[int], seed: int) -> None:
+    print("[glossary compile]")
+    for g in glossary_sizes:
+        mapping = synthetic_glossary(g, seed)
+        rec.run("glossary_compile", lambda: TermMatcher(mapping), g)
+
+
+def bench_llm_split(rec: Recorder, n_cues: int, seed: int, latency: float) -> None:
+    print(f"[LLM split, stub server, {n_cues} cues]")
+    server, url = start_stub_server(latency=latency)
+    try:
+        table = synthetic_table(n_cues, seed)
+        with LLMClient(url=url) as client:  # no persistent cache: every repeat hits the server
+            rec.run("llm_split", lambda: sum(1 for _ in llm_split(iter(table), client)), n_cues, latency=latency)
+    finally:
+        server.shutdown()
+
+
+def bench_transcription(rec: Recorder, audio_minutes: float, sizes: Sequence[int], seed: int, work: Path) -> None:
+    print(f"[mocked transcription, {audio_minutes:g} min audio]")
+    audio = synthetic_audio(audio_minutes * 60, seed)
+    seconds = int(audio_minutes * 60)
+    rec.run("find_silences", lambda: find_silences(audio), seconds)
+    chunks = plan_chunks(len(audio), find_silences(audio), chunk_seconds=300.0)
+
+    parallel_transcribe._MODEL = MockWhisperModel(seed)
+    chunk_segments = [
+        parallel_transcribe._transcribe_chunk(audio[a:b], "", {})["segments"] for a, b, _, _ in chunks
+    ]
+    rec.run("stitch_segments", lambda: stitch_segments(chunk_segments, chunks), seconds)
+
+    store = TranscriptStore(work / "store")
+    model = MockWhisperModel(seed)
+    for n in sizes:
+        # n segments of four words each, i.e. about 1.6 s of speech per cue
+        result = model.transcribe(np.empty(int(n * 4 * model.word_seconds * SAMPLE_RATE), dtype=np.uint8))
+        key = f"bench{n}"
+        rec.run("store_save", lambda: store.save(key, result).close(), n)
+
+        def load() -> int:
+            stored = store.load(key)
+            n_words = len(stored.timeline())
+            stored.close()
+            return n_words
+
+        rec.run("store_load_timeline", load, n)
+        timeline = WordTimeline.from_result(result)
+        cue_starts = np.array([int(seg.start * 1000) for seg in result.segments])
+        cue_ends = np.array([int(seg.end * 1000) for seg in result.segments])
+        rec.run("cue_ranges", lambda: timeline.cue_ranges(cue_starts, cue_ends), n)
+
+        stored = store.load(key)
+        words = WordArrays.from_stored(stored)
+        stored.close()
+        rec.run("regroup", lambda: words.regroup(DEFAULT_REGROUP), n)
+        sweep = [RegroupConfig(max_gap=g, max_chars=c) for g in (0.2, 0.3, 0.5) for c in (None, 20, 40)]
+        rec.run("regroup_sweep", lambda: [words.regroup(config) for config in sweep], n, configs=len(sweep))
+
+# -------------------------
+# Comparison
+# -------------------------
+
+def _result_key(entry: Dict[str, Any]) -> tuple:
+    return tuple(sorted((k, v) for k, v in entry.items() if not k.startswith(("seconds_", "per_item_"))))
+
+
+def compare_results(
+    current: Sequence[Dict[str, Any]],
+    baseline: Sequence[Dict[str, Any]],
+    threshold: float = 0.15,
+    min_seconds: float = 0.005,
+) -> List[Dict[str, Any]]:
+    """Entries present in both runs whose minimum time grew by more than *threshold*.
+
+    Stages faster than *min_seconds* in the baseline are too noisy to gate on.
+    """
+    old = {_result_key(e): e for e in baseline}
+    regressions = []
+    for entry in current:
+        ref = old.get(_result_key(entry))
+        if ref is None or ref["seconds_min"] < min_seconds:
+            continue
+        ratio = entry["seconds_min"] / ref["seconds_min"]
+        if ratio > 1 + threshold:
+            regressions.append({**entry, "baseline_seconds_min": ref["seconds_min"], "ratio": ratio})
+    return regressions
+
+# -------------------------
+# Command-line interface
+# -------------------------
+
+def main() -> None:  # pragma: no cover
+    p = argparse.ArgumentParser(description="Benchmark the subtitle pipeline on synthetic fixtures")
+    p.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Cue counts of the synthetic SRTs")
+    p.add_argument("--glossary-sizes", type=int, nargs="+", default=list(DEFAULT_GLOSSARY_SIZES), help="Glossary entry counts")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per stage (min and median are reported)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--llm-cues", type=int, default=2_000, help="Cues sent through the stub LLM (0 = skip)")
+    p.add_argument("--llm-latency", type=float, default=0.0, help="Artificial stub server latency per request (sec)")
+    p.add_argument("--audio-minutes", type=float, default=30.0, help="Length of the synthetic audio (0 = skip)")
+    p.add_argument("--output", type=Path, default=Path("benchmark_results.json"), help="Results JSON")
+    p.add_argument("--compare", type=Path, default=None, help="Baseline results JSON to gate against")
+    p.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before failing (0.15 = 15%%)")
+    args = p.parse_args()
+
+    rec = Recorder(args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        bench_glossary_compile(rec, args.glossary_sizes, args.seed)
+        bench_text_stages(rec, args.sizes, args.glossary_sizes, args.seed, work)
+        if args.llm_cues:
+            bench_llm_split(rec, args.llm_cues, args.seed, args.llm_latency)
+        if args.audio_minutes:
+            bench_transcription(rec, args.audio_minutes, args.sizes, args.seed, work)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": rec.results,
+    }
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Results written to {args.output}")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_results(rec.results, baseline["results"], args.threshold)
+        for r in regressions:
+            print(
+                f"  REGRESSION {r['stage']} n={r['size']}: "
+                f"{r['baseline_seconds_min'] * 1000:.2f} ms → {r['seconds_min'] * 1000:.2f} ms (x{r['ratio']:.2f})"
+            )
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions above {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
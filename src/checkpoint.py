@@ -0,0 +1,121 @@
+"""checkpoint.py
+Append-only checkpoint journal for long per-cue stages.
+
+Instead of re-joining and rewriting the whole output file every few
+blocks, a stage appends one JSON line per processed cue to
+``<output>.journal`` (buffered, flushed every ``flush_every`` records) and
+writes a snapshot of the output at most every ``snapshot_seconds`` via a
+temp file + ``os.replace``, so the output file is never half-written.
+
+The journal starts with a header holding a *key* – a digest of the input
+and the stage parameters.  Reopening a journal with the same key replays
+it (:attr:`CheckpointJournal.done`) and the stage continues after the last
+recorded cue; any other key starts over.  :meth:`CheckpointJournal.finish`
+writes the final output and removes the journal.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+JOURNAL_VERSION = 1
+
+
+def atomic_write_text(path: Path, content: str) -> None:
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CheckpointJournal:
+    def __init__(
+        self,
+        output_path: Path,
+        key: str,
+        snapshot_seconds: float = 30.0,
+        flush_every: int = 100,
+    ) -> None:
+        self.output_path = Path(output_path)
+        self.path = self.output_path.with_name(self.output_path.name + ".journal")
+        self.key = key
+        self.snapshot_seconds = snapshot_seconds
+        self.flush_every = max(1, flush_every)
+        text = self.path.read_text(encoding="utf-8") if self.path.exists() else ""
+        lines = text.splitlines()
+        resumable = bool(lines) and self._header_matches(lines[0])
+        self.done: Dict[int, Any] = {}
+        if resumable:
+            valid = self._replay(lines[1:], self.done)
+            if valid < len(lines) - 1 or not text.endswith("\n"):
+                # Cut a torn last record so new records start on a fresh line
+                atomic_write_text(self.path, "\n".join(lines[:1 + valid]) + "\n")
+            self._f = self.path.open("a", encoding="utf-8")
+        else:
+            # No journal, or one for another input / other parameters
+            self._f = self.path.open("w", encoding="utf-8")
+            self._f.write(json.dumps({"version": JOURNAL_VERSION, "key": key}) + "\n")
+            self._f.flush()
+        self._pending = 0
+        self._last_snapshot = time.monotonic()
+
+    def _header_matches(self, line: str) -> bool:
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return False
+        return header.get("version") == JOURNAL_VERSION and header.get("key") == self.key
+
+    @staticmethod
+    def _replay(lines: List[str], done: Dict[int, Any]) -> int:
+        """Fill *done* from the records; returns the number of intact lines."""
+        for n, line in enumerate(lines):
+            try:
+                index, payload = json.loads(line)
+            except ValueError:
+                return n  # torn write at the crash point
+            done[index] = payload
+        return len(lines)
+
+    def append(self, index: int, payload: Any) -> None:
+        """Record that cue *index* produced *payload* (any JSON value)."""
+        self._f.write(json.dumps([index, payload], ensure_ascii=False) + "\n")
+        self.done[index] = payload
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._f.flush()
+            self._pending = 0
+
+    def snapshot(self, content: str) -> None:
+        """Make the journal durable and atomically replace the output with *content*."""
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        atomic_write_text(self.output_path, content)
+        self._last_snapshot = time.monotonic()
+
+    def maybe_snapshot(self, render: Callable[[], str]) -> None:
+        """Snapshot ``render()`` if ``snapshot_seconds`` passed since the last one."""
+        if time.monotonic() - self._last_snapshot >= self.snapshot_seconds:
+            self.snapshot(render())
+
+    def close(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+
+    def finish(self, content: str) -> None:
+        """Write the complete output and drop the journal."""
+        self.close()
+        atomic_write_text(self.output_path, content)
+        self.path.unlink()
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
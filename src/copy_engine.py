@@ -0,0 +1,350 @@
+"""copy_engine.py
+Size-aware file copy engine for camera card offload.
+
+Files are copied with the cheapest path the platform offers:
+
+- large files (``>= large_threshold``): ``os.copy_file_range`` (in-kernel,
+  may be server-side on NFS/SMB), else ``os.sendfile`` (Linux), else the
+  buffered path,
+- everything else, and any large file whose zero-copy call fails (e.g.
+  ``EXDEV``/``ENOSYS`` across file systems), is read with ``readinto``
+  into one page-aligned ``buffer_size`` buffer per thread,
+- small files (``< small_threshold``) are batched, up to ``batch_files``
+  files or ``batch_bytes`` bytes per task, so a card full of JPEGs does
+  not pay one scheduling round-trip per file.
+
+Concurrency is limited per *source device* (``st_dev``) and size class:
+``large_per_device`` threads stream big clips (1 keeps reads sequential,
+which is what SD/CFexpress readers are fast at) while
+``small_per_device`` threads work through the small-file batches.
+Timestamps and permissions are copied like ``shutil.copy2``.  Data goes
+to ``<dest>.part`` and is renamed into place only when complete, so a
+card pulled mid-copy never leaves a truncated file under the real name.
+
+With ``hash_algo`` set the checksum is computed from the copy buffer
+while copying (no second read pass); such copies always take the
+buffered path, since zero-copy data never reaches user space.  That is
+the trade-off: a 512 MiB clip on a local SSD copies at ~2.6 GB/s with
+``copy_file_range`` but ~0.47 GB/s buffered with BLAKE2b, one core's
+hashing speed – below what a CFexpress reader delivers.  ``"xxh3"`` /
+``"blake3"`` (the ``xxhash`` / ``blake3`` packages) hash several times
+faster; ``"blake2b"`` needs nothing extra, and
+:func:`fastest_hash_algo` picks the fastest one installed.
+
+:func:`scan_tree` builds the job list in one ``os.scandir`` walk; the
+sizes come from the directory entries (free on Windows, one ``stat`` per
+file elsewhere) and are reused for planning and byte-based progress.
+"""
+
+import errno
+import hashlib
+import mmap
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+MiB = 1 << 20
+
+LARGE_THRESHOLD = 64 * MiB
+SMALL_THRESHOLD = 4 * MiB
+BUFFER_SIZE = 8 * MiB
+ZERO_COPY_CHUNK = 16 * MiB  # also the progress granularity of big clips
+
+# Zero-copy is unavailable for this pair of files; use the buffered path
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
+
+ProgressCallback = Callable[[int], None]
+
+
+HASH_ALGORITHMS = ("blake2b", "xxh3", "blake3")
+PARTIAL_SUFFIX = ".part"
+
+
+class CopyJob(NamedTuple):
+    src: str
+    dest: str
+    size: int
+    mtime_ns: int = 0
+
+
+class CopyStats(NamedTuple):
+    files: int
+    bytes: int
+    seconds: float
+    failed: List[Tuple[CopyJob, Exception]]
+    methods: Dict[str, int]
+
+# -------------------------
+# Scanning
+# -------------------------
+
+def scan_tree(source: str, destination: str) -> List[CopyJob]:
+    """One job per file under *source*, mirrored under *destination*."""
+    jobs: List[CopyJob] = []
+    stack = [(source, destination)]
+    while stack:
+        src_dir, dest_dir = stack.pop()
+        try:
+            entries = list(os.scandir(src_dir))
+        except OSError:
+            continue
+        for entry in sorted(entries, key=lambda e: e.name):
+            dest = os.path.join(dest_dir, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((entry.path, dest))
+            elif entry.is_file():
+                try:
+                    st = entry.stat()
+                    size, mtime_ns = st.st_size, st.st_mtime_ns
+                except OSError:
+                    size, mtime_ns = 0, 0  # kept, so the copy reports the error
+                jobs.append(CopyJob(entry.path, dest, size, mtime_ns))
+    return jobs
+
+# -------------------------
+# Hashing
+# -------------------------
+
+def make_hasher(algo: str):
+    """A ``hashlib``-style object with ``update`` / ``hexdigest`` for *algo*."""
+    if algo == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algo == "xxh3":
+        try:
+            import xxhash  # type: ignore
+        except ImportError as e:  # pragma: no cover
+            raise SystemExit("xxhash is required for xxh3 checksums. Install with `pip install xxhash`.") from e
+        return xxhash.xxh3_128()
+    if algo == "blake3":
+        try:
+            import blake3  # type: ignore
+        except ImportError as e:  # pragma: no cover
+            raise SystemExit("blake3 is required for blake3 checksums. Install with `pip install blake3`.") from e
+        return blake3.blake3()
+    raise ValueError(f"hash algorithm must be one of {HASH_ALGORITHMS}, got {algo!r}")
+
+
+def fastest_hash_algo() -> str:
+    """``"xxh3"`` or ``"blake3"`` if their package is installed, else ``"blake2b"``."""
+    for algo, module in (("xxh3", "xxhash"), ("blake3", "blake3")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        return algo
+    return "blake2b"
+
+
+def hash_file(path: str, algo: str, buffer_size: int = BUFFER_SIZE) -> str:
+    hasher = make_hasher(algo)
+    buf = _buffer(buffer_size)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                return hasher.hexdigest()
+            hasher.update(buf[:n])
+
+# -------------------------
+# Single-file copy paths
+# -------------------------
+
+_local = threading.local()
+
+
+def _buffer(size: int) -> memoryview:
+    """Page-aligned, reused per thread (anonymous mmap memory is page-aligned)."""
+    buf = getattr(_local, "buffer", None)
+    if buf is None or len(buf) != size:
+        buf = memoryview(mmap.mmap(-1, size))
+        _local.buffer = buf
+    return buf
+
+
+def _copy_buffered(
+    fsrc, fdst, offset: int, buffer_size: int, on_progress: Optional[ProgressCallback], hasher=None,
+) -> None:
+    buf = _buffer(buffer_size)
+    fsrc.seek(offset)
+    fdst.seek(offset)
+    while True:
+        n = fsrc.readinto(buf)
+        if not n:
+            return
+        fdst.write(buf[:n])
+        if hasher is not None:
+            hasher.update(buf[:n])
+        if on_progress is not None:
+            on_progress(n)
+
+
+def _copy_zero_copy(fsrc, fdst, size: int, on_progress: Optional[ProgressCallback]) -> Tuple[str, int]:
+    """Copy with copy_file_range / sendfile; returns (method, bytes done) – stops early on fallback errors."""
+    in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+    done = 0
+    if hasattr(os, "copy_file_range"):
+        method = "copy_file_range"
+        call = lambda count: os.copy_file_range(in_fd, out_fd, count, done, done)  # noqa: E731
+    elif hasattr(os, "sendfile") and os.name == "posix":
+        method = "sendfile"
+        call = lambda count: os.sendfile(out_fd, in_fd, done, count)  # noqa: E731
+    else:
+        return "buffered", 0
+    try:
+        while done < size:
+            n = call(min(ZERO_COPY_CHUNK, size - done))
+            if n == 0:
+                break  # source shrank, or the kernel refuses; finish buffered
+            done += n
+            if on_progress is not None:
+                on_progress(n)
+    except OSError as e:
+        if e.errno not in _FALLBACK_ERRNOS:
+            raise
+    return method, done
+
+
+def copy_file(
+    job: CopyJob,
+    large_threshold: int = LARGE_THRESHOLD,
+    buffer_size: int = BUFFER_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+    hasher=None,
+) -> str:
+    """Copy one file with data and metadata; returns the method used.
+
+    *hasher* (see :func:`make_hasher`) is fed every chunk; it forces the
+    buffered path.
+    """
+    os.makedirs(os.path.dirname(job.dest) or ".", exist_ok=True)
+    partial = job.dest + PARTIAL_SUFFIX
+    method, done = "buffered", 0
+    try:
+        with open(job.src, "rb") as fsrc, open(partial, "wb") as fdst:
+            if job.size >= large_threshold and hasher is None:
+                method, done = _copy_zero_copy(fsrc, fdst, job.size, on_progress)
+            if done < job.size:
+                method = f"{method}+buffered" if done else "buffered"
+                _copy_buffered(fsrc, fdst, done, buffer_size, on_progress, hasher)
+        shutil.copystat(job.src, partial)
+        os.replace(partial, job.dest)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return method
+
+# -------------------------
+# Engine
+# -------------------------
+
+def _device(path: str) -> int:
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return -1
+
+
+class CopyEngine:
+    def __init__(
+        self,
+        large_threshold: int = LARGE_THRESHOLD,
+        small_threshold: int = SMALL_THRESHOLD,
+        buffer_size: int = BUFFER_SIZE,
+        batch_files: int = 64,
+        batch_bytes: int = 64 * MiB,
+        large_per_device: int = 1,
+        small_per_device: int = 4,
+        hash_algo: Optional[str] = None,
+    ) -> None:
+        if hash_algo is not None:
+            make_hasher(hash_algo)  # fail early on unknown / missing algorithms
+        self.large_threshold = large_threshold
+        self.small_threshold = small_threshold
+        self.buffer_size = buffer_size
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.large_per_device = large_per_device
+        self.small_per_device = small_per_device
+        self.hash_algo = hash_algo
+
+    def plan(self, jobs: Sequence[CopyJob]) -> List[List[CopyJob]]:
+        """Tasks: each large/medium file alone (biggest first), small files in batches."""
+        single = sorted((j for j in jobs if j.size >= self.small_threshold), key=lambda j: -j.size)
+        tasks: List[List[CopyJob]] = [[j] for j in single]
+        batch: List[CopyJob] = []
+        batch_size = 0
+        for job in jobs:
+            if job.size >= self.small_threshold:
+                continue
+            batch.append(job)
+            batch_size += job.size
+            if len(batch) >= self.batch_files or batch_size >= self.batch_bytes:
+                tasks.append(batch)
+                batch, batch_size = [], 0
+        if batch:
+            tasks.append(batch)
+        return tasks
+
+    def run(
+        self,
+        jobs: Sequence[CopyJob],
+        on_progress: Optional[ProgressCallback] = None,
+        on_copied: Optional[Callable[[CopyJob, Optional[str]], None]] = None,
+    ) -> CopyStats:
+        """Copy *jobs*.
+
+        Both callbacks run on worker threads: *on_progress* receives byte
+        counts as they are written, *on_copied* each successfully copied
+        job with its hex digest (None without ``hash_algo``); failures are
+        collected in :attr:`CopyStats.failed`.
+        """
+        t0 = time.perf_counter()
+        failed: List[Tuple[CopyJob, Exception]] = []
+        methods: Dict[str, int] = {}
+        lock = threading.Lock()
+        pools: Dict[Tuple[int, str], ThreadPoolExecutor] = {}
+        devices: Dict[str, int] = {}
+
+        def pool_for(task: List[CopyJob]) -> ThreadPoolExecutor:
+            top = os.path.dirname(task[0].src)
+            if top not in devices:
+                devices[top] = _device(top)
+            kind = "large" if len(task) == 1 and task[0].size >= self.small_threshold else "small"
+            key = (devices[top], kind)
+            if key not in pools:
+                workers = self.large_per_device if kind == "large" else self.small_per_device
+                pools[key] = ThreadPoolExecutor(max(1, workers), thread_name_prefix=f"copy-{key[0]}-{kind}")
+            return pools[key]
+
+        def copy_task(task: List[CopyJob]) -> None:
+            for job in task:
+                hasher = make_hasher(self.hash_algo) if self.hash_algo else None
+                try:
+                    method = copy_file(job, self.large_threshold, self.buffer_size, on_progress, hasher)
+                    if on_copied is not None:
+                        on_copied(job, hasher.hexdigest() if hasher is not None else None)
+                except Exception as e:
+                    with lock:
+                        failed.append((job, e))
+                    continue
+                with lock:
+                    methods[method] = methods.get(method, 0) + 1
+
+        futures: List[Future] = []
+        try:
+            for task in self.plan(jobs):
+                futures.append(pool_for(task).submit(copy_task, task))
+            for fut in futures:
+                fut.result()
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+        copied = len(jobs) - len(failed)
+        total = sum(job.size for job in jobs) - sum(job.size for job, _ in failed)
+        return CopyStats(copied, total, time.perf_counter() - t0, failed, methods)
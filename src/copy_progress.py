@@ -0,0 +1,197 @@
+"""copy_progress.py
+Byte-based progress, throughput and ETA for camera offload.
+
+:class:`TransferProgress` is fed byte counts from inside the copy loops
+of :mod:`copy_engine` (per buffered chunk / zero-copy call, per small
+file), so a single 20 GB clip moves the bar while it is being copied.
+It keeps one counter per source (e.g. ``"JPEG照片"``, ``"RAW檔案"``) and
+one combined ``tqdm`` bar in bytes whose postfix shows each active
+source's MB/s and the ETA of *all* sources together:
+``remaining bytes / combined rate since the first byte``.
+
+Sources can be put in *groups* (one per card/device when several cards
+are copied at once, see :mod:`offload_scheduler`); the postfix then shows
+one MB/s per group and :meth:`TransferProgress.group_stats` gives the
+bandwidth of each device.
+
+Callbacks arrive on worker threads; counters are updated under one lock
+and the postfix is redrawn at most every ``refresh`` seconds.
+"""
+
+import threading
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional
+
+from tqdm import tqdm
+
+from copy_engine import ProgressCallback
+
+
+class SourceStats(NamedTuple):
+    label: str
+    total: int
+    done: int
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Bytes per second (0 before the first byte)."""
+        return self.done / self.seconds if self.seconds > 0 else 0.0
+
+
+class _Counter:
+    __slots__ = ("total", "done", "started", "finished")
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def seconds(self, now: float) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or now) - self.started
+
+
+def format_rate(rate: float) -> str:
+    return f"{rate / 1e6:.1f} MB/s"
+
+
+class TransferProgress:
+    def __init__(
+        self,
+        totals: Mapping[str, int],
+        desc: str = "複製",
+        bar: bool = True,
+        refresh: float = 0.5,
+        groups: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self._counters: Dict[str, _Counter] = {label: _Counter(total) for label, total in totals.items()}
+        self.total = sum(totals.values())
+        # label -> group; ungrouped labels are their own group
+        self._groups: Dict[str, str] = {label: (groups or {}).get(label, label) for label in totals}
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+        self._refresh = refresh
+        self._last_postfix = 0.0
+        self._bar = None
+        if bar:
+            self._bar = tqdm(
+                total=self.total,
+                desc=desc,
+                unit="B",
+                unit_scale=True,
+                unit_divisor=1024,
+                bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}{postfix}]",
+            )
+
+    @property
+    def done(self) -> int:
+        return sum(c.done for c in self._counters.values())
+
+    def start(self, label: str) -> None:
+        """Start *label*'s clock (otherwise it starts at its first byte)."""
+        now = time.perf_counter()
+        with self._lock:
+            counter = self._counters[label]
+            if counter.started is None:
+                counter.started = now
+            if self._started is None:
+                self._started = now
+
+    def add(self, label: str, nbytes: int) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            counter = self._counters[label]
+            if counter.started is None:
+                counter.started = now
+            if self._started is None:
+                self._started = now
+            counter.done += nbytes
+            if self._bar is not None:
+                self._bar.update(nbytes)
+                if now - self._last_postfix >= self._refresh:
+                    self._last_postfix = now
+                    self._bar.set_postfix_str(self._postfix(now), refresh=False)
+
+    def callback(self, label: str) -> ProgressCallback:
+        """An ``on_progress`` callback for :meth:`copy_engine.CopyEngine.run`."""
+        return lambda nbytes: self.add(label, nbytes)
+
+    def finish(self, label: str) -> None:
+        with self._lock:
+            counter = self._counters[label]
+            if counter.started is not None and counter.finished is None:
+                counter.finished = time.perf_counter()
+
+    # -------------------------
+    # Rates and ETA
+    # -------------------------
+
+    def eta(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds left for all sources at the combined rate so far (None before any byte)."""
+        now = time.perf_counter() if now is None else now
+        done = self.done
+        if self._started is None or done == 0:
+            return None
+        rate = done / max(now - self._started, 1e-9)
+        return (self.total - done) / rate
+
+    def _group(self, group: str, now: float) -> SourceStats:
+        """Bytes of *group* over the time from its first start to its last finish (or now)."""
+        counters = [c for label, c in self._counters.items() if self._groups[label] == group]
+        started = [c.started for c in counters if c.started is not None]
+        if not started:
+            return SourceStats(group, sum(c.total for c in counters), 0, 0.0)
+        running = any(c.started is not None and c.finished is None for c in counters)
+        end = now if running else max(c.finished for c in counters if c.finished is not None)
+        return SourceStats(group, sum(c.total for c in counters), sum(c.done for c in counters), end - min(started))
+
+    def _active_groups(self) -> List[str]:
+        return list(dict.fromkeys(
+            self._groups[label] for label, c in self._counters.items()
+            if c.started is not None and c.finished is None and c.done
+        ))
+
+    def _postfix(self, now: float) -> str:
+        parts = []
+        for group in self._active_groups():
+            item = self._group(group, now)
+            if item.seconds > 0:
+                parts.append(f"{group} {format_rate(item.rate)}")
+        eta = self.eta(now)
+        if eta is not None:
+            parts.append(f"ETA {tqdm.format_interval(eta)}")
+        return ", ".join(parts)
+
+    def stats(self) -> List[SourceStats]:
+        now = time.perf_counter()
+        with self._lock:
+            return [SourceStats(label, c.total, c.done, c.seconds(now)) for label, c in self._counters.items()]
+
+    def group_stats(self) -> List[SourceStats]:
+        """Per-group (per-device) bandwidth accounting."""
+        now = time.perf_counter()
+        with self._lock:
+            return [self._group(group, now) for group in dict.fromkeys(self._groups.values())]
+
+    def overall(self) -> SourceStats:
+        """All sources together; the clock stops when the last started source finishes."""
+        now = time.perf_counter()
+        with self._lock:
+            counters = [c for c in self._counters.values() if c.started is not None]
+            if self._started is None:
+                seconds = 0.0
+            elif all(c.finished is not None for c in counters):
+                seconds = max(c.finished for c in counters) - self._started
+            else:
+                seconds = now - self._started
+            return SourceStats("total", self.total, sum(c.done for c in self._counters.values()), seconds)
+
+    def close(self) -> None:
+        if self._bar is not None:
+            with self._lock:
+                self._bar.set_postfix_str(self._postfix(time.perf_counter()), refresh=False)
+            self._bar.close()
+            self._bar = None
@@ -0,0 +1,178 @@
+"""glossary.py
+External terminology glossaries with a compiled-matcher cache.
+
+Glossaries are plain files mapping wrong → correct terms:
+
+- ``.tsv``  one ``wrong<TAB>correct`` pair per line, ``#`` starts a comment
+- ``.json`` an object ``{"wrong": "correct", ...}``
+- ``.yaml`` / ``.yml`` the same mapping (requires PyYAML)
+
+Several files are layered in order (later files override earlier ones),
+typically a shared per-game glossary plus a ``glossary.*`` next to the
+project's media.  The merged mapping is compiled into a
+:class:`~term_matcher.TermMatcher` once per content hash; compiled
+matchers are pickled to *cache_dir* so a batch over many episodes never
+rebuilds the same automaton, and the store reloads when a file changes.
+Cache entries are also keyed by a hash of ``term_matcher.py``, so a
+changed matcher implementation never unpickles an old automaton.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import term_matcher
+from term_matcher import TermMatcher
+
+DEFAULT_GLOSSARY_DIR = Path(__file__).resolve().parent / "glossaries"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "subtitle_pipeline" / "glossary"
+PROJECT_GLOSSARY_NAMES = ("glossary.tsv", "glossary.json", "glossary.yaml", "glossary.yml")
+# Pickled matchers are only valid for the TermMatcher code that built them
+MATCHER_FORMAT = hashlib.sha256(Path(term_matcher.__file__).read_bytes()).hexdigest()[:12]
+
+# -------------------------
+# Loading
+# -------------------------
+
+def _load_tsv(text: str, path: Path) -> Dict[str, str]:
+    mapping: Dict[str, str] = {}
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) != 2:
+            raise ValueError(f"{path}:{lineno}: expected 'wrong<TAB>correct', got {line!r}")
+        mapping[parts[0].strip()] = parts[1].strip()
+    return mapping
+
+
+def _load_yaml(text: str, path: Path) -> Dict[str, str]:
+    try:
+        import yaml  # type: ignore
+    except ImportError as e:  # pragma: no cover
+        raise SystemExit(f"PyYAML is required to read {path}. Install with `pip install pyyaml`.") from e
+    return yaml.safe_load(text) or {}
+
+
+def load_glossary(path: Path) -> Dict[str, str]:
+    """Read one glossary file into a ``wrong -> correct`` dict."""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    suffix = path.suffix.lower()
+    if suffix == ".tsv":
+        mapping = _load_tsv(text, path)
+    elif suffix == ".json":
+        mapping = json.loads(text)
+    elif suffix in (".yaml", ".yml"):
+        mapping = _load_yaml(text, path)
+    else:
+        raise ValueError(f"Unsupported glossary format: {path}")
+    if not isinstance(mapping, dict):
+        raise ValueError(f"{path}: glossary must be a mapping of wrong -> correct terms")
+    return {str(k): str(v) for k, v in mapping.items()}
+
+
+def merge_glossaries(paths: Sequence[Path]) -> Dict[str, str]:
+    """Layer glossaries in order; later files override earlier entries."""
+    merged: Dict[str, str] = {}
+    for path in paths:
+        merged.update(load_glossary(path))
+    return merged
+
+
+def project_glossary_paths(base_paths: Sequence[Path], project_dir: Optional[Path]) -> List[Path]:
+    """*base_paths* plus any ``glossary.*`` found in *project_dir*."""
+    paths = [Path(p) for p in base_paths]
+    if project_dir is not None:
+        paths.extend(Path(project_dir) / name for name in PROJECT_GLOSSARY_NAMES if (Path(project_dir) / name).is_file())
+    return paths
+
+
+def glossary_hash(mapping: Dict[str, str]) -> str:
+    canonical = json.dumps(mapping, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# -------------------------
+# Store
+# -------------------------
+
+class GlossaryStore:
+    """Hot-reloadable, layered glossary with a compiled-matcher cache.
+
+    :meth:`matcher` only stats the files on each call; the glossaries are
+    re-read when a size/mtime changes, and the automaton is rebuilt only
+    when the merged content hash is new (memory first, then *cache_dir*).
+    """
+
+    def __init__(self, paths: Sequence[Path], cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> None:
+        self.paths = [Path(p) for p in paths]
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._stamp: Optional[Tuple] = None
+        self._hash: Optional[str] = None
+        self._mapping: Dict[str, str] = {}
+        self._compiled: Dict[str, TermMatcher] = {}
+
+    def _file_stamp(self) -> Tuple:
+        stamp = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                # Not FileNotFoundError: callers report that as a missing input SRT
+                raise ValueError(f"Glossary file {path} is no longer readable ({e.strerror})") from e
+            stamp.append((str(path), st.st_size, st.st_mtime_ns))
+        return tuple(stamp)
+
+    def _reload_if_changed(self) -> None:
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        self._mapping = merge_glossaries(self.paths)
+        self._hash = glossary_hash(self._mapping)
+        self._stamp = stamp
+
+    @property
+    def mapping(self) -> Dict[str, str]:
+        self._reload_if_changed()
+        return self._mapping
+
+    @property
+    def content_hash(self) -> str:
+        self._reload_if_changed()
+        return self._hash  # type: ignore[return-value]
+
+    def matcher(self) -> TermMatcher:
+        """Return the compiled matcher for the current glossary content."""
+        self._reload_if_changed()
+        key = self._hash
+        matcher = self._compiled.get(key)  # type: ignore[arg-type]
+        if matcher is not None:
+            return matcher
+
+        cache_file = self.cache_dir / f"{key}-{MATCHER_FORMAT}.pickle" if self.cache_dir is not None else None
+        if cache_file is not None and cache_file.exists():
+            try:
+                with cache_file.open("rb") as f:
+                    matcher = pickle.load(f)
+            except Exception:
+                matcher = None  # stale/corrupt cache entry – rebuild below
+        if matcher is None:
+            matcher = TermMatcher(self._mapping)
+            if cache_file is not None:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                # One temp file per writer, so concurrent processes never interleave
+                with tempfile.NamedTemporaryFile(dir=cache_file.parent, suffix=".tmp", delete=False) as f:
+                    try:
+                        pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    except BaseException:
+                        f.close()
+                        os.remove(f.name)
+                        raise
+                os.replace(f.name, cache_file)
+        self._compiled[key] = matcher  # type: ignore[index]
+        return matcher
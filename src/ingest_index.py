@@ -0,0 +1,171 @@
+"""ingest_index.py
+Persistent SQLite index of every camera file already offloaded.
+
+Cards that are not formatted between shoots would otherwise be copied
+again into every new ``{date}-{title}`` folder.  :class:`IngestIndex`
+remembers each offloaded file by
+
+- camera file name (``DSC00001.ARW``), size and capture time – the
+  source mtime in whole seconds, which the camera sets when shooting
+  (FAT/exFAT keep 2 s / 10 ms resolution, so seconds compare safely),
+- a fast partial hash: BLAKE2b of the size plus the first and last
+  ``PARTIAL_BYTES`` – camera file numbers wrap around, so name + size +
+  time alone is not proof of identity,
+
+together with the path of the copy.  A unique index on
+``(name, size, capture_s, partial_hash)`` makes every lookup an index
+seek, so checking a card stays fast with hundreds of thousands of rows;
+the partial hash of a source file is only read when name, size and time
+already match a row.
+
+:meth:`IngestIndex.split_known` separates new files from known ones;
+known files are skipped, or hardlinked / reflinked from the earlier copy
+(:func:`link_file`, falling back to a normal copy when the file system
+cannot do it).  The database lives on the local disk by default –
+SQLite's WAL mode is unreliable on network shares.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from copy_engine import PARTIAL_SUFFIX, CopyJob
+
+DEFAULT_INDEX_PATH = Path.home() / ".cache" / "sony_camera_fastcopy" / "ingest_index.sqlite"
+PARTIAL_BYTES = 64 * 1024
+KNOWN_MODES = ("skip", "hardlink", "reflink")
+FICLONE = 0x40049409  # Linux ioctl: share extents (btrfs, XFS, bcachefs)
+
+
+def partial_hash(path: str, size: Optional[int] = None) -> str:
+    """BLAKE2b of the size, the first and the last ``PARTIAL_BYTES`` of *path*."""
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size is None:
+            size = os.fstat(f.fileno()).st_size
+        hasher.update(size.to_bytes(8, "little"))
+        hasher.update(f.read(PARTIAL_BYTES))
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(-PARTIAL_BYTES, os.SEEK_END)
+        hasher.update(f.read(PARTIAL_BYTES))
+    return hasher.hexdigest()
+
+
+def capture_seconds(job: CopyJob) -> int:
+    return job.mtime_ns // 1_000_000_000
+
+
+def link_file(existing: str, dest: str, mode: str) -> None:
+    """Create *dest* as a hardlink / reflink of *existing*; raises OSError if unsupported."""
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    if mode == "hardlink":
+        if os.path.exists(dest):
+            os.remove(dest)
+        os.link(existing, dest)
+        return
+    if mode != "reflink":
+        raise ValueError(f"mode must be 'hardlink' or 'reflink', got {mode!r}")
+    try:
+        import fcntl
+    except ImportError as e:  # Windows: no FICLONE
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform") from e
+    partial = dest + PARTIAL_SUFFIX
+    try:
+        with open(existing, "rb") as fsrc, open(partial, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(existing, partial)
+        os.replace(partial, dest)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+
+
+class IngestIndex:
+    """SQLite-backed ingest index; safe to share between copy threads."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH, commit_every: int = 200) -> None:
+        self.path = Path(path)
+        self.commit_every = max(1, commit_every)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingested ("
+            " name TEXT NOT NULL, size INTEGER NOT NULL, capture_s INTEGER NOT NULL,"
+            " partial_hash TEXT NOT NULL, path TEXT NOT NULL, ingested REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ingested_key ON ingested(name, size, capture_s, partial_hash)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self) -> "IngestIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ingested").fetchone()[0]
+
+    def lookup(self, job: CopyJob) -> Optional[str]:
+        """Path of an earlier copy of *job*'s source that still exists, or None."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT partial_hash, path FROM ingested WHERE name=? AND size=? AND capture_s=?",
+                (os.path.basename(job.src), job.size, capture_seconds(job)),
+            ).fetchall()
+        if not rows:
+            return None
+        digest = partial_hash(job.src, job.size)
+        for row_hash, path in rows:
+            if row_hash == digest and os.path.isfile(path) and os.path.getsize(path) == job.size:
+                return path
+        return None
+
+    def split_known(self, jobs: Sequence[CopyJob]) -> Tuple[List[CopyJob], List[Tuple[CopyJob, str]]]:
+        """``(new jobs, [(known job, path of its earlier copy)])``."""
+        new: List[CopyJob] = []
+        known: List[Tuple[CopyJob, str]] = []
+        for job in jobs:
+            try:
+                existing = self.lookup(job)
+            except OSError:
+                existing = None  # unreadable source: let the copy report it
+            if existing is None or os.path.abspath(existing) == os.path.abspath(job.dest):
+                new.append(job)
+            else:
+                known.append((job, existing))
+        return new, known
+
+    def add(self, job: CopyJob, path: Optional[str] = None) -> None:
+        """Index a finished copy (*path* defaults to ``job.dest``; hashed from the copy, not the card)."""
+        path = os.path.abspath(path or job.dest)
+        digest = partial_hash(path, job.size)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested (name, size, capture_s, partial_hash, path, ingested)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.basename(job.src), job.size, capture_seconds(job), digest, path, time.time()),
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
@@ -0,0 +1,314 @@
+"""instrumentation.py
+Structured timing, metrics and logging for the pipeline stages.
+
+A :class:`Tracer` collects, for one run:
+
+- wall and CPU time plus cue counts per stage – :meth:`Tracer.stage`
+  around blocking work, :meth:`Tracer.wrap` around streaming generator
+  stages (reported as time spent in that stage alone, upstream excluded),
+- latency histograms (every LLM request) and plain counters,
+- cache hit rates and the peak RSS of the process.
+
+Events are appended to a JSON-lines *trace* as they happen; :meth:`Tracer.close`
+adds a summary event and, optionally, writes a Prometheus text-format
+file (e.g. for node_exporter's textfile collector).  With a *profile_dir*
+every :meth:`~Tracer.stage` also runs under cProfile and dumps
+``<stage>.pstats`` (``python -m pstats`` to inspect).
+
+Per-cue messages are logged at DEBUG, so they stay off stdout unless
+asked for; :func:`setup_logging` takes the level from the command line or
+``SUBTITLE_LOG_LEVEL``.
+"""
+
+import bisect
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+log = logging.getLogger("subtitle_pipeline")
+
+# Upper bounds (sec) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = "subtitle"
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """Log plain messages to stderr at *level* (default ``$SUBTITLE_LOG_LEVEL`` or INFO).
+
+    Only the pipeline's own logger follows *level*; libraries stay at WARNING.
+    """
+    level = (level or os.environ.get("SUBTITLE_LOG_LEVEL") or "INFO").upper()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    log.setLevel(level)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, ``None`` where unsupported (Windows)."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux reports KiB
+
+# -------------------------
+# Metric types
+# -------------------------
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    return value if value is not None and value != float("inf") else None
+
+
+class Histogram:
+    """Fixed-bucket histogram; safe to observe from several threads."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the *q*-quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": list(self.buckets),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count,
+            # Beyond the last bucket there is no bound to report
+            "p50": _finite(self.quantile(0.5)),
+            "p95": _finite(self.quantile(0.95)),
+        }
+
+
+class StageStats:
+    """Accumulated time of one stage.
+
+    For a streaming stage ``wall``/``cpu`` are inclusive of its *upstream*
+    (pulling a cue runs the stages before it); :meth:`to_dict` reports the
+    stage's own share.
+    """
+
+    __slots__ = ("name", "wall", "cpu", "cues", "upstream")
+
+    def __init__(self, name: str, upstream: Optional["StageStats"] = None) -> None:
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.cues = 0
+        self.upstream = upstream
+
+    def to_dict(self) -> Dict[str, Any]:
+        up_wall = self.upstream.wall if self.upstream is not None else 0.0
+        up_cpu = self.upstream.cpu if self.upstream is not None else 0.0
+        return {
+            "stage": self.name,
+            "wall_s": round(max(0.0, self.wall - up_wall), 6),
+            "cpu_s": round(max(0.0, self.cpu - up_cpu), 6),
+            "cues": self.cues,
+        }
+
+# -------------------------
+# Tracer
+# -------------------------
+
+class Tracer:
+    def __init__(
+        self,
+        trace_path: Optional[Path] = None,
+        metrics_path: Optional[Path] = None,
+        profile_dir: Optional[Path] = None,
+    ) -> None:
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        # Per-cue timers in wrap() cost a few µs per cue, so they only run when reported
+        self.enabled = bool(trace_path or metrics_path or profile_dir)
+        self.stages: Dict[str, StageStats] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.caches: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        if trace_path:
+            Path(trace_path).parent.mkdir(parents=True, exist_ok=True)
+            self._trace = Path(trace_path).open("a", encoding="utf-8")
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.event("start", pid=os.getpid(), argv=sys.argv)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """Tracer configured by ``SUBTITLE_TRACE`` / ``SUBTITLE_METRICS`` / ``SUBTITLE_PROFILE``."""
+        return cls(
+            os.environ.get("SUBTITLE_TRACE") or None,
+            os.environ.get("SUBTITLE_METRICS") or None,
+            os.environ.get("SUBTITLE_PROFILE") or None,
+        )
+
+    def event(self, kind: str, **fields: Any) -> None:
+        if self._trace is None:
+            return
+        line = json.dumps({"ts": time.time(), "event": kind, **fields}, ensure_ascii=False, default=str)
+        with self._lock:
+            self._trace.write(line + "\n")
+            self._trace.flush()
+
+    def _stats(self, name: str, upstream: Optional[str] = None) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name, self.stages.get(upstream) if upstream else None)
+        return stats
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Time a blocking stage; set ``.cues`` on the yielded stats to record a count."""
+        stats = self._stats(name)
+        profiler = cProfile.Profile() if self.profile_dir is not None else None
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield stats
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(str(self.profile_dir / f"{name}.pstats"))
+            stats.wall += time.perf_counter() - wall0
+            stats.cpu += time.process_time() - cpu0
+            self.event("stage", **stats.to_dict())
+            log.debug("  [%s] %.3f s wall, %.3f s CPU, %d cues", name, stats.wall, stats.cpu, stats.cues)
+
+    def wrap(self, cues: Iterable, name: str, upstream: Optional[str] = None) -> Iterable:
+        """Count and time the cues a streaming stage yields.
+
+        *upstream* names the wrapped stage feeding this one, whose time is
+        subtracted in the report.  Returns *cues* untouched when disabled.
+        """
+        if not self.enabled:
+            return cues
+        return self._timed(cues, self._stats(name, upstream))
+
+    def _timed(self, cues: Iterable, stats: StageStats) -> Iterator:
+        it = iter(cues)
+        perf, cpu = time.perf_counter, time.process_time
+        try:
+            while True:
+                wall0, cpu0 = perf(), cpu()
+                try:
+                    cue = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    stats.wall += perf() - wall0
+                    stats.cpu += cpu() - cpu0
+                stats.cues += 1
+                yield cue
+        finally:
+            self.event("stage", **stats.to_dict())
+
+    def observe(self, name: str, value: float) -> None:
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, Histogram())
+        hist.observe(value)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_cache(self, name: str, hits: int, misses: int) -> None:
+        self.caches[name] = (hits, misses)
+
+    # -------------------------
+    # Reporting
+    # -------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "stages": [stats.to_dict() for stats in self.stages.values()],
+            "histograms": {name: hist.to_dict() for name, hist in self.histograms.items()},
+            "counters": dict(self.counters),
+            "caches": {
+                name: {"hits": h, "misses": m, "hit_rate": h / (h + m) if h + m else None}
+                for name, (h, m) in self.caches.items()
+            },
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+    def prometheus_text(self, summary: Optional[Dict[str, Any]] = None) -> str:
+        summary = summary or self.summary()
+        p = PROMETHEUS_PREFIX
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: Iterable[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            lines.extend(f"{p}_{name}{labels} {value}" for labels, value in samples)
+
+        stages = summary["stages"]
+        metric("stage_wall_seconds", "gauge", "Wall time spent in each stage.",
+               [(f'{{stage="{s["stage"]}"}}', s["wall_s"]) for s in stages])
+        metric("stage_cpu_seconds", "gauge", "Process CPU time spent in each stage.",
+               [(f'{{stage="{s["stage"]}"}}', s["cpu_s"]) for s in stages])
+        metric("stage_cues", "gauge", "Cues produced by each stage.",
+               [(f'{{stage="{s["stage"]}"}}', s["cues"]) for s in stages])
+        for name, hist in self.histograms.items():
+            cumulative, samples = 0, []
+            for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f'_bucket{{le="{le}"}}', cumulative))
+            samples += [("_sum", hist.sum), ("_count", hist.count)]
+            lines.append(f"# HELP {p}_{name} Distribution of {name.replace('_', ' ')}.")
+            lines.append(f"# TYPE {p}_{name} histogram")
+            lines.extend(f"{p}_{name}{suffix} {value}" for suffix, value in samples)
+        for name, value in summary["counters"].items():
+            metric(f"{name}_total", "counter", name.replace("_", " ") + ".", [("", value)])
+        caches = summary["caches"]
+        if caches:
+            metric("cache_hits_total", "counter", "Cache hits.", [(f'{{cache="{n}"}}', c["hits"]) for n, c in caches.items()])
+            metric("cache_misses_total", "counter", "Cache misses.", [(f'{{cache="{n}"}}', c["misses"]) for n, c in caches.items()])
+        if summary["peak_rss_bytes"] is not None:
+            metric("peak_rss_bytes", "gauge", "Peak resident set size.", [("", summary["peak_rss_bytes"])])
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> Dict[str, Any]:
+        """Write the summary event and the Prometheus file; returns the summary."""
+        summary = self.summary()
+        self.event("summary", **summary)
+        if self.metrics_path is not None:
+            self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.metrics_path.with_name(self.metrics_path.name + ".tmp")
+            tmp.write_text(self.prometheus_text(summary), encoding="utf-8")
+            os.replace(tmp, self.metrics_path)  # scrapers never see a half-written file
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+        return summary
@@ -0,0 +1,96 @@
+"""llm_cache.py
+Persistent, content-addressed cache for LLM punctuation results.
+
+Entries are keyed by a SHA-256 of (model, system prompt, temperature,
+cue text), so a rerun only pays for cues whose text actually changed and
+any prompt/model change invalidates naturally.  The SQLite table is kept
+under ``max_entries`` by evicting the least recently used rows.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Mapping
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "subtitle_pipeline" / "llm_punctuation.sqlite"
+
+
+def cache_key(model: str, system_prompt: str, temperature: float, text: str) -> str:
+    payload = json.dumps([model, system_prompt, temperature, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PunctuationCache:
+    """SQLite-backed LRU cache; safe to share between client threads."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: int = 200_000) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS punctuation ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS punctuation_lru ON punctuation(last_used)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM punctuation").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Return the cached values for *keys* and bump their LRU stamp."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # stay below SQLite's host parameter limit
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, value FROM punctuation WHERE key IN ({marks})", chunk)
+                found.update(rows.fetchall())
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE punctuation SET last_used=? WHERE key=?", [(now, k) for k in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Mapping[str, str]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO punctuation (key, value, last_used) VALUES (?, ?, ?)",
+                [(k, v, now) for k, v in items.items()],
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM punctuation").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM punctuation WHERE key IN "
+                    "(SELECT key FROM punctuation ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
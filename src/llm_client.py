@@ -0,0 +1,214 @@
+"""llm_client.py
+Batched, concurrent client for the local OpenAI-compatible LLM server.
+
+Instead of one blocking ``requests.post`` per cue, :class:`LLMClient`
+
+- keeps one pooled HTTP session for all requests,
+- packs ``batch_size`` cues into one chat completion with a JSON schema
+  response (``{"results": [...]}`` in input order),
+- runs up to ``max_workers`` requests concurrently,
+- retries rate limits (429), server errors (5xx) and connection errors
+  with exponential backoff and jitter; other 4xx answers fail at once,
+- optionally consults a :class:`~llm_cache.PunctuationCache` first, so
+  only cues whose text changed are sent to the model.
+
+Results always come back in input order.  A batch whose response cannot
+be parsed (or has the wrong length) is retried cue by cue; a cue that
+still fails keeps its original text, as before.
+
+Usage
+-----
+    with LLMClient() as client:
+        punctuated = client.punctuate_many(texts)
+"""
+
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import Tracer
+from llm_cache import PunctuationCache, cache_key
+
+DEFAULT_URL = "http://127.0.0.1:1234/v1/chat/completions"
+DEFAULT_MODEL = "gemma-3-12b-it-gat"
+
+PUNCTUATION_PROMPT = (
+    '你是一個字幕標點符號助手。請為下列字幕文本加入適當的標點符號，包括句號、逗號、問號、驚嘆號等。'
+    '保持原文內容不變，只加入標點符號。不要分段或換行，只在一行內加入標點符號。'
+    '只回傳加了標點符號的文本，不要加註解。'
+)
+BATCH_INSTRUCTION = (
+    '輸入是 JSON 物件 {"texts": [...]}，請對每一段文字分別處理，'
+    '並以 {"results": [...]} 回傳，順序與數量必須和輸入完全相同。'
+)
+
+_BATCH_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "punctuated_texts",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"results": {"type": "array", "items": {"type": "string"}}},
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class LLMError(RuntimeError):
+    """Raised when a request still fails after all retries."""
+
+
+def _retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class LLMClient:
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        model: str = DEFAULT_MODEL,
+        system_prompt: str = PUNCTUATION_PROMPT,
+        temperature: float = 0.2,
+        batch_size: int = 8,
+        max_workers: int = 4,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        cache: Optional[PunctuationCache] = None,
+        tracer: Optional[Tracer] = None,
+    ) -> None:
+        self.url = url
+        self.model = model
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.tracer = tracer
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "LLMClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -------------------------
+    # Transport
+    # -------------------------
+
+    def _chat(self, system_prompt: str, user_content: str, response_format: Optional[Dict] = None) -> str:
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            "temperature": self.temperature,
+        }
+        if response_format is not None:
+            data["response_format"] = response_format
+
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries):
+            if attempt:
+                delay = self.backoff * (2 ** (attempt - 1))
+                time.sleep(delay * (1 + random.random() * 0.25))
+            t0 = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=data, timeout=self.timeout)
+                if self.tracer is not None:
+                    self.tracer.observe("llm_request_seconds", time.perf_counter() - t0)
+                if response.status_code == 200:
+                    return response.json()["choices"][0]["message"]["content"].strip()
+                last_error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                if not _retryable(response.status_code):
+                    if self.tracer is not None:
+                        self.tracer.incr("llm_request_errors")
+                    raise last_error  # bad request / auth / wrong URL: retrying cannot help
+            except (requests.ConnectionError, requests.Timeout, ValueError, KeyError, IndexError) as e:
+                last_error = e
+            if self.tracer is not None:
+                self.tracer.incr("llm_request_errors")
+        raise LLMError(f"LLM request failed after {self.max_retries} attempts: {last_error}")
+
+    # -------------------------
+    # Punctuation
+    # -------------------------
+
+    def _try_punctuate(self, text: str) -> Optional[str]:
+        try:
+            return self._chat(self.system_prompt, text)
+        except LLMError:
+            return None
+
+    def punctuate(self, text: str) -> str:
+        """Punctuate a single cue; returns *text* unchanged on failure."""
+        return self.punctuate_many([text])[0]
+
+    def _punctuate_batch(self, texts: Sequence[str]) -> List[Optional[str]]:
+        if len(texts) == 1:
+            return [self._try_punctuate(texts[0])]
+        try:
+            content = self._chat(
+                self.system_prompt + BATCH_INSTRUCTION,
+                json.dumps({"texts": list(texts)}, ensure_ascii=False),
+                response_format=_BATCH_SCHEMA,
+            )
+            results = json.loads(content)["results"]
+            if isinstance(results, list) and len(results) == len(texts):
+                return [str(r).strip() for r in results]
+        except (LLMError, ValueError, KeyError, TypeError):
+            pass
+        # Malformed batch answer – fall back to one request per cue
+        return [self._try_punctuate(text) for text in texts]
+
+    def _request_many(self, texts: Sequence[str]) -> List[Optional[str]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            results = executor.map(self._punctuate_batch, batches)
+            return [text for batch in results for text in batch]
+
+    def punctuate_many(self, texts: Sequence[str]) -> List[str]:
+        """Punctuate *texts* in batches, concurrently, preserving order.
+
+        Cached cues are answered locally; failed cues keep their text and
+        are not cached.
+        """
+        if self.cache is None:
+            return [r if r is not None else t for t, r in zip(texts, self._request_many(texts))]
+
+        keys = [cache_key(self.model, self.system_prompt, self.temperature, t) for t in texts]
+        cached = self.cache.get_many(keys)
+        todo = list(dict.fromkeys(k for k in keys if k not in cached))
+        key_text = dict(zip(keys, texts))
+        fresh = dict(zip(todo, self._request_many([key_text[k] for k in todo])))
+        self.cache.put_many({k: v for k, v in fresh.items() if v is not None})
+
+        results = []
+        for key, text in zip(keys, texts):
+            value = cached.get(key)
+            if value is None:
+                value = fresh.get(key)
+            results.append(value if value is not None else text)
+        return results
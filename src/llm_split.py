@@ -0,0 +1,61 @@
+"""llm_split.py
+Shared pieces of the LLM split stage: punctuation-based segmentation of a
+cue's punctuated text and re-timing of the resulting sub-cues.
+"""
+
+from typing import List, Optional
+
+from srt_cues import Cue
+from word_align import WordTimeline, align_segments, uniform_times
+
+# Cues longer than this (characters) are sent to the LLM
+LLM_MIN_CHARS = 16
+SPLIT_PUNCTUATION = ('。', '！', '？')
+
+
+def split_by_punctuation(text: str) -> List[str]:
+    """只根據標點符號將文本分段，並移除分段標點符號"""
+    segments = []
+    current_segment = ""
+
+    for char in text:
+        current_segment += char
+
+        # 檢查是否遇到分段標點符號
+        if char in SPLIT_PUNCTUATION:
+            # 移除標點符號後加入分段
+            segment = current_segment[:-1].strip()
+            if segment:  # 只添加非空的分段
+                segments.append(segment)
+            current_segment = ""
+
+    # 處理剩餘的文本
+    if current_segment.strip():
+        segments.append(current_segment.strip())
+
+    return segments
+
+
+def split_cue(
+    cue: Cue,
+    punctuated_text: str,
+    timeline: Optional[WordTimeline] = None,
+    word_lo: int = 0,
+    word_hi: int = 0,
+) -> List[Cue]:
+    """Split *cue* at sentence punctuation of *punctuated_text*.
+
+    Sub-cues are timed from words ``word_lo..word_hi`` of *timeline* when
+    given, otherwise by equal slices.  Returns ``[cue]`` if nothing splits.
+    """
+    segments = split_by_punctuation(punctuated_text)
+    if len(segments) <= 1:
+        return [cue]
+    if timeline is not None:
+        times = align_segments(segments, timeline, word_lo, word_hi, cue.start, cue.end)
+    else:
+        times = uniform_times(cue.start, cue.end, len(segments))
+    return [
+        Cue(f"{cue.id}_{k + 1}", seg_start, seg_end, seg)
+        for k, (seg, (seg_start, seg_end)) in enumerate(zip(segments, times))
+    ]
@@ -0,0 +1,118 @@
+"""llm_stub_server.py
+Minimal OpenAI-compatible ``/v1/chat/completions`` stub for local runs.
+
+It "punctuates" deterministically – a ``，`` every *clause* characters and
+a ``。`` every *sentence* characters – and understands the batched
+``{"texts": [...]}`` request format of :mod:`llm_client`.  Useful for
+exercising the LLM split stage and benchmarks without a real model.
+
+For tests, :func:`start_stub_server` can inject faults: *statuses* are
+answered (one per request, in order) before normal replies start, and
+*malformed_batches* answers batch requests with one result too few.
+Every request body is appended to ``server.requests``.
+
+Usage
+-----
+python src/llm_stub_server.py --port 1234 --latency 0.05
+"""
+
+import argparse
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Tuple
+
+
+def fake_punctuate(text: str, clause: int = 6, sentence: int = 12) -> str:
+    out = []
+    for i, ch in enumerate(text.replace(" ", ""), 1):
+        out.append(ch)
+        if i % sentence == 0:
+            out.append("。")
+        elif i % clause == 0:
+            out.append("，")
+    return "".join(out)
+
+
+def _make_handler(latency: float, malformed_batches: bool = False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled sessions are exercised
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            server = self.server
+            with server.lock:
+                server.requests.append(body)
+                status = server.statuses.popleft() if server.statuses else 200
+            if status != 200:
+                payload = json.dumps({"error": {"message": f"stub error {status}"}}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            user = body["messages"][-1]["content"]
+            try:
+                texts = json.loads(user)["texts"]
+                results = [fake_punctuate(t) for t in texts]
+                if malformed_batches:
+                    results = results[:-1]
+                content = json.dumps({"results": results}, ensure_ascii=False)
+            except (ValueError, KeyError, TypeError):
+                content = fake_punctuate(user)
+            if latency:
+                time.sleep(latency)
+            payload = json.dumps(
+                {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args) -> None:  # keep stdout quiet
+            pass
+
+    return Handler
+
+
+def _make_server(
+    port: int, latency: float, statuses: Iterable[int] = (), malformed_batches: bool = False,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(latency, malformed_batches))
+    server.lock = threading.Lock()
+    server.requests = []
+    server.statuses = collections.deque(statuses)
+    return server
+
+
+def start_stub_server(
+    port: int = 0,
+    latency: float = 0.0,
+    statuses: Iterable[int] = (),
+    malformed_batches: bool = False,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread; returns ``(server, completions_url)``."""
+    server = _make_server(port, latency, statuses, malformed_batches)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def main() -> None:  # pragma: no cover
+    p = argparse.ArgumentParser(description="OpenAI-compatible punctuation stub server")
+    p.add_argument("--port", type=int, default=1234)
+    p.add_argument("--latency", type=float, default=0.0, help="Artificial delay per request (sec)")
+    args = p.parse_args()
+    server = _make_server(args.port, args.latency)
+    print(f"Stub LLM listening on http://127.0.0.1:{args.port}/v1/chat/completions")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
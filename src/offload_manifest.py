@@ -0,0 +1,275 @@
+"""offload_manifest.py
+Resumable, verifiable camera offload via a hash manifest.
+
+Every destination folder keeps ``.offload-manifest.jsonl``: a header line
+followed by one JSON record per completed file – path relative to the
+folder, size, the source's and the copy's ``mtime_ns`` and the checksum
+computed while copying (:mod:`copy_engine`, ``hash_algo``).  Records are
+appended (and flushed every ``flush_every`` files) as copies finish, so
+after a pulled card or a crash the manifest lists exactly the files that
+are complete; later records for the same path win.
+
+On a rerun :meth:`OffloadManifest.pending` skips a file when its record
+matches the source (size + mtime) and the destination (size + mtime),
+optionally also re-hashing the destination (``check_hash``).  Anything
+else is copied again.  Files hard/reflinked from an earlier offload take
+their checksum from that folder's manifest (:meth:`~OffloadManifest.linked_digest`).
+
+:func:`verify` re-hashes the destination tree in parallel against the
+manifest::
+
+    python src/offload_manifest.py "Z:\\Vod_Eggs\\a7r5 US\\20250101-title" --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from checkpoint import atomic_write_text
+from copy_engine import PARTIAL_SUFFIX, CopyJob, hash_file
+
+MANIFEST_NAME = ".offload-manifest.jsonl"
+MANIFEST_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    path: str             # relative to the manifest folder, "/"-separated
+    size: int
+    src_mtime_ns: int
+    mtime_ns: int         # of the copy
+    algo: Optional[str]
+    digest: Optional[str]
+
+
+class VerifyReport(NamedTuple):
+    ok: List[str]
+    missing: List[str]
+    mismatched: List[str]    # size or checksum differs
+    unhashed: List[str]      # recorded without a checksum; size checked only
+    untracked: List[str]     # in the folder but not in the manifest
+
+    @property
+    def passed(self) -> bool:
+        return not (self.missing or self.mismatched)
+
+
+class OffloadManifest:
+    def __init__(self, root: str, algo: Optional[str] = None, flush_every: int = 50) -> None:
+        self.root = os.path.abspath(root)
+        self.algo = algo  # of the checksums passed to record()
+        self.path = os.path.join(self.root, MANIFEST_NAME)
+        self.flush_every = max(1, flush_every)
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._linked_lock = threading.Lock()
+        self._linked: Dict[str, Tuple[str, Dict[str, ManifestEntry]]] = {}  # folder -> earlier manifest
+        os.makedirs(self.root, exist_ok=True)
+        lines = Path(self.path).read_text(encoding="utf-8").splitlines() if os.path.exists(self.path) else []
+        if lines and self._header_matches(lines[0]):
+            valid = self._replay(lines[1:])
+            if valid < len(lines) - 1 or valid > 2 * len(self.entries) + 100:
+                # Drop a torn last record / superseded records
+                self._rewrite()
+            self._f = open(self.path, "a", encoding="utf-8")
+        else:
+            self._f = open(self.path, "w", encoding="utf-8")
+            self._f.write(json.dumps({"version": MANIFEST_VERSION}) + "\n")
+            self._f.flush()
+
+    @staticmethod
+    def _header_matches(line: str) -> bool:
+        try:
+            return json.loads(line).get("version") == MANIFEST_VERSION
+        except (ValueError, AttributeError):
+            return False
+
+    def _replay(self, lines: List[str]) -> int:
+        return _parse_entries(lines, self.entries)
+
+    def _rewrite(self) -> None:
+        records = [json.dumps({"version": MANIFEST_VERSION})]
+        records += [json.dumps(list(entry), ensure_ascii=False) for entry in self.entries.values()]
+        atomic_write_text(Path(self.path), "\n".join(records) + "\n")
+
+    def relpath(self, dest: str) -> str:
+        return os.path.relpath(os.path.abspath(dest), self.root).replace(os.sep, "/")
+
+    # -------------------------
+    # Skip / record
+    # -------------------------
+
+    def is_current(self, job: CopyJob, check_hash: bool = False) -> bool:
+        """True if *job*'s destination is a complete, unchanged copy of an unchanged source."""
+        entry = self.entries.get(self.relpath(job.dest))
+        if entry is None or entry.size != job.size or entry.src_mtime_ns != job.mtime_ns:
+            return False
+        try:
+            st = os.stat(job.dest)
+        except OSError:
+            return False
+        if st.st_size != entry.size or st.st_mtime_ns != entry.mtime_ns:
+            return False
+        if check_hash and entry.digest is not None:
+            return hash_file(job.dest, entry.algo) == entry.digest
+        return True
+
+    def pending(self, jobs: Sequence[CopyJob], check_hash: bool = False, workers: int = 4) -> Tuple[List[CopyJob], int]:
+        """Jobs that still need copying, and the number skipped as identical."""
+        if check_hash:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                current = list(pool.map(lambda job: self.is_current(job, True), jobs))
+        else:
+            current = [self.is_current(job) for job in jobs]
+        todo = [job for job, skip in zip(jobs, current) if not skip]
+        return todo, len(jobs) - len(todo)
+
+    def record(self, job: CopyJob, digest: Optional[str]) -> None:
+        """Append a completed copy (thread-safe); an ``on_copied`` callback for :class:`~copy_engine.CopyEngine`."""
+        st = os.stat(job.dest)
+        entry = ManifestEntry(self.relpath(job.dest), st.st_size, job.mtime_ns, st.st_mtime_ns,
+                              self.algo if digest is not None else None, digest)
+        with self._lock:
+            self._f.write(json.dumps(list(entry), ensure_ascii=False) + "\n")
+            self.entries[entry.path] = entry
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._f.flush()
+                self._pending = 0
+
+    def _enclosing_manifest(self, path: str) -> Tuple[str, Dict[str, ManifestEntry]]:
+        """``(root, entries)`` of the nearest manifest above *path*; ``("", {})`` if none."""
+        folder = os.path.dirname(os.path.abspath(path))
+        with self._linked_lock:
+            if folder not in self._linked:
+                root, entries = folder, {}
+                while True:
+                    candidate = os.path.join(root, MANIFEST_NAME)
+                    if os.path.isfile(candidate):
+                        entries = read_entries(candidate)
+                        break
+                    parent = os.path.dirname(root)
+                    if parent == root:
+                        root = ""
+                        break
+                    root = parent
+                self._linked[folder] = (root, entries)
+            return self._linked[folder]
+
+    def linked_digest(self, existing: str, dest: str) -> Optional[str]:
+        """Checksum of *dest*, a hard/reflink of the earlier copy *existing* (None without ``algo``).
+
+        Taken from the manifest of *existing*'s offload folder when it
+        still describes that file with the same algorithm, else hashed.
+        """
+        if self.algo is None:
+            return None
+        root, entries = self._enclosing_manifest(existing)
+        if root:
+            entry = entries.get(os.path.relpath(os.path.abspath(existing), root).replace(os.sep, "/"))
+            if entry is not None and entry.algo == self.algo and entry.digest is not None:
+                st = os.stat(existing)
+                if st.st_size == entry.size and st.st_mtime_ns == entry.mtime_ns:
+                    return entry.digest
+        return hash_file(dest, self.algo)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+                self._f.close()
+
+    def __enter__(self) -> "OffloadManifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _parse_entries(lines: Sequence[str], entries: Dict[str, ManifestEntry]) -> int:
+    """Add the records in *lines* to *entries*; returns the number of valid lines."""
+    for n, line in enumerate(lines):
+        try:
+            entry = ManifestEntry(*json.loads(line))
+        except (ValueError, TypeError):
+            return n  # torn write at the crash point
+        entries[entry.path] = entry
+    return len(lines)
+
+
+def read_entries(path: str) -> Dict[str, ManifestEntry]:
+    """Records of the manifest file *path*, read-only; empty for another version."""
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    entries: Dict[str, ManifestEntry] = {}
+    if lines and OffloadManifest._header_matches(lines[0]):
+        _parse_entries(lines[1:], entries)
+    return entries
+
+
+# -------------------------
+# Verify
+# -------------------------
+
+def verify(root: str, workers: int = 4) -> VerifyReport:
+    """Check every manifest entry under *root* (size, and checksum if recorded) in parallel."""
+    manifest = OffloadManifest(root)
+    manifest.close()
+    entries = list(manifest.entries.values())
+
+    def check(entry: ManifestEntry) -> str:
+        path = os.path.join(manifest.root, *entry.path.split("/"))
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return "missing"
+        if size != entry.size:
+            return "mismatched"
+        if entry.digest is None:
+            return "unhashed"
+        return "ok" if hash_file(path, entry.algo) == entry.digest else "mismatched"
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        outcomes = list(pool.map(check, entries))
+    groups: Dict[str, List[str]] = {"ok": [], "missing": [], "mismatched": [], "unhashed": []}
+    for entry, outcome in zip(entries, outcomes):
+        groups[outcome].append(entry.path)
+
+    untracked = []
+    for dirpath, _, files in os.walk(manifest.root):
+        for name in files:
+            if name.endswith(PARTIAL_SUFFIX) or (dirpath == manifest.root and name == MANIFEST_NAME):
+                continue
+            rel = manifest.relpath(os.path.join(dirpath, name))
+            if rel not in manifest.entries:
+                untracked.append(rel)
+    return VerifyReport(groups["ok"], groups["missing"], groups["mismatched"], groups["unhashed"], sorted(untracked))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify an offload folder against its hash manifest")
+    parser.add_argument("folder", help="Destination folder holding " + MANIFEST_NAME)
+    parser.add_argument("--workers", type=int, default=4, help="Parallel hashing threads")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(os.path.join(args.folder, MANIFEST_NAME)):
+        print(f"No {MANIFEST_NAME} in {args.folder}")
+        return 2
+    report = verify(args.folder, args.workers)
+    for kind in ("missing", "mismatched", "unhashed", "untracked"):
+        for path in getattr(report, kind):
+            print(f"{kind}: {path}")
+    print(
+        f"ok {len(report.ok)}, missing {len(report.missing)}, mismatched {len(report.mismatched)}, "
+        f"unhashed {len(report.unhashed)}, untracked {len(report.untracked)}"
+    )
+    return 0 if report.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
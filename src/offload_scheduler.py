@@ -0,0 +1,200 @@
+"""offload_scheduler.py
+Concurrent multi-card offload: one copy pipeline per source device.
+
+A camera with two slots mounts two physical cards (e.g. ``H:`` for
+JPEG/video, ``I:`` for RAW).  Copying them one after the other leaves
+one reader idle, so :func:`run_offload` groups the configured
+:class:`CopySource` entries by device and runs the groups at the same
+time:
+
+- every device gets its own pipeline thread and its own
+  :class:`~copy_engine.CopyEngine` (separate large/small worker pools);
+  folders on the same card are copied one after the other, so each card
+  is still read by one large-file stream at a time,
+- all sources are scanned up front (in parallel, one pipeline per
+  device) so one :class:`~copy_progress.TransferProgress` can show the
+  combined progress and ETA, with one MB/s per device.
+
+With a :class:`~offload_manifest.OffloadManifest` for the destination,
+files already recorded as identical are skipped before the totals are
+computed and every finished copy is appended to the manifest.  With an
+:class:`~ingest_index.IngestIndex`, files offloaded in earlier shoots are
+skipped or linked from their earlier copy (``known``) and new copies are
+indexed.
+
+The device of a source is its card's ``st_dev`` unless
+:attr:`CopySource.device` names it explicitly – two temp directories on
+one file system can stand in for two cards that way.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from copy_engine import CopyEngine, CopyJob, CopyStats, scan_tree
+from copy_progress import SourceStats, TransferProgress
+from ingest_index import KNOWN_MODES, IngestIndex, link_file
+from offload_manifest import OffloadManifest
+
+
+class CopySource(NamedTuple):
+    label: str                     # e.g. "JPEG照片"; unique, used for progress
+    card: str                      # card root, e.g. "H:\\"
+    folder: str                    # "/"-separated path on the card, e.g. "M4ROOT/CLIP"
+    dest: str                      # subfolder of the destination, e.g. "MP4"
+    device: Optional[str] = None   # pipeline key; defaults to the card's device
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.card, *self.folder.split("/"))
+
+    @property
+    def card_name(self) -> str:
+        """``"H:"`` for ``"H:\\"``, the folder name for a mount point."""
+        drive = os.path.splitdrive(self.card)[0]
+        return drive or os.path.basename(self.card.rstrip("/\\")) or self.card
+
+    @property
+    def route(self) -> str:
+        return f"{self.card_name}: {self.folder} → {self.dest}"
+
+
+class OffloadReport(NamedTuple):
+    results: Dict[str, Optional[CopyStats]]   # per source label; None = source folder missing
+    devices: List[SourceStats]                # bandwidth per device pipeline
+    overall: SourceStats
+    skipped: Dict[str, int]                   # per source label; already in the manifest
+    known: Dict[str, int]                     # per source label; ingested before, not copied
+    linked: Dict[str, int]                    # per source label; hard/reflinked from an earlier copy
+
+
+def device_of(source: CopySource) -> str:
+    """Pipeline key and display name of *source*'s device."""
+    if source.device:
+        return source.device
+    try:
+        st_dev = os.stat(source.card).st_dev
+    except OSError:
+        return source.card_name
+    return f"dev{st_dev}"
+
+
+def group_by_device(sources: Sequence[CopySource]) -> Dict[str, List[CopySource]]:
+    """Sources per device pipeline, in configuration order; named after the first card on the device."""
+    keyed: Dict[str, List[CopySource]] = {}
+    for source in sources:
+        keyed.setdefault(device_of(source), []).append(source)
+    names: Dict[str, List[CopySource]] = {}
+    for group in keyed.values():
+        name = group[0].device or "+".join(dict.fromkeys(s.card_name for s in group))
+        names[name] = group
+    return names
+
+
+def run_offload(
+    sources: Sequence[CopySource],
+    destination: str,
+    engine_factory: Callable[[], CopyEngine] = CopyEngine,
+    bar: bool = True,
+    on_plan: Optional[Callable[[Dict[str, List[CopyJob]]], None]] = None,
+    manifest: Optional[OffloadManifest] = None,
+    check_hash: bool = False,
+    index: Optional[IngestIndex] = None,
+    known: str = "skip",
+) -> OffloadReport:
+    """Copy every existing source folder to ``destination/<dest>``, one concurrent pipeline per device.
+
+    *on_plan* is called with the jobs still to copy per label before
+    copying starts (e.g. to print totals).  *check_hash* re-hashes
+    destination files the manifest lists before skipping them.  *known*
+    (``"skip"``, ``"hardlink"``, ``"reflink"``) decides what happens to
+    files the ingest *index* has seen; links that fail are copied.
+    """
+    if known not in KNOWN_MODES:
+        raise ValueError(f"known must be one of {KNOWN_MODES}, got {known!r}")
+    groups = group_by_device(sources)
+    device_names = {s.label: name for name, group in groups.items() for s in group}
+
+    skipped: Dict[str, int] = {}
+    known_counts: Dict[str, int] = {}
+    linked: Dict[str, int] = {}
+
+    def scan(group: List[CopySource]) -> Dict[str, List[CopyJob]]:
+        found = {}
+        for s in group:
+            if not os.path.isdir(s.path):
+                continue
+            jobs = scan_tree(s.path, os.path.join(destination, s.dest))
+            if manifest is not None:
+                jobs, skipped[s.label] = manifest.pending(jobs, check_hash)
+            if index is not None:
+                jobs, seen = index.split_known(jobs)
+                if known != "skip":
+                    for job, existing in seen:
+                        try:
+                            link_file(existing, job.dest, known)
+                        except OSError:
+                            jobs.append(job)  # e.g. another volume / no reflink support
+                            continue
+                        linked[s.label] = linked.get(s.label, 0) + 1
+                        if manifest is not None:
+                            manifest.record(job, manifest.linked_digest(existing, job.dest))
+                        index.add(job)  # point the index at the newest copy
+                else:
+                    known_counts[s.label] = len(seen)
+            found[s.label] = jobs
+        return found
+
+    def on_copied(job: CopyJob, digest: Optional[str]) -> None:
+        if manifest is not None:
+            manifest.record(job, digest)
+        if index is not None:
+            index.add(job)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(groups)), thread_name_prefix="offload") as pool:
+        scans: Dict[str, List[CopyJob]] = {}
+        for found in pool.map(scan, groups.values()):
+            scans.update(found)
+        if on_plan is not None:
+            on_plan(scans)
+
+        progress = TransferProgress(
+            {label: sum(job.size for job in jobs) for label, jobs in scans.items()},
+            desc="複製全部",
+            bar=bar,
+            groups={label: device_names[label] for label in scans},
+        )
+
+        def pipeline(group: List[CopySource]) -> Dict[str, Optional[CopyStats]]:
+            engine = engine_factory()
+            results: Dict[str, Optional[CopyStats]] = {}
+            for s in group:
+                if s.label not in scans:
+                    results[s.label] = None
+                    continue
+                progress.start(s.label)
+                try:
+                    results[s.label] = engine.run(
+                        scans[s.label],
+                        on_progress=progress.callback(s.label),
+                        on_copied=on_copied,
+                    )
+                finally:
+                    progress.finish(s.label)
+            return results
+
+        try:
+            results: Dict[str, Optional[CopyStats]] = {}
+            for found in pool.map(pipeline, groups.values()):
+                results.update(found)
+        finally:
+            progress.close()
+    ordered = {s.label: results.get(s.label) for s in sources}
+    return OffloadReport(
+        ordered,
+        progress.group_stats(),
+        progress.overall(),
+        {s.label: skipped.get(s.label, 0) for s in sources},
+        {s.label: known_counts.get(s.label, 0) for s in sources},
+        {s.label: linked.get(s.label, 0) for s in sources},
+    )
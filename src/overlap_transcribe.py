@@ -0,0 +1,143 @@
+"""overlap_transcribe.py
+Overlap transcription with the text stages through a bounded queue.
+
+:class:`TranscriptionProducer` transcribes in silence-aligned chunks
+(:func:`parallel_transcribe.iter_chunk_results`) on a background thread.
+Each finished chunk is stitched, regrouped into cues (:mod:`regroup`) and
+put on a bounded queue; :meth:`TranscriptionProducer.cues` is the
+consumer side and plugs straight into the generator stages of
+:mod:`stream_pipeline`, so normalization, timing, terminology and the LLM
+split of chunk *n* run while chunk *n + 1* is being transcribed.
+
+Chunk edges are always segment edges, so regrouping chunk by chunk gives
+the same cues as regrouping the whole transcript.  When the last chunk is
+done the producer saves the transcript to the store and writes the raw
+SRT and word timestamps, exactly like :func:`pipeline_all_in_one.transcribe_audio`.
+"""
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from parallel_transcribe import iter_chunk_results, stitch_chunk
+from regroup import DEFAULT_REGROUP, RegroupConfig, WordArrays
+from srt_cues import Cue, CueTable, write_srt
+from transcript_store import TranscriptStore
+from word_align import WordTimeline
+
+_DONE = object()
+
+
+class TranscriptionProducer:
+    def __init__(
+        self,
+        audio_path: Path,
+        store: TranscriptStore,
+        key: str,
+        raw_srt: Path,
+        words_path: Path,
+        initial_prompt: str = "",
+        model_size: str = "large-v2",
+        workers: int = 1,
+        chunk_seconds: float = 600.0,
+        regroup: Optional[RegroupConfig] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        max_chunks: int = 2,
+    ) -> None:
+        self.audio_path = Path(audio_path)
+        self.store = store
+        self.key = key
+        self.raw_srt = Path(raw_srt)
+        self.words_path = Path(words_path)
+        self.initial_prompt = initial_prompt
+        self.model_size = model_size
+        self.workers = workers
+        self.chunk_seconds = chunk_seconds
+        self.regroup = regroup or DEFAULT_REGROUP
+        self.meta = meta or {}
+        self.options = options or {}
+        # Bounded: transcription stays at most max_chunks ahead of the text stages
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_chunks))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="transcription-producer", daemon=True)
+        self.chunks_done = 0
+
+    def start(self) -> "TranscriptionProducer":
+        self._thread.start()
+        return self
+
+    def _put(self, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        try:
+            import stable_whisper  # type: ignore
+
+            segments: List[Dict[str, Any]] = []
+            tables: List[CueTable] = []
+            timeline = WordTimeline([], [], [])
+            language = None
+            last_end = 0.0
+            n_cues = 0
+            chunk_results = iter_chunk_results(
+                str(self.audio_path), self.model_size, self.initial_prompt, self.workers, self.chunk_seconds,
+                **self.options,
+            )
+            for chunk, output in chunk_results:
+                language = language or output["language"]
+                stitched, last_end = stitch_chunk(output["segments"], chunk, last_end)
+                words = WordArrays.from_segments(stitched)
+                if len(words) == 0:
+                    # Silent / music-only chunk: no cues for the text stages
+                    segments.extend(stitched)
+                    self.chunks_done += 1
+                    continue
+                table = words.regroup(self.regroup)
+                table.ids = [str(n_cues + i) for i in range(1, len(table) + 1)]
+                n_cues += len(table)
+                chunk_timeline = words.timeline()
+                if not self._put((table, chunk_timeline)):
+                    chunk_results.close()
+                    return
+                segments.extend(stitched)
+                tables.append(table)
+                timeline.extend(chunk_timeline)
+                self.chunks_done += 1
+
+            result = stable_whisper.WhisperResult({"language": language, "segments": segments})
+            self.store.save(self.key, result, self.meta).close()
+            write_srt(self.raw_srt, CueTable.from_cues(cue for table in tables for cue in table))
+            timeline.save(self.words_path)
+            self._put(_DONE)
+        except BaseException as e:  # handed to the consumer thread
+            self._put(e)
+
+    def cues(self, timeline: Optional[WordTimeline] = None) -> Iterator[Cue]:
+        """Yield cues as chunks finish; extends *timeline* with each chunk's words first."""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                table, chunk_timeline = item
+                if timeline is not None:
+                    timeline.extend(chunk_timeline)
+                yield from table
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Stop the producer (if the consumer gave up early) and wait for it."""
+        self._stop.set()
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join()
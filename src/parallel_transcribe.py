@@ -0,0 +1,234 @@
+"""parallel_transcribe.py
+Chunked, multi-process transcription for long recordings.
+
+A multi-hour stream is cut near silence into chunks of roughly
+``chunk_seconds`` (plus ``overlap_seconds`` of context on each side),
+transcribed in a process pool with one model per worker, and stitched
+back into a single unregrouped ``WhisperResult`` (or, with
+:func:`iter_chunk_results` + :func:`stitch_chunk`, chunk by chunk as they
+finish):
+
+- every chunk *owns* the span between its two cut points; words whose
+  midpoint falls in a neighbour's span are dropped, which removes the
+  duplicates transcribed twice in the overlap,
+- word and segment timestamps are shifted to absolute time and forced to
+  be monotonic.
+
+On CPU-only machines torch threads are split evenly between workers, so
+wall time scales with the number of cores.
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# (chunk_start, chunk_end, core_start, core_end) in samples
+Chunk = Tuple[int, int, int, int]
+
+# -------------------------
+# Silence-aware chunking
+# -------------------------
+
+def find_silences(
+    audio: np.ndarray,
+    sr: int = SAMPLE_RATE,
+    frame_ms: int = 30,
+    threshold_db: float = -40.0,
+    min_silence_ms: int = 300,
+) -> np.ndarray:
+    """Sample positions at the middle of every silent stretch (frame RMS below threshold)."""
+    frame = max(1, sr * frame_ms // 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.empty(0, dtype=np.int64)
+    frames = audio[: n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10
+    silent = 20 * np.log10(rms) < threshold_db
+
+    # Run boundaries of the boolean mask
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    long_enough = (run_ends - run_starts) * frame_ms >= min_silence_ms
+    mids = (run_starts[long_enough] + run_ends[long_enough]) // 2
+    return mids.astype(np.int64) * frame
+
+
+def plan_chunks(
+    n_samples: int,
+    silences: np.ndarray,
+    sr: int = SAMPLE_RATE,
+    chunk_seconds: float = 600.0,
+    overlap_seconds: float = 2.0,
+    search_seconds: float = 60.0,
+) -> List[Chunk]:
+    """Choose cut points near each ``chunk_seconds`` multiple, snapping to silence."""
+    target = int(chunk_seconds * sr)
+    window = int(search_seconds * sr)
+    overlap = int(overlap_seconds * sr)
+
+    cuts = [0]
+    while n_samples - cuts[-1] > target + window:
+        ideal = cuts[-1] + target
+        near = silences[(silences > ideal - window) & (silences < ideal + window)]
+        cuts.append(int(near[np.argmin(np.abs(near - ideal))]) if len(near) else ideal)
+    cuts.append(n_samples)
+
+    return [
+        (max(0, a - overlap), min(n_samples, b + overlap), a, b)
+        for a, b in zip(cuts[:-1], cuts[1:])
+    ]
+
+# -------------------------
+# Worker side
+# -------------------------
+
+_MODEL = None
+
+
+def _init_worker(model_size: str, device: Optional[str], threads: int) -> None:
+    global _MODEL
+    import stable_whisper  # type: ignore
+    import torch  # type: ignore
+
+    torch.set_num_threads(threads)
+    _MODEL = stable_whisper.load_model(model_size, device=device)
+
+
+def _transcribe_chunk(audio: np.ndarray, initial_prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    result = _MODEL.transcribe(audio, initial_prompt=initial_prompt, **options)  # type: ignore[union-attr]
+    # Plain dicts keep the inter-process payload small and picklable
+    segments = [
+        {
+            "start": seg.start,
+            "end": seg.end,
+            "words": [
+                {"word": w.word, "start": w.start, "end": w.end, "probability": w.probability}
+                for w in seg.words
+            ],
+        }
+        for seg in result.segments
+    ]
+    return {"language": result.language, "segments": segments}
+
+# -------------------------
+# Stitching
+# -------------------------
+
+def stitch_chunk(
+    segments: List[Dict[str, Any]],
+    chunk: Chunk,
+    last_end: float = 0.0,
+    sr: int = SAMPLE_RATE,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Stitch one chunk's segments after a previous chunk ending at *last_end* (sec).
+
+    Returns the absolute, de-duplicated segments and the new *last_end*, so
+    chunks can be stitched one by one as they finish.
+    """
+    chunk_start, _, core_start, core_end = chunk
+    offset = chunk_start / sr
+    own_lo, own_hi = core_start / sr, core_end / sr
+    stitched: List[Dict[str, Any]] = []
+    for seg in segments:
+        words = []
+        for w in seg["words"]:
+            start, end = w["start"] + offset, w["end"] + offset
+            if not own_lo <= (start + end) / 2 < own_hi:
+                continue  # transcribed by the neighbouring chunk
+            start = max(start, last_end)
+            end = max(end, start)
+            last_end = end
+            words.append({**w, "start": start, "end": end})
+        if words:
+            stitched.append({
+                "start": words[0]["start"],
+                "end": words[-1]["end"],
+                "text": "".join(w["word"] for w in words),
+                "words": words,
+            })
+    return stitched, last_end
+
+
+def stitch_segments(
+    chunk_segments: Sequence[List[Dict[str, Any]]],
+    chunks: Sequence[Chunk],
+    sr: int = SAMPLE_RATE,
+) -> List[Dict[str, Any]]:
+    """Merge per-chunk segments into absolute, de-duplicated, monotonic segments."""
+    stitched: List[Dict[str, Any]] = []
+    last_end = 0.0
+    for segments, chunk in zip(chunk_segments, chunks):
+        segments, last_end = stitch_chunk(segments, chunk, last_end, sr)
+        stitched.extend(segments)
+    return stitched
+
+
+def iter_chunk_results(
+    audio_path: str,
+    model_size: str = "large-v2",
+    initial_prompt: str = "",
+    workers: Optional[int] = None,
+    chunk_seconds: float = 600.0,
+    overlap_seconds: float = 2.0,
+    device: Optional[str] = "cpu",
+    **options: Any,
+) -> Iterator[Tuple[Chunk, Dict[str, Any]]]:
+    """Yield ``(chunk, output)`` in audio order as soon as each chunk is transcribed.
+
+    All chunks are queued on the pool up front; chunk *n* is yielded as
+    soon as it and every chunk before it are done.
+    """
+    from whisper.audio import load_audio  # type: ignore
+
+    audio = load_audio(str(audio_path))
+    chunks = plan_chunks(len(audio), find_silences(audio), SAMPLE_RATE, chunk_seconds, overlap_seconds)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # spawn: torch must not be forked after it initialized its thread pools
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_size, device, threads),
+    ) as executor:
+        futures = [
+            executor.submit(_transcribe_chunk, audio[a:b], initial_prompt, options)
+            for a, b, _, _ in chunks
+        ]
+        try:
+            for chunk, future in zip(chunks, futures):
+                yield chunk, future.result()
+        finally:
+            # A consumer that stops early should not wait for the queued chunks
+            for future in futures:
+                future.cancel()
+
+
+def transcribe_parallel(
+    audio_path: str,
+    model_size: str = "large-v2",
+    initial_prompt: str = "",
+    workers: Optional[int] = None,
+    chunk_seconds: float = 600.0,
+    overlap_seconds: float = 2.0,
+    device: Optional[str] = "cpu",
+    **options: Any,
+):
+    """Transcribe *audio_path* in silence-aligned chunks on a process pool.
+
+    Returns an unregrouped ``stable_whisper.WhisperResult``.
+    """
+    import stable_whisper  # type: ignore
+
+    chunks, outputs = zip(*iter_chunk_results(
+        audio_path, model_size, initial_prompt, workers, chunk_seconds, overlap_seconds, device, **options
+    ))
+    segments = stitch_segments([out["segments"] for out in outputs], chunks)
+    return stable_whisper.WhisperResult({"language": outputs[0]["language"], "segments": segments})
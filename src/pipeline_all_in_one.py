@@ -1,8 +1,10 @@
 """auto_subtitle_pipeline.py
-一鍵完成三步驟：
+一鍵完成：
 1. 音檔語音辨識 (stable_whisper)
-2. 移除字幕中文字元「,」「、」
+2. 文字正規化：移除「,」「、」(可設定)、全形/半形轉換、空白合併、繁簡轉換 --char-map
 3. 修正字幕時間間隔 (<0.5 秒者自動延長)
+4. (選用) 詞彙校正 --glossary
+5. (選用) LLM 加標點分段 --llm-split
 
 Usage
 -----
@@ -13,151 +15,449 @@ python auto_subtitle_pipeline.py \
 Notes
 -----
 - stable_whisper 需安裝並下載適當模型 (建議 large-v2)。
-- 產出檔案將自動循序命名：
-    step1_raw.srt -> step2_nocomma.srt -> step3_fixed.srt
+- 步驟 2 之後以串流方式逐句處理，只輸出最終檔 <stem>_final.srt；
+  加上 --keep-intermediate 才會另存 _nocomma / _fixed / _terms 中間檔。
+- 每個階段的指紋 (輸入雜湊 + 參數 + 程式版本) 記錄於 <stem>.manifest.json；
+  重跑時未變動的階段直接略過，詞彙表或 LLM 設定變動時只重算受影響的字幕。
+  加上 --no-incremental 可強制全部重跑。
+- --overlap-stages：音檔分段辨識，每段完成後立即經由有界佇列送入文字處理 (2–5)，
+  與下一段辨識同時進行；總耗時接近單純辨識所需時間。
+- --trace / --metrics / --profile 輸出各階段耗時、LLM 延遲分佈、快取命中率與 cProfile 紀錄；
+  --log-level DEBUG 顯示細節。
 """
 
 import argparse
-import pickle
 from pathlib import Path
-import re
-from datetime import datetime, timedelta
-from typing import Tuple
+from typing import Dict, Iterable, Optional, Tuple
+
+from glossary import GlossaryStore
+from instrumentation import Tracer, log, setup_logging
+from llm_cache import PunctuationCache
+from llm_client import DEFAULT_URL, LLMClient
+from llm_split import LLM_MIN_CHARS
+from overlap_transcribe import TranscriptionProducer
+from parallel_transcribe import transcribe_parallel
+from regroup import DEFAULT_REGROUP, RegroupConfig, WordArrays
+from srt_cues import Cue, CueTable, read_srt, write_srt
+from stage_manifest import (
+    CueMemo,
+    StageManifest,
+    code_digest,
+    data_digest,
+    file_digest,
+    stage_fingerprint,
+)
+from stream_pipeline import (
+    correct_terms,
+    fix_timing_stream,
+    llm_split,
+    normalize_text,
+    read_srt_stream,
+    tee_srt,
+    write_srt_stream,
+)
+from term_matcher import TermMatcher
+from text_normalize import DEFAULT_REMOVE, WIDTH_MODES, Normalizer, load_char_map
+from timing import OVERLAP_MODES, fix_timing
+from transcript_store import (
+    DEFAULT_STORE_ROOT,
+    TRANSCRIBE_OPTIONS,
+    TranscriptStore,
+    key_options,
+    transcript_key,
+)
+from word_align import WordTimeline
 
 try:
     import stable_whisper  # type: ignore
 except ImportError as e:  # pragma: no cover
     raise SystemExit("stable_whisper package is required. Install with `pip install stable-whisper`." ) from e
 
+# Modules whose source is part of each stage's fingerprint
+TRANSCRIBE_MODULES = (__name__, "overlap_transcribe", "parallel_transcribe", "regroup", "transcript_store", "word_align")
+TEXT_MODULES = (
+    "stream_pipeline", "srt_cues", "text_normalize", "timecodes", "timing", "term_matcher", "llm_split", "word_align",
+)
+LLM_MODULES = ("llm_client", "llm_split", "word_align")
+
 # -------------------------
 # Step 1 – Transcription
 # -------------------------
 
+def raw_srt_path_for(audio_path: Path, out_dir: Path = Path(".")) -> Path:
+    return Path(out_dir) / f"{audio_path.stem}_raw.srt"
+
+def words_path_for(audio_path: Path, out_dir: Path = Path(".")) -> Path:
+    """Word-timestamp sidecar written next to the raw SRT."""
+    return Path(out_dir) / f"{audio_path.stem}_words.json"
+
+def manifest_path_for(audio_path: Path, out_dir: Path = Path(".")) -> Path:
+    return Path(out_dir) / f"{audio_path.stem}.manifest.json"
+
 def transcribe_audio(
     audio_path: Path,
-    pickle_cache: Path,
+    store: TranscriptStore,
     initial_prompt: str = "",
     model_size: str = "large-v2",
+    workers: int = 1,
+    chunk_seconds: float = 600.0,
+    key: Optional[str] = None,
+    model=None,
+    out_dir: Path = Path("."),
+    regroup: Optional[RegroupConfig] = None,
+    chunked: Optional[bool] = None,
 ) -> Path:
     """Transcribe *audio_path* to SRT with *stable_whisper*.
 
-    If *pickle_cache* exists, the cached *result1* will be reused to avoid
-    re-transcription.
+    The unregrouped result is cached in *store*, keyed by the audio content
+    and the model/prompt/options, and reused to avoid re-transcription.
+    With ``workers > 1`` (or *chunked*) the audio is split at silences into
+    chunks of about *chunk_seconds* and transcribed in a process pool.
+    Pass a precomputed
+    *key* (see :func:`~transcript_store.transcript_key`) to avoid hashing the audio twice,
+    and an already loaded *model* to reuse it across files.  The cached
+    words are split into cues by :mod:`regroup` under *regroup* (default
+    :data:`~regroup.DEFAULT_REGROUP`).  Outputs are written to *out_dir*.
 
     Returns the generated *.srt* file path.
     """
-    if pickle_cache.exists():
-        with pickle_cache.open("rb") as f:
-            result1 = pickle.load(f)
-            # Reset segmentation and re-split as in original logic
-            result1.reset()
-            result1 = (
-                result1
-                .split_by_gap(0.3)
-                .split_by_punctuation([('.', ' '), '。', '?', '？'])
+    options = TRANSCRIBE_OPTIONS
+    options_key = key_options(workers, chunk_seconds, chunked)
+    if key is None:
+        key = store.key(audio_path, model_size, initial_prompt, **options_key)
+    stored = store.load(key)
+    if stored is None:
+        if "chunk_seconds" in options_key:
+            result1 = transcribe_parallel(
+                str(audio_path), model_size, initial_prompt, workers, chunk_seconds, **options
             )
-    else:
-        model = stable_whisper.load_model(model_size)
-        result1 = model.transcribe(
-            str(audio_path), regroup=False, vad=False, initial_prompt=initial_prompt
-        )
-        result1 = (
-            result1
-            .split_by_punctuation([('.', ' '), '。', '?', '？', ',', '，', (',', ' '), '、'])
-            .split_by_gap(0.3)
-            .split_by_punctuation([('.', ' '), '。', '?', '？'])
-        )
+        else:
+            if model is None:
+                model = stable_whisper.load_model(model_size)
+            result1 = model.transcribe(str(audio_path), initial_prompt=initial_prompt, **options)
+        # Cache before regrouping so later runs can re-segment freely
+        meta = {"audio": str(audio_path), "model": model_size, "initial_prompt": initial_prompt, "options": options_key}
+        stored = store.save(key, result1, meta)
 
-    # Export – filename based on audio stem
-    srt_path = Path(f"{audio_path.stem}_raw.srt")
-    result1.to_srt_vtt(str(srt_path), segment_level=True, word_level=False)
+    # Regroup the cached word arrays (same cues for fresh and cached runs)
+    try:
+        words = WordArrays.from_stored(stored)
+    finally:
+        stored.close()
 
-    # Cache
-    with pickle_cache.open("wb") as f:
-        pickle.dump(result1, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Export – filename based on audio stem
+    srt_path = raw_srt_path_for(audio_path, out_dir)
+    write_srt(srt_path, words.regroup(regroup or DEFAULT_REGROUP))
+    # Word timestamps let the LLM split stage re-time its sub-cues
+    words.timeline().save(words_path_for(audio_path, out_dir))
 
     return srt_path
 
 # -------------------------
-# Step 2 – Remove commas
+# Step 2 – Normalize text
 # -------------------------
 
-def is_timestamp_line(line: str) -> bool:
-    return bool(re.match(r"\d{2}:\d{2}:\d{2},\d{3} --> \d{2}:\d{2}:\d{2},\d{3}", line))
+def normalize_cue_texts(table: CueTable, normalizer: Optional[Normalizer] = None) -> CueTable:
+    """Normalize every cue text of *table* in place (default: strip ``,`` and ``、``)."""
+    normalizer = normalizer or Normalizer()
+    table.texts = [normalizer(text) for text in table.texts]
+    return table
+
+def normalize_srt(input_srt: Path, output_srt: Path, normalizer: Optional[Normalizer] = None) -> None:
+    write_srt(output_srt, normalize_cue_texts(read_srt(input_srt), normalizer))
 
-def remove_commas_from_srt(input_srt: Path, output_srt: Path) -> None:
-    with input_srt.open("r", encoding="utf-8") as f:
-        lines = f.readlines()
+# -------------------------
+# Step 3 – Fix subtitle timings
+# -------------------------
 
-    modified = [line.replace(',', '').replace('、', '') if not is_timestamp_line(line) else line for line in lines]
+def fix_cue_timings(
+    table: CueTable,
+    min_gap: float = 0.5,
+    max_duration: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    overlap_mode: Optional[str] = None,
+) -> CueTable:
+    """Close gaps below *min_gap* seconds and apply the optional timing policies."""
+    return fix_timing(table, min_gap, max_duration, min_duration, overlap_mode)
 
-    with output_srt.open("w", encoding="utf-8") as f:
-        f.writelines(modified)
+def fix_timings(input_srt: Path, output_srt: Path, min_gap: float = 0.5) -> None:
+    write_srt(output_srt, fix_cue_timings(read_srt(input_srt), min_gap))
 
 # -------------------------
-# Step 3 – Fix subtitle timings
+# Streaming text stages (2–5)
 # -------------------------
 
-def _parse_time(ts: str) -> datetime:
-    return datetime.strptime(ts, "%H:%M:%S,%f")
+def run_text_stages(
+    raw_srt: Path,
+    output_srt: Path,
+    min_gap: float = 0.5,
+    max_duration: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    overlap_mode: Optional[str] = None,
+    matcher: Optional[TermMatcher] = None,
+    client: Optional[LLMClient] = None,
+    timeline: Optional[WordTimeline] = None,
+    debug_prefix: Optional[str] = None,
+    terms_memo: Optional[CueMemo] = None,
+    changed_terms: Optional[TermMatcher] = None,
+    llm_memo: Optional[CueMemo] = None,
+    tracer: Optional[Tracer] = None,
+    normalizer: Optional[Normalizer] = None,
+    llm_min_chars: int = LLM_MIN_CHARS,
+    cues: Optional[Iterable[Cue]] = None,
+) -> int:
+    """Stream *raw_srt* through the text stages into *output_srt*.
 
-def _time_to_str(dt: datetime) -> str:
-    return dt.strftime("%H:%M:%S,%f")[:-3]
+    *cues* replaces reading *raw_srt*, e.g. with cues that are still being
+    transcribed (:class:`overlap_transcribe.TranscriptionProducer`).
 
-def fix_timings(input_srt: Path, output_srt: Path, min_gap: float = 0.5) -> None:
-    content = input_srt.read_text(encoding="utf-8")
-    subtitles = content.split('\n\n')
+    *normalizer* configures the text normalization stage (default: strip
+    ``,`` and ``、``).  Terminology correction runs when *matcher* is given and the LLM split
+    (of cues longer than *llm_min_chars*) when *client* is given.  With *debug_prefix* every stage's output is
+    also written to ``<prefix>_<stage>.srt``.  The optional memos carry
+    cue-level results from a previous run (see :mod:`stage_manifest`);
+    *tracer* records per-stage time and cue counts.  Returns the cue count.
+    """
+    upstream = None
 
-    for i in range(len(subtitles) - 1):
-        current_sub = subtitles[i]
-        next_sub = subtitles[i + 1]
-        curr_lines = current_sub.split('\n')
-        next_lines = next_sub.split('\n')
-        if len(curr_lines) < 3 or len(next_lines) < 3:
-            continue
+    def probe(cues, stage):
+        nonlocal upstream
+        if tracer is None:
+            return cues
+        cues, upstream = tracer.wrap(cues, stage, upstream), stage
+        return cues
 
-        curr_end_str = curr_lines[1].split(' --> ')[1]
-        next_start_str = next_lines[1].split(' --> ')[0]
+    def debug(cues, stage):
+        return probe(tee_srt(cues, Path(f"{debug_prefix}_{stage}.srt")) if debug_prefix else cues, stage)
 
-        curr_end = _parse_time(curr_end_str)
-        next_start = _parse_time(next_start_str)
-        if (next_start - curr_end).total_seconds() < min_gap:
-            # overlap – push end time earlier
-            curr_lines[1] = curr_lines[1].split(' --> ')[0] + ' --> ' + next_start_str
-            subtitles[i] = '\n'.join(curr_lines)
+    cues = probe(read_srt_stream(raw_srt) if cues is None else cues, "read")
+    cues = debug(normalize_text(cues, normalizer), "nocomma")
+    cues = debug(fix_timing_stream(cues, min_gap, max_duration, min_duration, overlap_mode), "fixed")
+    if matcher is not None:
+        cues = debug(correct_terms(cues, matcher, terms_memo, changed_terms), "terms")
+    if client is not None:
+        cues = probe(llm_split(cues, client, timeline, llm_min_chars, memo=llm_memo), "llm_split")
+    return write_srt_stream(cues, output_srt)
 
-    output_srt.write_text('\n\n'.join(subtitles), encoding="utf-8")
+# -------------------------
+# Incremental runs
+# -------------------------
+
+def changed_terms_matcher(old: Dict[str, str], new: Dict[str, str]) -> Optional[TermMatcher]:
+    """Matcher over the glossary keys added, removed or remapped between two runs.
+
+    A memoized correction stays valid for every text that contains none of
+    these keys; returns ``None`` when nothing changed.
+    """
+    changed = {k: "" for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+    return TermMatcher(changed) if changed else None
+
+def llm_memo_key(client: LLMClient, timeline_digest: Optional[str]) -> str:
+    """Everything besides the cue itself that determines an LLM split."""
+    return data_digest({
+        "model": client.model,
+        "prompt": client.system_prompt,
+        "temperature": client.temperature,
+        "timeline": timeline_digest,
+        "code": code_digest(LLM_MODULES),
+    })
 
 # -------------------------
 # Command-line interface
 # -------------------------
 
-def main() -> None:  # pragma: no cover
-    p = argparse.ArgumentParser(description="Run 3-step subtitle pipeline")
-    p.add_argument("--audio", type=Path, required=True, help="Audio file to transcribe (.wav)")
+def add_stage_arguments(p: argparse.ArgumentParser) -> None:
+    """Transcription and text-stage options shared with the batch entry point."""
     p.add_argument("--prompt", dest="initial_prompt", default="", help="Initial prompt for transcription")
     p.add_argument("--model", dest="model_size", default="large-v2", help="stable_whisper model size")
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_STORE_ROOT, help="Transcript cache directory")
+    p.add_argument("--split-gap", type=float, default=DEFAULT_REGROUP.max_gap, help="Start a new cue at word gaps above this (sec)")
+    p.add_argument("--max-chars", type=int, default=None, help="Split cues longer than this many characters at word boundaries")
+    p.add_argument("--max-cue-seconds", type=float, default=None, help="Split cues longer than this (sec) at word boundaries")
+    p.add_argument("--remove-chars", default=DEFAULT_REMOVE, help="Characters deleted from cue text (default: ',、')")
+    p.add_argument("--width", choices=WIDTH_MODES, default="none", help="Fold full-width ASCII to half-width or the reverse")
+    p.add_argument("--collapse-whitespace", action="store_true", help="Fold tabs/full-width spaces and collapse runs of spaces")
+    p.add_argument("--char-map", type=Path, action="append", default=[], help="Character conversion table, e.g. OpenCC TSCharacters.txt (repeatable)")
     p.add_argument("--min-gap", type=float, default=0.5, help="Minimum gap (sec) between subtitles")
+    p.add_argument("--max-duration", type=float, default=None, help="Maximum cue duration (sec)")
+    p.add_argument("--min-duration", type=float, default=None, help="Minimum cue display time (sec)")
+    p.add_argument("--overlap", dest="overlap_mode", choices=OVERLAP_MODES, default=None, help="Overlap resolution policy")
+    p.add_argument("--glossary", type=Path, action="append", default=[], help="Glossary file for terminology correction (repeatable, later files override)")
+    p.add_argument("--llm-split", action="store_true", help="Punctuate and split long cues with the local LLM")
+    p.add_argument("--llm-min-chars", type=int, default=LLM_MIN_CHARS, help="Only cues longer than this are sent to the LLM")
+    p.add_argument("--llm-url", default=DEFAULT_URL, help="OpenAI-compatible chat completions endpoint")
+
+def regroup_from_args(args: argparse.Namespace) -> RegroupConfig:
+    return DEFAULT_REGROUP._replace(
+        max_gap=args.split_gap, max_chars=args.max_chars, max_duration=args.max_cue_seconds
+    )
+
+def normalizer_from_args(args: argparse.Namespace) -> Normalizer:
+    return Normalizer(
+        remove=args.remove_chars,
+        width=args.width,
+        char_maps=[load_char_map(path) for path in args.char_map],
+        collapse_whitespace=args.collapse_whitespace,
+    )
+
+def main() -> None:  # pragma: no cover
+    p = argparse.ArgumentParser(description="Run the subtitle pipeline")
+    p.add_argument("--audio", type=Path, required=True, help="Audio file to transcribe (.wav)")
+    p.add_argument("--workers", type=int, default=1, help="Parallel transcription processes (1 = single call)")
+    p.add_argument("--chunk-seconds", type=float, default=600.0, help="Target chunk length for parallel transcription")
+    p.add_argument("--overlap-stages", action="store_true", help="Run the text stages on each chunk while the next is transcribing")
+    add_stage_arguments(p)
+    p.add_argument("--output", type=Path, default=None, help="Final SRT path (default: <stem>_final.srt)")
+    p.add_argument("--keep-intermediate", action="store_true", help="Also write each stage's output for debugging")
+    p.add_argument("--no-incremental", dest="incremental", action="store_false", help="Ignore the stage manifest and rerun every stage")
+    p.add_argument("--log-level", default=None, help="DEBUG shows per-stage details (default: $SUBTITLE_LOG_LEVEL or INFO)")
+    p.add_argument("--trace", type=Path, default=None, help="Append per-stage timings and metrics to this JSON-lines file")
+    p.add_argument("--metrics", type=Path, default=None, help="Write a Prometheus text-format metrics file")
+    p.add_argument("--profile", type=Path, default=None, help="Run each stage under cProfile, writing <stage>.pstats to this directory")
     args = p.parse_args()
+    setup_logging(args.log_level)
 
     audio_path: Path = args.audio.expanduser().resolve()
     if not audio_path.exists():
         raise SystemExit(f"Audio file {audio_path} not found")
 
-    cache_path = Path("result1.pickle")
-    print("[Step 1] Transcribing audio…")
-    raw_srt = transcribe_audio(audio_path, cache_path, args.initial_prompt, args.model_size)
-    print(f"  ➜ Generated {raw_srt}")
+    tracer = Tracer(args.trace, args.metrics, args.profile)
+    try:
+        run(args, audio_path, tracer)
+    finally:
+        tracer.close()
 
-    print("[Step 2] Removing commas/ideographic comma…")
-    no_comma_srt = Path(f"{audio_path.stem}_nocomma.srt")
-    remove_commas_from_srt(raw_srt, no_comma_srt)
-    print(f"  ➜ Generated {no_comma_srt}")
+def run(args: argparse.Namespace, audio_path: Path, tracer: Tracer) -> None:
+    store = TranscriptStore(args.cache_dir)
+    manifest = StageManifest(manifest_path_for(audio_path))
+    words_path = words_path_for(audio_path)
+    raw_srt = raw_srt_path_for(audio_path)
+
+    log.info("[Step 1] Transcribing audio…")
+    key = transcript_key(
+        store, audio_path, args.initial_prompt, args.model_size, args.workers, args.chunk_seconds,
+        chunked=True if args.overlap_stages else None,
+    )
+    regroup = regroup_from_args(args)
+    transcribe_fp = stage_fingerprint(key, {"regroup": regroup.params()}, code_digest(TRANSCRIBE_MODULES))
+    producer = None
+    if args.incremental and words_path.exists() and manifest.is_fresh("transcribe", transcribe_fp, raw_srt):
+        log.info(f"  ➜ Up to date: {raw_srt}")
+    elif args.overlap_stages and not store.has(key):
+        # Chunks flow into the text stages as they finish; files are written at the end
+        meta = {
+            "audio": str(audio_path), "model": args.model_size, "initial_prompt": args.initial_prompt,
+            "options": key_options(args.workers, args.chunk_seconds, chunked=True),
+        }
+        producer = TranscriptionProducer(
+            audio_path, store, key, raw_srt, words_path, args.initial_prompt, args.model_size,
+            args.workers, args.chunk_seconds, regroup, meta, TRANSCRIBE_OPTIONS,
+        )
+    else:
+        with tracer.stage("transcribe"):
+            raw_srt = transcribe_audio(
+                audio_path, store, args.initial_prompt, args.model_size, args.workers, args.chunk_seconds,
+                key=key, regroup=regroup, chunked=True if args.overlap_stages else None,
+            )
+        manifest.record("transcribe", transcribe_fp, raw_srt)
+        manifest.save()
+        log.info(f"  ➜ Generated {raw_srt}")
+
+    glossary = GlossaryStore(args.glossary) if args.glossary else None
+    matcher = glossary.matcher() if glossary is not None else None
+    client = LLMClient(url=args.llm_url, cache=PunctuationCache(), tracer=tracer) if args.llm_split else None
+    if producer is not None:
+        timeline = WordTimeline([], [], []) if client is not None else None  # grows chunk by chunk
+    else:
+        timeline = WordTimeline.load(words_path) if client is not None and words_path.exists() else None
+    normalizer = normalizer_from_args(args)
+    output_srt = args.output or Path(f"{audio_path.stem}_final.srt")
+
+    terms_key = code_digest(["term_matcher"])
+
+    def text_fingerprint() -> Tuple[Optional[str], str]:
+        llm_key = llm_memo_key(client, file_digest(words_path) if timeline is not None else None) if client else None
+        text_params = {
+            "normalize": normalizer.digest,
+            "min_gap": args.min_gap,
+            "max_duration": args.max_duration,
+            "min_duration": args.min_duration,
+            "overlap_mode": args.overlap_mode,
+            "glossary": glossary.content_hash if glossary is not None else None,
+            "llm": llm_key,
+            "llm_min_chars": args.llm_min_chars if client is not None else None,
+            "keep_intermediate": args.keep_intermediate,
+        }
+        return llm_key, stage_fingerprint(file_digest(raw_srt), text_params, code_digest(TEXT_MODULES))
+
+    log.info("[Step 2+] Streaming text stages…")
+    llm_key = None
+    if producer is None:
+        llm_key, text_fp = text_fingerprint()
+        if args.incremental and manifest.is_fresh("text", text_fp, output_srt):
+            if client is not None:
+                client.close()
+                client.cache.close()
+            log.info(f"  ➜ Up to date: {output_srt}\nDone.")
+            return
+
+    # Cue-level memos from the previous run; only cues whose input changed are recomputed
+    terms_memo = llm_memo = changed = None
+    previous_glossary = manifest.stage_info("text").get("glossary_mapping")
+    if matcher is not None:
+        usable = args.incremental and previous_glossary is not None
+        terms_memo = CueMemo(manifest.memo("terms", terms_key) if usable else {})
+        changed = changed_terms_matcher(previous_glossary, glossary.mapping) if usable else None
+    if client is not None:
+        # A new transcript has no previous splits to reuse
+        llm_memo = CueMemo(manifest.memo("llm_split", llm_key) if args.incremental and llm_key else {})
+
+    try:
+        with tracer.stage("transcribe+text" if producer is not None else "text") as stats:
+            count = stats.cues = run_text_stages(
+                raw_srt,
+                output_srt,
+                args.min_gap,
+                args.max_duration,
+                args.min_duration,
+                args.overlap_mode,
+                matcher=matcher,
+                client=client,
+                timeline=timeline,
+                debug_prefix=audio_path.stem if args.keep_intermediate else None,
+                terms_memo=terms_memo,
+                changed_terms=changed,
+                llm_memo=llm_memo,
+                tracer=tracer,
+                normalizer=normalizer,
+                llm_min_chars=args.llm_min_chars,
+                cues=producer.start().cues(timeline) if producer is not None else None,
+            )
+    finally:
+        if producer is not None:
+            producer.close()
+        if client is not None:
+            client.close()
+            client.cache.close()
+            tracer.record_cache("llm_punctuation", client.cache.hits, client.cache.misses)
 
-    print("[Step 3] Fixing subtitle timings…")
-    fixed_srt = Path(f"{audio_path.stem}_fixed.srt")
-    fix_timings(no_comma_srt, fixed_srt, args.min_gap)
-    print(f"  ➜ Generated {fixed_srt}\nDone.")
+    if producer is not None:
+        manifest.record("transcribe", transcribe_fp, raw_srt)
+        log.info(f"  ➜ Generated {raw_srt} ({producer.chunks_done} chunks)")
+        llm_key, text_fp = text_fingerprint()
+    if terms_memo is not None:
+        manifest.set_memo("terms", terms_key, terms_memo.current)
+        tracer.record_cache("terms_memo", terms_memo.hits, terms_memo.misses)
+    if llm_memo is not None:
+        manifest.set_memo("llm_split", llm_key, llm_memo.current)
+        tracer.record_cache("llm_split_memo", llm_memo.hits, llm_memo.misses)
+        log.info(f"  ➜ LLM split reused {llm_memo.hits} cues, recomputed {llm_memo.misses}")
+    manifest.record(
+        "text", text_fp, output_srt,
+        glossary_mapping=glossary.mapping if glossary is not None else None,
+    )
+    manifest.save()
+    log.info(f"  ➜ Generated {output_srt} ({count} cues)\nDone.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
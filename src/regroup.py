@@ -0,0 +1,199 @@
+"""regroup.py
+Vectorized cue regrouping over word-timestamp arrays.
+
+Replaces stable_whisper's object-per-word ``split_by_gap`` /
+``split_by_punctuation`` chains.  A transcript is held as
+:class:`WordArrays` (start/end seconds, segment index and text per word)
+and every rule is a boolean *break* mask over the words – ``breaks[i]``
+means a new cue starts at word ``i``:
+
+- segment breaks: the unregrouped Whisper segments,
+- split by gap: ``start[i] - end[i - 1] > max_gap``,
+- split by punctuation: word ``i - 1`` ends with a mark (or word ``i``
+  starts with one); a ``(end, begin)`` pair needs both, as in stable_whisper,
+- max chars / max duration: a greedy split before the first word that
+  would push a cue over the limit, computed in a few vectorized passes.
+
+Gap and punctuation masks are OR-ed, so their order does not matter.
+Per-mark punctuation flags are cached on the arrays, so sweeping
+:class:`RegroupConfig` values over one cached transcript costs a few
+NumPy operations per configuration.
+"""
+
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from srt_cues import CueTable
+from word_align import WordTimeline
+
+Punctuation = Union[str, Tuple[str, str]]
+
+SENTENCE_PUNCTUATION: Tuple[Punctuation, ...] = (('.', ' '), '。', '?', '？')
+CLAUSE_PUNCTUATION: Tuple[Punctuation, ...] = (',', '，', (',', ' '), '、')
+
+
+class RegroupConfig(NamedTuple):
+    max_gap: Optional[float] = 0.3
+    punctuation: Tuple[Punctuation, ...] = SENTENCE_PUNCTUATION + CLAUSE_PUNCTUATION
+    max_chars: Optional[int] = None
+    max_duration: Optional[float] = None
+
+    def params(self) -> Dict[str, object]:
+        """JSON-friendly form for fingerprints and reports."""
+        return {**self._asdict(), "punctuation": [list(p) if isinstance(p, tuple) else p for p in self.punctuation]}
+
+
+DEFAULT_REGROUP = RegroupConfig()
+
+
+class WordArrays:
+    """Words of an unregrouped transcript as parallel arrays."""
+
+    def __init__(
+        self,
+        starts: Sequence[float],
+        ends: Sequence[float],
+        segments: Sequence[int],
+        words: Sequence[str],
+    ) -> None:
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.segments = np.asarray(segments, dtype=np.int64)
+        self.words = list(words)
+        # char_offsets[i] = characters before word i in the concatenated text
+        self.char_offsets = np.zeros(len(self.words) + 1, dtype=np.int64)
+        np.cumsum([len(w) for w in self.words], out=self.char_offsets[1:])
+        self._text = "".join(self.words)
+        self._flags: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def from_stored(cls, stored) -> "WordArrays":
+        """From a :class:`~transcript_store.StoredTranscript` without building segments."""
+        words = stored.words
+        return cls(words["start"], words["end"], words["segment"], [stored.word_text(k) for k in range(len(words))])
+
+    @classmethod
+    def from_result(cls, result) -> "WordArrays":
+        """From a stable_whisper ``WhisperResult``."""
+        items = [(w.start, w.end, i, w.word) for i, seg in enumerate(result.segments) for w in seg.words]
+        if not items:
+            return cls([], [], [], [])
+        starts, ends, segments, words = zip(*items)
+        return cls(starts, ends, segments, words)
+
+    @classmethod
+    def from_segments(cls, segments: Sequence[Dict[str, Any]]) -> "WordArrays":
+        """From segment dicts (``{"words": [{"word", "start", "end"}, ...]}``)."""
+        items = [(w["start"], w["end"], i, w["word"]) for i, seg in enumerate(segments) for w in seg["words"]]
+        if not items:
+            return cls([], [], [], [])
+        starts, ends, segs, words = zip(*items)
+        return cls(starts, ends, segs, words)
+
+    def timeline(self) -> WordTimeline:
+        return WordTimeline(
+            np.rint(self.starts * 1000).astype(np.int64),
+            np.rint(self.ends * 1000).astype(np.int64),
+            self.words,
+        )
+
+    def _affix(self, kind: str, mark: str) -> np.ndarray:
+        """Cached mask of words that start / end with *mark*."""
+        flags = self._flags.get((kind, mark))
+        if flags is None:
+            test = str.endswith if kind == "end" else str.startswith
+            flags = np.fromiter((test(w, mark) for w in self.words), dtype=bool, count=len(self.words))
+            self._flags[(kind, mark)] = flags
+        return flags
+
+    # -------------------------
+    # Break masks
+    # -------------------------
+
+    def segment_breaks(self) -> np.ndarray:
+        breaks = np.ones(len(self), dtype=bool)
+        breaks[1:] = self.segments[1:] != self.segments[:-1]
+        return breaks
+
+    def gap_breaks(self, max_gap: float) -> np.ndarray:
+        breaks = np.zeros(len(self), dtype=bool)
+        breaks[1:] = (self.starts[1:] - self.ends[:-1]) > max_gap
+        return breaks
+
+    def punctuation_breaks(self, punctuation: Sequence[Punctuation]) -> np.ndarray:
+        breaks = np.zeros(len(self), dtype=bool)
+        if len(self) < 2:
+            return breaks
+        for p in punctuation:
+            if isinstance(p, str):
+                # "abc." | "def"  or  "abc" | ".def" (the mark opens the next word)
+                breaks[1:] |= self._affix("end", p)[:-1]
+                breaks[1:] |= self._affix("start", p)[1:]
+            else:
+                ending, beginning = p
+                breaks[1:] |= self._affix("end", ending)[:-1] & self._affix("start", beginning)[1:]
+        return breaks
+
+    def breaks(self, config: RegroupConfig = DEFAULT_REGROUP) -> np.ndarray:
+        """Cue-start mask for *config*."""
+        breaks = self.segment_breaks()
+        if len(self) == 0:
+            return breaks
+        if config.max_gap is not None:
+            breaks |= self.gap_breaks(config.max_gap)
+        if config.punctuation:
+            breaks |= self.punctuation_breaks(config.punctuation)
+        if config.max_chars is not None:
+            breaks = limit_breaks(breaks, self.char_offsets[:-1], self.char_offsets[1:], config.max_chars)
+        if config.max_duration is not None:
+            breaks = limit_breaks(breaks, self.starts, self.ends, config.max_duration)
+        return breaks
+
+    # -------------------------
+    # Output
+    # -------------------------
+
+    def groups(self, breaks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Word index ranges ``[lo, hi)`` of the cues defined by *breaks*."""
+        lo = np.flatnonzero(breaks)
+        hi = np.append(lo[1:], len(self))
+        return lo, hi
+
+    def to_table(self, breaks: np.ndarray) -> CueTable:
+        if len(self) == 0:
+            return CueTable([], [], [])  # silent / music-only audio
+        lo, hi = self.groups(breaks)
+        starts = np.rint(self.starts[lo] * 1000).astype(np.int64)
+        ends = np.rint(self.ends[hi - 1] * 1000).astype(np.int64)
+        text, offsets = self._text, self.char_offsets
+        texts = [text[a:b].strip() for a, b in zip(offsets[lo].tolist(), offsets[hi].tolist())]
+        return CueTable(starts, ends, texts)
+
+    def regroup(self, config: RegroupConfig = DEFAULT_REGROUP) -> CueTable:
+        return self.to_table(self.breaks(config))
+
+
+def limit_breaks(breaks: np.ndarray, begin: np.ndarray, end: np.ndarray, limit: float) -> np.ndarray:
+    """Add breaks so that ``end[last] - begin[first] <= limit`` within every cue.
+
+    Greedy like a sequential scan: a cue is cut before the first word that
+    exceeds the limit, then the rest is re-checked.  Each pass is
+    vectorized; the number of passes is the largest number of cuts any
+    single cue needs.  A single word over the limit stays whole.
+    """
+    breaks = breaks.copy()
+    while True:
+        group = np.cumsum(breaks) - 1
+        first = np.flatnonzero(breaks)[group]
+        over = np.flatnonzero(((end - begin[first]) > limit) & ~breaks)
+        if len(over) == 0:
+            return breaks
+        # First offending word of each cue
+        keep = np.ones(len(over), dtype=bool)
+        keep[1:] = group[over[1:]] != group[over[:-1]]
+        breaks[over[keep]] = True
+
@@ -8,35 +8,62 @@ Sony Camera Auto Fast Copy Script
 - 偵測 H: 磁碟機 (JPEG/影片)
 - 偵測 I: 磁碟機 (RAW)
 - 自動建立以日期命名的資料夾
-- 快速複製檔案到目標目錄
+- 快速複製檔案到目標目錄 (每張卡一條複製管線，同時進行)
+- 完成的檔案寫入 .offload-manifest.jsonl；重跑時略過已完成且相同的檔案
+  (hash_algo="auto" 時複製同步計算雜湊，驗證: python src/offload_manifest.py <目標資料夾>)
+- 匯入索引 (SQLite) 記錄每個已卸載的檔案；未格式化的卡只複製新檔案，
+  已匯入過的檔案可略過或以 hardlink/reflink 連結到先前的副本
+
+來源可透過 sources 參數設定 (CopySource 清單)，預設為 h_drive/i_drive (H:/I:) 兩張卡
 """
 
 import os
 import sys
-import shutil
 import datetime
-from pathlib import Path
-import subprocess
-import time
 from tqdm import tqdm
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from copy_engine import CopyEngine, fastest_hash_algo, scan_tree
+from copy_progress import TransferProgress, format_rate
+from ingest_index import DEFAULT_INDEX_PATH, IngestIndex
+from offload_manifest import OffloadManifest
+from offload_scheduler import CopySource, run_offload
 
 class SonyCameraFastCopy:
-    def __init__(self):
-        self.h_drive = "H:\\"  # JPEG/Video drive
-        self.i_drive = "I:\\"  # RAW drive
-        self.base_dest = "Z:\\Vod_Eggs\\a7r5 US"
-        
-    def check_drives_exist(self):
-        """檢查H:和I:磁碟機是否存在"""
-        h_exists = os.path.exists(self.h_drive)
-        i_exists = os.path.exists(self.i_drive)
+    def __init__(self, sources=None, base_dest=None, max_workers: int = 8,
+                 hash_algo=None, check_hash: bool = False,
+                 index_path=DEFAULT_INDEX_PATH, known_files="skip",
+                 h_drive="H:\\", i_drive="I:\\"):
+        self.h_drive = h_drive  # JPEG/影片卡，只用於 default_sources()
+        self.i_drive = i_drive  # RAW 卡，只用於 default_sources()
+        self.base_dest = base_dest or "Z:\\Vod_Eggs\\a7r5 US"
+        self.sources = sources  # None: default_sources()
+        self.max_workers = max_workers
+        # None: 不計算雜湊，大檔走零拷貝 (預設，最快)；"auto": 已安裝套件中最快的雜湊
+        # 計算雜湊時一律走緩衝區複製，blake2b 約 0.5 GB/s，可能比讀卡機慢
+        self.hash_algo = fastest_hash_algo() if hash_algo == "auto" else hash_algo
+        self.check_hash = check_hash  # 略過既有檔案前是否重新計算雜湊
+        self.index_path = index_path  # None: 不使用匯入索引
+        self.known_files = known_files  # 已匯入過的檔案: "skip" / "hardlink" / "reflink"
         
-        print(f"H: drive exists: {h_exists}")
-        print(f"I: drive exists: {i_exists}")
-        
-        return h_exists, i_exists
+    def default_sources(self):
+        """預設來源: h_drive (JPEG/影片，預設 H:) 與 i_drive (RAW，預設 I:)"""
+        return [
+            CopySource("JPEG照片", self.h_drive, "DCIM", "JPG"),
+            CopySource("MP4影片", self.h_drive, "M4ROOT/CLIP", "MP4"),
+            CopySource("RAW檔案", self.i_drive, "DCIM", "RAW"),
+        ]
+    
+    def get_sources(self):
+        return list(self.sources) if self.sources is not None else self.default_sources()
+    
+    def check_drives_exist(self, sources=None):
+        """檢查各來源存儲卡是否存在，回傳 {卡: 是否存在}"""
+        cards = {}
+        for source in sources or self.get_sources():
+            if source.card not in cards:
+                cards[source.card] = os.path.exists(source.card)
+                print(f"{source.card_name} drive exists: {cards[source.card]}")
+        return cards
     
     def get_folder_name(self):
         """獲取使用者輸入的資料夾名稱"""
@@ -51,37 +78,20 @@ class SonyCameraFastCopy:
         folder_name = f"{today}-{title}"
         return folder_name
     
-    def create_destination_folders(self, folder_name):
-        """建立目標資料夾"""
+    def create_destination_folders(self, folder_name, sources=None):
+        """建立目標資料夾，回傳目標根目錄"""
         base_folder = os.path.join(self.base_dest, folder_name)
-        jpg_folder = os.path.join(base_folder, "JPG")
-        mp4_folder = os.path.join(base_folder, "MP4")
-        raw_folder = os.path.join(base_folder, "RAW")
-        
-        folders = [jpg_folder, mp4_folder, raw_folder]
-        
-        for folder in folders:
+        for dest in dict.fromkeys(source.dest for source in sources or self.get_sources()):
+            folder = os.path.join(base_folder, dest)
             os.makedirs(folder, exist_ok=True)
             print(f"Created folder: {folder}")
             
-        return jpg_folder, mp4_folder, raw_folder
+        return base_folder
     
     def count_files(self, source_path):
-        """計算來源資料夾中的檔案數量"""
-        try:
-            file_count = 0
-            total_size = 0
-            for root, dirs, files in os.walk(source_path):
-                file_count += len(files)
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        total_size += os.path.getsize(file_path)
-                    except (OSError, IOError):
-                        continue
-            return file_count, total_size
-        except Exception:
-            return 0, 0
+        """計算來源資料夾中的檔案數量與總大小 (單次 scandir 走訪)"""
+        jobs = scan_tree(source_path, source_path)
+        return len(jobs), sum(job.size for job in jobs)
     
     def format_size(self, size_bytes):
         """格式化檔案大小顯示"""
@@ -95,138 +105,156 @@ class SonyCameraFastCopy:
             i += 1
         return f"{size_bytes:.1f}{size_names[i]}"
     
-    def fast_copy_with_python(self, source, destination, description="", max_workers: int = 8):
-        """使用多執行緒 + shutil 複製並以 tqdm 即時顯示進度"""
+    def fast_copy_with_python(self, source, destination, description="", max_workers: int = 8,
+                              jobs=None, progress=None, manifest=None):
+        """以 copy_engine 複製 (大檔走零拷貝/大緩衝區，小檔分批)，進度以位元組計算
+
+        jobs: 預先掃描的檔案清單 (scan_tree)；未提供時在此掃描
+        progress: 共用的 TransferProgress (需含 description 這個來源)；未提供時自建並印出速度
+        manifest: 共用的 OffloadManifest；未提供時使用 destination 內的 manifest
+        """
         if not os.path.exists(source):
             print(f"來源資料夾不存在: {source}")
             return False
 
-        # 收集所有檔案清單
-        file_list = []
-        for root, dirs, files in os.walk(source):
-            for file in files:
-                file_list.append(os.path.join(root, file))
+        # 單次走訪收集檔案清單與大小，供引擎選擇複製方式與計算進度
+        if jobs is None:
+            jobs = scan_tree(source, destination)
 
-        total_files = len(file_list)
+        total_files = len(jobs)
         if total_files == 0:
             print(f"來源資料夾為空: {source}")
             return True
 
-        print(f"開始複製 {description}: 共 {total_files} 個檔案 (執行緒: {max_workers})")
+        own_manifest = manifest is None
+        if own_manifest:
+            manifest = OffloadManifest(destination, self.hash_algo)
+        try:
+            # 已完成且相同 (大小+修改時間，可選雜湊) 的檔案直接略過
+            jobs, skipped = manifest.pending(jobs, self.check_hash)
+            if skipped:
+                tqdm.write(f"{description}: 略過 {skipped} 個已完成的檔案")
 
-        progress_bar = tqdm(
-            total=total_files,
-            desc=f"複製{description}",
-            unit="file",
-            bar_format="{desc}: {percentage:3.0f}%|{bar}| {n}/{total} 檔案 [{elapsed}<{remaining}]"
-        )
+            total_size = sum(job.size for job in jobs)
+            tqdm.write(f"開始複製 {description}: 共 {len(jobs)} 個檔案, {self.format_size(total_size)} (小檔執行緒: {max_workers})")
 
-        success = True
+            own_progress = progress is None
+            if own_progress:
+                progress = TransferProgress({description: total_size}, desc=f"複製{description}")
 
-        # 定義單檔複製函式 (內部)
-        def copy_single(src_path: str):
-            nonlocal success
+            engine = CopyEngine(small_per_device=max_workers, hash_algo=self.hash_algo)
+            progress.start(description)
             try:
-                rel_path = os.path.relpath(src_path, source)
-                dest_path = os.path.join(destination, rel_path)
-                dest_dir = os.path.dirname(dest_path)
-                os.makedirs(dest_dir, exist_ok=True)
-                shutil.copy2(src_path, dest_path)
-            except Exception as e:
-                print(f"✗ 複製檔案失敗: {src_path} → {dest_path}. 錯誤: {str(e)}")
-                success = False
+                stats = engine.run(jobs, on_progress=progress.callback(description), on_copied=manifest.record)
             finally:
-                progress_bar.update(1)
+                progress.finish(description)
+                if own_progress:
+                    progress.close()
+        finally:
+            if own_manifest:
+                manifest.close()
 
-        # 使用 ThreadPoolExecutor 進行多執行緒複製
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            list(executor.map(copy_single, file_list))
+        if own_progress:
+            self.print_throughput([(description, stats.bytes, stats.seconds)])
 
-        progress_bar.close()
-        return success
+        for job, error in stats.failed:
+            tqdm.write(f"✗ 複製檔案失敗: {job.src} → {job.dest}. 錯誤: {str(error)}")
+        methods = ", ".join(f"{name} ×{count}" for name, count in sorted(stats.methods.items()))
+        tqdm.write(f"{description} 複製方式: {methods or '-'}")
+        return not stats.failed
     
-    def copy_h_drive_content(self, jpg_folder, mp4_folder):
-        """複製H:磁碟機的內容 (使用 Python 原生複製)"""
-        print("\n--- 開始複製 H: 磁碟機內容 ---")
-
-        # Copy DCIM content to JPG folder
-        h_dcim = os.path.join(self.h_drive, "DCIM")
-        if os.path.exists(h_dcim):
-            success1 = self.fast_copy_with_python(h_dcim, jpg_folder, "JPEG照片")
-        else:
-            print(f"H: DCIM 資料夾不存在: {h_dcim}")
-            success1 = False
-
-        print()  # Add blank line between operations
-
-        # Copy M4ROOT/CLIP content to MP4 folder
-        h_clip = os.path.join(self.h_drive, "M4ROOT", "CLIP")
-        if os.path.exists(h_clip):
-            success2 = self.fast_copy_with_python(h_clip, mp4_folder, "MP4影片")
-        else:
-            print(f"H: M4ROOT/CLIP 資料夾不存在: {h_clip}")
-            success2 = False
-
-        return success1, success2
+    def print_throughput(self, items):
+        """印出傳輸速度: items 為 (標籤, 位元組, 秒數)"""
+        print("\n=== 傳輸速度 ===")
+        for label, done, seconds in items:
+            if done == 0:
+                continue
+            rate = done / seconds if seconds > 0 else 0.0
+            print(f"{label}: {self.format_size(done)} / {seconds:.1f}s = {format_rate(rate)}")
     
-    def copy_i_drive_content(self, raw_folder):
-        """複製I:磁碟機的內容 (使用 Python 原生複製)"""
-        print("\n--- 開始複製 I: 磁碟機內容 ---")
-
-        i_dcim = os.path.join(self.i_drive, "DCIM")
-        if os.path.exists(i_dcim):
-            success = self.fast_copy_with_python(i_dcim, raw_folder, "RAW檔案")
-        else:
-            print(f"I: DCIM 資料夾不存在: {i_dcim}")
-            success = False
-
-        return success
+    def print_plan(self, scans):
+        """印出掃描結果 (複製開始前)"""
+        total_files = sum(len(jobs) for jobs in scans.values())
+        total_size = sum(job.size for jobs in scans.values() for job in jobs)
+        for label, jobs in scans.items():
+            print(f"{label}: {len(jobs)} 個檔案, {self.format_size(sum(job.size for job in jobs))}")
+        print(f"共 {total_files} 個檔案, {self.format_size(total_size)}")
     
     def run(self):
-        """執行主要複製流程"""
+        """執行主要複製流程 (各存儲卡同時複製)"""
         print("=== Sony Camera Auto Fast Copy Script ===")
         print("檢查相機存儲卡...")
         
-        h_exists, i_exists = self.check_drives_exist()
+        sources = self.get_sources()
+        cards = self.check_drives_exist(sources)
+        names = {source.card: source.card_name for source in sources}
         
-        if not h_exists and not i_exists:
-            print("\n❌ 未偵測到H:或I:磁碟機，請確認相機存儲卡已正確連接")
+        if not any(cards.values()):
+            print(f"\n❌ 未偵測到{'或'.join(names.values())}磁碟機，請確認相機存儲卡已正確連接")
             return False
             
-        if not h_exists:
-            print("\n⚠️  未偵測到H:磁碟機 (JPEG/影片)")
-            
-        if not i_exists:
-            print("\n⚠️  未偵測到I:磁碟機 (RAW)")
+        for card, exists in cards.items():
+            if not exists:
+                labels = "/".join(source.label for source in sources if source.card == card)
+                print(f"\n⚠️  未偵測到{names[card]}磁碟機 ({labels})")
+        sources = [source for source in sources if cards[source.card]]
             
         # Get folder name from user
         folder_name = self.get_folder_name()
         
         # Create destination folders
         print(f"\n建立目標資料夾: {folder_name}")
-        jpg_folder, mp4_folder, raw_folder = self.create_destination_folders(folder_name)
+        base_folder = self.create_destination_folders(folder_name, sources)
+        
+        # 每個裝置一條管線同時複製，合併顯示進度與 ETA
+        print()
+        # 已完成的檔案記錄在 manifest，重跑時略過相同檔案
+        # 匯入索引記錄過的檔案 (先前的拍攝) 依 known_files 略過或連結
+        index = IngestIndex(self.index_path) if self.index_path is not None else None
+        try:
+            with OffloadManifest(base_folder, self.hash_algo) as manifest:
+                report = run_offload(
+                    sources,
+                    base_folder,
+                    engine_factory=lambda: CopyEngine(small_per_device=self.max_workers, hash_algo=self.hash_algo),
+                    on_plan=self.print_plan,
+                    manifest=manifest,
+                    check_hash=self.check_hash,
+                    index=index,
+                    known=self.known_files,
+                )
+        finally:
+            if index is not None:
+                index.close()
         
-        # Copy files
         copy_results = []
+        throughput = []
+        for source in sources:
+            stats = report.results[source.label]
+            if stats is None:
+                print(f"來源資料夾不存在: {source.path}")
+                copy_results.append(False)
+                continue
+            if report.skipped[source.label]:
+                print(f"{source.label}: 略過 {report.skipped[source.label]} 個已完成的檔案")
+            if report.known[source.label]:
+                print(f"{source.label}: 略過 {report.known[source.label]} 個先前已匯入的檔案")
+            if report.linked[source.label]:
+                print(f"{source.label}: 連結 {report.linked[source.label]} 個先前已匯入的檔案 ({self.known_files})")
+            for job, error in stats.failed:
+                print(f"✗ 複製檔案失敗: {job.src} → {job.dest}. 錯誤: {str(error)}")
+            copy_results.append(not stats.failed)
+            throughput.append((source.label, stats.bytes, stats.seconds))
         
-        if h_exists:
-            jpg_success, mp4_success = self.copy_h_drive_content(jpg_folder, mp4_folder)
-            copy_results.extend([jpg_success, mp4_success])
-            
-        if i_exists:
-            raw_success = self.copy_i_drive_content(raw_folder)
-            copy_results.append(raw_success)
+        throughput += [(f"裝置 {item.label}", item.done, item.seconds) for item in report.devices]
+        throughput.append(("合計", report.overall.done, report.overall.seconds))
+        self.print_throughput(throughput)
             
         # Summary
         print("\n=== 複製完成總結 ===")
         
-        if h_exists:
-            print(f"H: DCIM → JPG: {'✓ 成功' if copy_results[0] else '✗ 失敗'}")
-            print(f"H: M4ROOT/CLIP → MP4: {'✓ 成功' if copy_results[1] else '✗ 失敗'}")
-            
-        if i_exists:
-            idx = 2 if h_exists else 0
-            print(f"I: DCIM → RAW: {'✓ 成功' if copy_results[idx] else '✗ 失敗'}")
+        for source, ok in zip(sources, copy_results):
+            print(f"{source.route}: {'✓ 成功' if ok else '✗ 失敗'}")
             
         all_success = all(copy_results)
         print(f"\n整體結果: {'✓ 全部成功' if all_success else '⚠️  部分失敗'}")
@@ -0,0 +1,150 @@
+"""srt_cues.py
+Shared subtitle data model used by every pipeline stage.
+
+A whole SRT file is parsed once into a :class:`CueTable` – integer
+millisecond ``starts``/``ends`` arrays plus a list of texts – and handed
+from stage to stage in memory.  Only the final result is serialized back
+to SRT text.
+
+Usage
+-----
+    table = read_srt(Path("fullvoicev23.srt"))
+    table.ends[:-1] = ...          # vectorized edits on the timing arrays
+    write_srt(Path("out.srt"), table)
+"""
+
+import itertools
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from instrumentation import log
+from timecodes import TIMING_SEPARATOR, format_timing_lines, parse_timing_lines
+
+
+class Cue(NamedTuple):
+    """A single subtitle block, times in milliseconds."""
+
+    id: str
+    start: int
+    end: int
+    text: str
+
+
+class CueTable:
+    """Column-oriented storage for a subtitle file.
+
+    ``starts``/``ends`` are ``int64`` NumPy arrays (ms), ``texts`` and ``ids``
+    are plain lists of the same length.  Cues are materialized as
+    :class:`Cue` tuples only when iterated.
+    """
+
+    __slots__ = ("ids", "starts", "ends", "texts")
+
+    def __init__(
+        self,
+        starts: Sequence[int],
+        ends: Sequence[int],
+        texts: Sequence[str],
+        ids: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.texts = list(texts)
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(1, len(self.texts) + 1)]
+        if not (len(self.starts) == len(self.ends) == len(self.texts) == len(self.ids)):
+            raise ValueError("CueTable columns must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, i: int) -> Cue:
+        return Cue(self.ids[i], int(self.starts[i]), int(self.ends[i]), self.texts[i])
+
+    def __iter__(self) -> Iterator[Cue]:
+        for cue_id, start, end, text in zip(self.ids, self.starts.tolist(), self.ends.tolist(), self.texts):
+            yield Cue(cue_id, start, end, text)
+
+    def __repr__(self) -> str:
+        return f"CueTable({len(self)} cues)"
+
+    @classmethod
+    def from_cues(cls, cues: Iterable[Cue]) -> "CueTable":
+        ids: List[str] = []
+        starts: List[int] = []
+        ends: List[int] = []
+        texts: List[str] = []
+        for cue in cues:
+            ids.append(cue.id)
+            starts.append(cue.start)
+            ends.append(cue.end)
+            texts.append(cue.text)
+        return cls(starts, ends, texts, ids)
+
+    def copy(self) -> "CueTable":
+        return CueTable(self.starts.copy(), self.ends.copy(), self.texts, self.ids)
+
+    def renumbered(self) -> "CueTable":
+        """Return a copy whose ids are ``1..n``."""
+        return CueTable(self.starts, self.ends, self.texts)
+
+
+# -------------------------
+# Parse / serialize
+# -------------------------
+
+def iter_srt_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Lazily yield ``(id, timing_line, text)`` for each block of an SRT line stream.
+
+    Blocks are separated by blank lines.  Lines before the timing line other
+    than the index are ignored and a missing index yields an empty id.
+    Blocks without a timing line (stray notes, leftovers of hand edits)
+    cannot be represented as cues: unlike the old per-script
+    ``rebuild_srt_content``, which copied them through verbatim, they are
+    dropped with a warning.
+    """
+    block: List[str] = []
+    for raw in itertools.chain(lines, [""]):
+        line = raw.strip()
+        if line:
+            block.append(line)
+            continue
+        if not block:
+            continue
+        for t, candidate in enumerate(block):
+            if TIMING_SEPARATOR in candidate:
+                yield (block[t - 1] if t else ""), candidate, "\n".join(block[t + 1:])
+                break
+        else:
+            log.warning(f"Dropped SRT block without a timing line: {' / '.join(block)[:80]!r}")
+        block = []
+
+
+def parse_srt(content: str) -> CueTable:
+    """Parse SRT text into a :class:`CueTable` in a single pass over the lines."""
+    ids: List[str] = []
+    timings: List[str] = []
+    texts: List[str] = []
+    for cue_id, timing, text in iter_srt_blocks(content.splitlines()):
+        ids.append(cue_id)
+        timings.append(timing)
+        texts.append(text)
+    starts, ends = parse_timing_lines(timings)
+    return CueTable(starts, ends, texts, ids)
+
+
+def format_srt(table: CueTable, renumber: bool = False) -> str:
+    """Serialize *table* to SRT text.  ``renumber`` rewrites ids as ``1..n``."""
+    ids = range(1, len(table) + 1) if renumber else table.ids
+    timings = format_timing_lines(table.starts, table.ends)
+    blocks = [f"{cue_id}\n{timing}\n{text}" for cue_id, timing, text in zip(ids, timings, table.texts)]
+    return "\n\n".join(blocks) + "\n" if blocks else ""
+
+
+def read_srt(path: Path) -> CueTable:
+    return parse_srt(Path(path).read_text(encoding="utf-8"))
+
+
+def write_srt(path: Path, table: CueTable, renumber: bool = False) -> None:
+    Path(path).write_text(format_srt(table, renumber=renumber), encoding="utf-8")
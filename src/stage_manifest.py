@@ -0,0 +1,118 @@
+"""stage_manifest.py
+Per-stage fingerprints and cue-level memos for incremental pipeline runs.
+
+A manifest (``<stem>.manifest.json``) records, for every stage, a
+fingerprint of *input hash + stage parameters + code version* and the
+digest of the output it produced.  On a rerun a stage whose fingerprint
+and output are unchanged is skipped entirely.
+
+When a stage does have to run, its cue-level memo from the previous run
+lets it recompute only the cues whose input changed (see
+:func:`stream_pipeline.correct_terms` / :func:`stream_pipeline.llm_split`).
+Memos are only reused when their key (parameters + code) still matches.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def data_digest(value: Any) -> str:
+    """Stable digest of any JSON-serializable value."""
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def code_digest(module_names: Iterable[str]) -> str:
+    """Digest of the source files of the given (already imported) modules."""
+    h = hashlib.blake2b(digest_size=20)
+    for name in sorted(module_names):
+        source = getattr(sys.modules.get(name), "__file__", None)
+        h.update(name.encode("utf-8"))
+        if source:
+            h.update(Path(source).read_bytes())
+    return h.hexdigest()
+
+
+class CueMemo:
+    """Cue-level results of one stage: lookups hit the previous run's entries,
+    and everything used or computed in this run forms the next memo."""
+
+    def __init__(self, previous: Optional[Dict[str, Any]] = None) -> None:
+        self.previous = previous or {}
+        self.current: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.previous.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.current[key] = value
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self.current[key] = value
+
+
+def stage_fingerprint(input_digest: str, params: Dict[str, Any], code: str) -> str:
+    return data_digest({"input": input_digest, "params": params, "code": code})
+
+
+class StageManifest:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {"version": MANIFEST_VERSION, "stages": {}, "memo": {}}
+        if self.path.exists():
+            try:
+                loaded = json.loads(self.path.read_text(encoding="utf-8"))
+                if loaded.get("version") == MANIFEST_VERSION:
+                    self.data = loaded
+            except ValueError:
+                pass  # corrupt manifest – start over
+
+    def is_fresh(self, stage: str, fingerprint: str, output: Path) -> bool:
+        """True if *stage* last ran with *fingerprint* and *output* is untouched."""
+        entry = self.data["stages"].get(stage)
+        if not entry or entry["fingerprint"] != fingerprint or not Path(output).exists():
+            return False
+        return entry["output_digest"] == file_digest(output)
+
+    def record(self, stage: str, fingerprint: str, output: Path, **extra: Any) -> None:
+        self.data["stages"][stage] = {
+            "fingerprint": fingerprint,
+            "output": str(output),
+            "output_digest": file_digest(output),
+            **extra,
+        }
+
+    def stage_info(self, stage: str) -> Dict[str, Any]:
+        return self.data["stages"].get(stage, {})
+
+    def memo(self, stage: str, key: str) -> Dict[str, Any]:
+        """Previous cue memo of *stage*, or ``{}`` if it was built under another key."""
+        entry = self.data["memo"].get(stage)
+        return dict(entry["entries"]) if entry and entry["key"] == key else {}
+
+    def set_memo(self, stage: str, key: str, entries: Dict[str, Any]) -> None:
+        self.data["memo"][stage] = {"key": key, "entries": entries}
+
+    def save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -0,0 +1,206 @@
+"""stream_pipeline.py
+Lazily composed, generator-based subtitle stages.
+
+Every stage takes an iterator of :class:`~srt_cues.Cue` and yields cues,
+so stages chain without intermediate files and only a small window is
+held in memory at any time:
+
+    cues = read_srt_stream(raw_srt)
+    cues = normalize_text(cues)
+    cues = fix_timing_stream(cues, min_gap=0.5)
+    cues = correct_terms(cues, matcher)
+    cues = llm_split(cues, client)
+    write_srt_stream(cues, final_srt)
+
+Wrap any point of the chain in :func:`tee_srt` to also dump that stage's
+output for debugging.
+"""
+
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from llm_client import LLMClient
+from llm_split import LLM_MIN_CHARS, split_cue
+from srt_cues import Cue, CueTable, iter_srt_blocks
+from stage_manifest import CueMemo
+from term_matcher import TermMatcher
+from text_normalize import Normalizer
+from timecodes import format_timing_line, parse_timing_line
+from timing import fix_timing
+from word_align import WordTimeline
+
+# -------------------------
+# Source / sinks
+# -------------------------
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    for cue_id, timing, text in iter_srt_blocks(lines):
+        start, end = parse_timing_line(timing)
+        yield Cue(cue_id, start, end, text)
+
+
+def read_srt_stream(path: Path) -> Iterator[Cue]:
+    """Yield the cues of *path* while reading it line by line."""
+    with Path(path).open("r", encoding="utf-8") as f:
+        yield from iter_cues(f)
+
+
+class _SrtWriter:
+    def __init__(self, path: Path, renumber: bool) -> None:
+        self.f = Path(path).open("w", encoding="utf-8")
+        self.renumber = renumber
+        self.count = 0
+
+    def write(self, cue: Cue) -> None:
+        self.count += 1
+        cue_id = self.count if self.renumber else cue.id
+        sep = "\n" if self.count > 1 else ""
+        self.f.write(f"{sep}{cue_id}\n{format_timing_line(cue.start, cue.end)}\n{cue.text}\n")
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def write_srt_stream(cues: Iterable[Cue], path: Path, renumber: bool = False) -> int:
+    """Drain *cues* into *path*; returns the number of cues written."""
+    writer = _SrtWriter(path, renumber)
+    try:
+        for cue in cues:
+            writer.write(cue)
+    finally:
+        writer.close()
+    return writer.count
+
+
+def tee_srt(cues: Iterable[Cue], path: Path) -> Iterator[Cue]:
+    """Pass *cues* through unchanged while writing them to *path*."""
+    writer = _SrtWriter(path, renumber=False)
+    try:
+        for cue in cues:
+            writer.write(cue)
+            yield cue
+    finally:
+        writer.close()
+
+# -------------------------
+# Stages
+# -------------------------
+
+def normalize_text(cues: Iterable[Cue], normalizer: Optional[Normalizer] = None) -> Iterator[Cue]:
+    """Apply *normalizer* (default: strip ``,`` and ``、``) to every cue text."""
+    normalizer = normalizer or Normalizer()
+    for cue in cues:
+        yield cue._replace(text=normalizer(cue.text))
+
+
+def fix_timing_stream(
+    cues: Iterable[Cue],
+    min_gap: float = 0.5,
+    max_duration: Optional[float] = None,
+    min_duration: Optional[float] = None,
+    overlap_mode: Optional[str] = None,
+    window: int = 256,
+) -> Iterator[Cue]:
+    """Streaming :func:`timing.fix_timing`, identical results to the whole-file pass.
+
+    Cues are processed in windows of *window* plus one cue of lookahead;
+    the lookahead cue is re-processed as the head of the next window.
+    """
+    def run(batch: List[Cue]) -> CueTable:
+        return fix_timing(CueTable.from_cues(batch), min_gap, max_duration, min_duration, overlap_mode)
+
+    batch: List[Cue] = []
+    carried_start: Optional[int] = None  # start of the head cue as moved by the previous window
+    for cue in cues:
+        batch.append(cue)
+        if len(batch) <= window:
+            continue
+        fixed = run(batch)
+        if carried_start is not None:
+            fixed.starts[0] = carried_start
+        for k in range(len(batch) - 1):
+            yield fixed[k]
+        carried_start = int(fixed.starts[-1])
+        batch = batch[-1:]
+    if batch:
+        fixed = run(batch)
+        if carried_start is not None:
+            fixed.starts[0] = carried_start
+        yield from fixed
+
+
+def correct_terms(
+    cues: Iterable[Cue],
+    matcher: TermMatcher,
+    memo: Optional[CueMemo] = None,
+    changed: Optional[TermMatcher] = None,
+) -> Iterator[Cue]:
+    """Correct terminology; with *memo*, reuse the previous run's result for a
+    text unless it contains one of the *changed* glossary terms."""
+    for cue in cues:
+        if cue.text:
+            text = None
+            if memo is not None and (changed is None or not changed.find(cue.text)):
+                text = memo.get(cue.text)
+            if text is None:
+                text, _ = matcher.correct(cue.text)
+                if memo is not None:
+                    memo.put(cue.text, text)
+            cue = cue._replace(text=text)
+        yield cue
+
+
+def llm_split(
+    cues: Iterable[Cue],
+    client: LLMClient,
+    timeline: Optional[WordTimeline] = None,
+    min_chars: int = LLM_MIN_CHARS,
+    window: int = 64,
+    memo: Optional[CueMemo] = None,
+) -> Iterator[Cue]:
+    """Punctuate long cues through *client* and split them, *window* cues at a time.
+
+    With *memo*, a long cue identical (id, timing, text) to one of the
+    previous run reuses its split without contacting the LLM.
+    """
+    def memo_key(cue: Cue) -> str:
+        return f"{cue.id}|{cue.start}|{cue.end}|{cue.text}"
+
+    def flush(batch: List[Cue]) -> Iterator[Cue]:
+        texts = [cue.text.replace("\n", " ") for cue in batch]
+        reused = {}
+        if memo is not None:
+            for i, text in enumerate(texts):
+                if len(text) > min_chars:
+                    hit = memo.get(memo_key(batch[i]))
+                    if hit is not None:
+                        reused[i] = [Cue(*piece) for piece in hit]
+        long_idx = [i for i, text in enumerate(texts) if len(text) > min_chars and i not in reused]
+        punctuated = dict(zip(long_idx, client.punctuate_many([texts[i] for i in long_idx])))
+        if timeline is not None:
+            word_lo, word_hi = timeline.cue_ranges(
+                [cue.start for cue in batch], [cue.end for cue in batch]
+            )
+        for i, cue in enumerate(batch):
+            if i in reused:
+                yield from reused[i]
+                continue
+            if i not in punctuated:
+                yield cue
+                continue
+            if timeline is not None:
+                pieces = split_cue(cue, punctuated[i], timeline, int(word_lo[i]), int(word_hi[i]))
+            else:
+                pieces = split_cue(cue, punctuated[i])
+            if memo is not None:
+                memo.put(memo_key(cue), [list(piece) for piece in pieces])
+            yield from pieces
+
+    batch: List[Cue] = []
+    for cue in cues:
+        batch.append(cue)
+        if len(batch) >= window:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
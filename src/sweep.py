@@ -0,0 +1,292 @@
+"""sweep.py
+Parameter sweep over segmentation and timing settings on a cached transcript.
+
+Usage
+-----
+python sweep.py --audio 20250604_edited.wav \
+    --split-gap 0.2 0.3 0.5 --max-chars none 16 24 \
+    --min-gap 0.3 0.5 --llm-min-chars 12 16 20 --output sweep.json
+python sweep.py --transcript ~/.cache/subtitle_pipeline/transcripts/<key> ...
+
+Every combination of the grid is regrouped from the stored word arrays
+(:mod:`regroup`), normalized, run through the timing policies
+(:func:`timing.fix_timing`) and scored with subtitle metrics:
+
+- reading speed: content characters per second (median / p95, share of
+  cues above ``--target-cps``),
+- cue duration: mean / p5 / p95, share below ``--min-seconds`` and above
+  ``--max-seconds``,
+- line length: mean / p95 of the longest line, share of cues over
+  ``--line-chars`` that the LLM split will *not* see (length not above
+  ``--llm-min-chars``),
+- LLM load: share of cues that would be sent to the LLM.
+
+The score is the sum of the violation shares plus ``--llm-weight`` times
+the LLM share (lower is better).  Combinations sharing a regroup setting
+are evaluated together in one task of a process pool; each worker loads
+the transcript once.  The ranked results are written as JSON and the best
+ones printed.
+"""
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from llm_split import LLM_MIN_CHARS
+from regroup import DEFAULT_REGROUP, RegroupConfig, WordArrays
+from srt_cues import CueTable
+from text_normalize import Normalizer
+from timing import OVERLAP_MODES, fix_timing
+from transcript_store import DEFAULT_STORE_ROOT, StoredTranscript, TranscriptStore, transcript_key
+from word_align import content_length
+
+REPORT_VERSION = 1
+
+
+class SweepPoint(NamedTuple):
+    split_gap: Optional[float]
+    max_chars: Optional[int]
+    max_cue_seconds: Optional[float]
+    min_gap: float
+    llm_min_chars: int
+
+    @property
+    def regroup(self) -> RegroupConfig:
+        return DEFAULT_REGROUP._replace(
+            max_gap=self.split_gap, max_chars=self.max_chars, max_duration=self.max_cue_seconds
+        )
+
+
+class Targets(NamedTuple):
+    cps: float = 9.0
+    line_chars: int = 16
+    min_seconds: float = 5 / 6
+    max_seconds: float = 7.0
+
+
+DEFAULT_TARGETS = Targets()
+
+
+def parameter_grid(
+    split_gaps: Sequence[Optional[float]],
+    max_chars: Sequence[Optional[int]],
+    max_cue_seconds: Sequence[Optional[float]],
+    min_gaps: Sequence[float],
+    llm_min_chars: Sequence[int],
+) -> List[SweepPoint]:
+    return [SweepPoint(*values) for values in itertools.product(split_gaps, max_chars, max_cue_seconds, min_gaps, llm_min_chars)]
+
+# -------------------------
+# Metrics
+# -------------------------
+
+class TextStats(NamedTuple):
+    """Per-cue text measures; independent of the timing settings."""
+    chars: np.ndarray       # content characters (no punctuation / spaces)
+    line_chars: np.ndarray  # longest line
+    llm_chars: np.ndarray   # length as compared against the LLM threshold
+
+
+def text_stats(texts: Sequence[str]) -> TextStats:
+    n = len(texts)
+    return TextStats(
+        np.fromiter((content_length(t) for t in texts), dtype=np.int64, count=n),
+        np.fromiter((max(map(len, t.split("\n"))) for t in texts), dtype=np.int64, count=n),
+        np.fromiter((len(t.replace("\n", " ")) for t in texts), dtype=np.int64, count=n),
+    )
+
+
+def _share(mask: np.ndarray) -> float:
+    return float(mask.mean()) if len(mask) else 0.0
+
+
+def _pct(values: np.ndarray, q: float) -> float:
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def subtitle_metrics(table: CueTable, stats: TextStats, targets: Targets, llm_min_chars: int) -> Dict[str, float]:
+    seconds = np.maximum(table.ends - table.starts, 1) / 1000
+    cps = stats.chars / seconds
+    to_llm = stats.llm_chars > llm_min_chars
+    return {
+        "cues": len(table),
+        "cps_median": _pct(cps, 50),
+        "cps_p95": _pct(cps, 95),
+        "cps_over": _share(cps > targets.cps),
+        "duration_mean": float(seconds.mean()) if len(seconds) else 0.0,
+        "duration_p5": _pct(seconds, 5),
+        "duration_p95": _pct(seconds, 95),
+        "too_short": _share(seconds < targets.min_seconds),
+        "too_long": _share(seconds > targets.max_seconds),
+        "line_chars_mean": float(stats.line_chars.mean()) if len(table) else 0.0,
+        "line_chars_p95": _pct(stats.line_chars, 95),
+        "line_over": _share((stats.line_chars > targets.line_chars) & ~to_llm),
+        "llm_share": _share(to_llm),
+    }
+
+
+def score(metrics: Dict[str, float], llm_weight: float = 0.25) -> float:
+    """Lower is better: violation shares plus the weighted LLM load."""
+    violations = metrics["cps_over"] + metrics["too_short"] + metrics["too_long"] + metrics["line_over"]
+    return violations + llm_weight * metrics["llm_share"]
+
+# -------------------------
+# Evaluation (process pool)
+# -------------------------
+
+_WORDS: Optional[WordArrays] = None
+
+
+def _init_worker(transcript_path: Path) -> None:
+    global _WORDS
+    stored = StoredTranscript(transcript_path)
+    try:
+        _WORDS = WordArrays.from_stored(stored)
+    finally:
+        stored.close()
+
+
+def _evaluate(
+    points: Sequence[SweepPoint],
+    timing: Dict[str, Any],
+    targets: Targets,
+    llm_weight: float,
+) -> List[Dict[str, Any]]:
+    """Score *points*, which all share one regroup setting."""
+    table = _WORDS.regroup(points[0].regroup)
+    normalize = Normalizer()
+    table.texts = [normalize(text) for text in table.texts]
+    stats = text_stats(table.texts)
+    rows = []
+    for point in points:
+        fixed = fix_timing(table.copy(), point.min_gap, **timing)
+        metrics = subtitle_metrics(fixed, stats, targets, point.llm_min_chars)
+        rows.append({**point._asdict(), "score": score(metrics, llm_weight), **metrics})
+    return rows
+
+
+def run_sweep(
+    transcript_path: Path,
+    points: Sequence[SweepPoint],
+    timing: Dict[str, Any],
+    targets: Targets = DEFAULT_TARGETS,
+    llm_weight: float = 0.25,
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Evaluate *points* on the stored transcript; returns rows ranked by score.
+
+    *timing* holds the fixed ``max_duration`` / ``min_duration`` /
+    ``overlap_mode`` policies applied after the swept ``min_gap``.
+    """
+    groups: Dict[RegroupConfig, List[SweepPoint]] = {}
+    for point in points:
+        groups.setdefault(point.regroup, []).append(point)
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(transcript_path,)) as pool:
+        futures = [pool.submit(_evaluate, group, timing, targets, llm_weight) for group in groups.values()]
+        rows = [row for fut in futures for row in fut.result()]
+    rows.sort(key=lambda row: (row["score"], row["llm_share"]))
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return rows
+
+
+def format_ranking(rows: Sequence[Dict[str, Any]], top: int = 10) -> str:
+    header = (
+        f"{'#':>3} {'score':>7} {'gap':>5} {'chars':>5} {'sec':>5} {'min_gap':>7} {'llm':>4} "
+        f"{'cues':>6} {'cps p95':>7} {'dur p5':>6} {'dur p95':>7} {'line p95':>8} {'llm %':>6}"
+    )
+    lines = [header]
+    for row in rows[:top]:
+        lines.append(
+            f"{row['rank']:>3} {row['score']:7.3f} {str(row['split_gap']):>5} {str(row['max_chars']):>5} "
+            f"{str(row['max_cue_seconds']):>5} {row['min_gap']:7.2f} {row['llm_min_chars']:>4} "
+            f"{row['cues']:>6} {row['cps_p95']:7.1f} {row['duration_p5']:6.2f} {row['duration_p95']:7.2f} "
+            f"{row['line_chars_p95']:8.1f} {row['llm_share'] * 100:6.1f}"
+        )
+    return "\n".join(lines)
+
+# -------------------------
+# Command-line interface
+# -------------------------
+
+def _optional(kind):
+    def parse(value: str):
+        return None if value.lower() == "none" else kind(value)
+    return parse
+
+
+def find_transcript(args: argparse.Namespace) -> Path:
+    """Store entry of ``--transcript`` or of ``--audio`` under the transcription settings."""
+    if args.transcript is not None:
+        return args.transcript.expanduser()
+    store = TranscriptStore(args.cache_dir)
+    # --overlap-stages always transcribes in chunks, like pipeline_all_in_one
+    key = transcript_key(
+        store, args.audio, args.initial_prompt, args.model_size, args.workers, args.chunk_seconds,
+        chunked=True if args.overlap_stages else None,
+    )
+    if not store.has(key):
+        raise SystemExit(f"No cached transcript for {args.audio}; run the pipeline on it once first")
+    return store.root / key
+
+
+def main() -> None:  # pragma: no cover
+    p = argparse.ArgumentParser(description="Sweep segmentation/timing parameters over a cached transcript")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--audio", type=Path, help="Audio file whose cached transcript is swept")
+    src.add_argument("--transcript", type=Path, help="Transcript store entry directory")
+    p.add_argument("--prompt", dest="initial_prompt", default="", help="Initial prompt the audio was transcribed with")
+    p.add_argument("--model", dest="model_size", default="large-v2", help="Model the audio was transcribed with")
+    p.add_argument("--cache-dir", type=Path, default=DEFAULT_STORE_ROOT, help="Transcript cache directory")
+    p.add_argument("--workers", type=int, default=1, help="--workers the audio was transcribed with")
+    p.add_argument("--chunk-seconds", type=float, default=600.0, help="--chunk-seconds the audio was transcribed with")
+    p.add_argument("--overlap-stages", action="store_true", help="The audio was transcribed with --overlap-stages")
+    # Grid
+    p.add_argument("--split-gap", type=_optional(float), nargs="+", default=[DEFAULT_REGROUP.max_gap], help="Regroup word gaps (sec, 'none' to disable)")
+    p.add_argument("--max-chars", type=_optional(int), nargs="+", default=[None], help="Regroup max characters per cue ('none' = no limit)")
+    p.add_argument("--max-cue-seconds", type=_optional(float), nargs="+", default=[None], help="Regroup max cue length (sec, 'none' = no limit)")
+    p.add_argument("--min-gap", type=float, nargs="+", default=[0.5], help="Timing fix minimum gap (sec)")
+    p.add_argument("--llm-min-chars", type=int, nargs="+", default=[LLM_MIN_CHARS], help="LLM split threshold (characters)")
+    # Fixed timing policies
+    p.add_argument("--max-duration", type=float, default=None, help="Maximum cue duration policy (sec)")
+    p.add_argument("--min-duration", type=float, default=None, help="Minimum display time policy (sec)")
+    p.add_argument("--overlap", dest="overlap_mode", choices=OVERLAP_MODES, default=None, help="Overlap resolution policy")
+    # Scoring
+    p.add_argument("--target-cps", type=float, default=DEFAULT_TARGETS.cps, help="Maximum comfortable characters per second")
+    p.add_argument("--line-chars", type=int, default=DEFAULT_TARGETS.line_chars, help="Maximum characters per line")
+    p.add_argument("--min-seconds", type=float, default=DEFAULT_TARGETS.min_seconds, help="Shortest comfortable cue (sec)")
+    p.add_argument("--max-seconds", type=float, default=DEFAULT_TARGETS.max_seconds, help="Longest comfortable cue (sec)")
+    p.add_argument("--llm-weight", type=float, default=0.25, help="Score weight of the share of cues sent to the LLM")
+    p.add_argument("--jobs", type=int, default=None, help="Evaluation processes (default: CPU count)")
+    p.add_argument("--top", type=int, default=10, help="Rows to print")
+    p.add_argument("--output", type=Path, default=Path("sweep.json"), help="Ranked JSON report")
+    args = p.parse_args()
+
+    transcript = find_transcript(args)
+    points = parameter_grid(args.split_gap, args.max_chars, args.max_cue_seconds, args.min_gap, args.llm_min_chars)
+    timing = {"max_duration": args.max_duration, "min_duration": args.min_duration, "overlap_mode": args.overlap_mode}
+    targets = Targets(args.target_cps, args.line_chars, args.min_seconds, args.max_seconds)
+    print(f"[Sweep] {len(points)} combinations over {transcript}")
+    rows = run_sweep(transcript, points, timing, targets, args.llm_weight, args.jobs)
+
+    report = {
+        "version": REPORT_VERSION,
+        "transcript": str(transcript),
+        "timing": timing,
+        "targets": targets._asdict(),
+        "llm_weight": args.llm_weight,
+        "results": rows,
+    }
+    args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(format_ranking(rows, args.top))
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""term_matcher.py
+Aho–Corasick terminology matcher.
+
+The wrong→correct dictionary is compiled once into an automaton; each cue
+is then corrected with a single linear scan, independent of dictionary
+size.  Overlapping entries are resolved leftmost-longest on the original
+text, so the result no longer depends on dictionary order and a
+replacement can never feed into another entry.
+"""
+
+from typing import Dict, List, Mapping, NamedTuple, Tuple
+
+
+class TermMatch(NamedTuple):
+    """One replacement, offsets refer to the *original* text."""
+
+    start: int
+    end: int
+    wrong: str
+    correct: str
+
+
+class TermMatcher:
+    """Compiled automaton over the keys of *replacements*."""
+
+    __slots__ = ("replacements", "_goto", "_fail", "_length", "_dict_link")
+
+    def __init__(self, replacements: Mapping[str, str]) -> None:
+        self.replacements: Dict[str, str] = {k: v for k, v in replacements.items() if k}
+        # Node 0 is the root.  _length[n] is the pattern length ending at n (0 = none),
+        # _dict_link[n] the nearest terminal node on n's failure chain.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._length: List[int] = [0]
+        for term in self.replacements:
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._length.append(0)
+                node = nxt
+            self._length[node] = len(term)
+
+        self._fail = [0] * len(self._goto)
+        self._dict_link = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:  # BFS; queue grows while iterating
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                fc = self._fail[child]
+                self._dict_link[child] = fc if self._length[fc] else self._dict_link[fc]
+
+    def __len__(self) -> int:
+        return len(self.replacements)
+
+    def find(self, text: str) -> List[TermMatch]:
+        """Return non-overlapping leftmost-longest matches in *text*."""
+        goto, fail, length, dict_link = self._goto, self._fail, self._length, self._dict_link
+        longest: Dict[int, int] = {}  # start offset -> longest match length
+        node = 0
+        for j, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            k = node if length[node] else dict_link[node]
+            while k:
+                start = j - length[k] + 1
+                if longest.get(start, 0) < length[k]:
+                    longest[start] = length[k]
+                k = dict_link[k]
+
+        matches: List[TermMatch] = []
+        pos = 0
+        for start in sorted(longest):
+            if start < pos:
+                continue
+            end = start + longest[start]
+            wrong = text[start:end]
+            matches.append(TermMatch(start, end, wrong, self.replacements[wrong]))
+            pos = end
+        return matches
+
+    def correct(self, text: str) -> Tuple[str, List[TermMatch]]:
+        """Apply all replacements in one pass; returns ``(corrected, matches)``."""
+        matches = self.find(text)
+        if not matches:
+            return text, matches
+        parts: List[str] = []
+        pos = 0
+        for m in matches:
+            parts.append(text[pos:m.start])
+            parts.append(m.correct)
+            pos = m.end
+        parts.append(text[pos:])
+        return "".join(parts), matches
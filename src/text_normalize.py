@@ -0,0 +1,127 @@
+"""text_normalize.py
+Single-pass cue text normalization on precompiled ``str.translate`` tables.
+
+A :class:`Normalizer` layers, in this order:
+
+1. width folding – full-width ASCII forms (``！``–``～``, ideographic space)
+   to half-width (``"half"``) or the reverse (``"full"``),
+2. character maps – e.g. Traditional → Simplified tables (see
+   :func:`load_char_map`; OpenCC's ``TSCharacters.txt`` / ``STCharacters.txt``
+   can be used as is),
+3. an explicit *mapping* of characters to replacement strings,
+4. whitespace folding – tabs, NBSP, the ideographic space etc. become ``" "``,
+5. *remove* – characters deleted outright (default ``,`` and ``、``).
+
+The layers are composed once into a single translate table, so a cue
+costs one ``str.translate`` call (plus a split/join per line when runs of
+spaces are collapsed) – no per-line regex and no chained ``str.replace``.
+Because the layers are composed, ``remove=","`` with ``width="half"`` also
+drops ``，``.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+WIDTH_MODES = ("none", "half", "full")
+DEFAULT_REMOVE = ",、"
+
+# Whitespace folded to a plain space (newlines separate cue lines and are kept)
+SPACE_CHARS = "\t\v\f\r\u00a0\u1680" + "".join(map(chr, range(0x2000, 0x200B))) + "\u202f\u205f\u3000"
+
+# -------------------------
+# Character tables
+# -------------------------
+
+def fullwidth_to_halfwidth() -> Dict[str, str]:
+    """``！``–``～`` → ``!``–``~`` and the ideographic space → ``" "``."""
+    table = {chr(c): chr(c - 0xFEE0) for c in range(0xFF01, 0xFF5F)}
+    table["\u3000"] = " "
+    return table
+
+
+def halfwidth_to_fullwidth() -> Dict[str, str]:
+    return {half: full for full, half in fullwidth_to_halfwidth().items()}
+
+
+def load_char_map(path: Path) -> Dict[str, str]:
+    """Read a one-character-per-key conversion table.
+
+    Each line is ``source<TAB>target`` where *target* may list several
+    space-separated candidates (OpenCC dictionary format); the first one
+    is used.  ``#`` starts a comment.
+    """
+    path = Path(path)
+    table: Dict[str, str] = {}
+    for lineno, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) != 2 or not parts[1].split():
+            raise ValueError(f"{path}:{lineno}: expected 'source<TAB>target', got {line!r}")
+        source = parts[0].strip()
+        if len(source) != 1:
+            raise ValueError(f"{path}:{lineno}: only single-character keys are supported, got {source!r}")
+        table[source] = parts[1].split()[0]
+    return table
+
+# -------------------------
+# Normalizer
+# -------------------------
+
+def _compose(layers: Sequence[Mapping[str, Optional[str]]]) -> Dict[int, Optional[str]]:
+    """Fold *layers* (applied in order) into one ``str.translate`` table."""
+    table: Dict[int, Optional[str]] = {}
+    for ch in {ch for layer in layers for ch in layer}:
+        out = ch
+        for layer in layers:
+            out = "".join(layer.get(c, c) or "" for c in out)
+        if out != ch:
+            table[ord(ch)] = out or None
+    return table
+
+
+class Normalizer:
+    def __init__(
+        self,
+        remove: str = DEFAULT_REMOVE,
+        mapping: Optional[Mapping[str, str]] = None,
+        width: str = "none",
+        char_maps: Iterable[Mapping[str, str]] = (),
+        collapse_whitespace: bool = False,
+    ) -> None:
+        if width not in WIDTH_MODES:
+            raise ValueError(f"width must be one of {WIDTH_MODES}, got {width!r}")
+        mapping = dict(mapping or {})
+        for source in mapping:
+            if len(source) != 1:
+                raise ValueError(f"mapping keys must be single characters, got {source!r}")
+        layers: List[Mapping[str, Optional[str]]] = []
+        if width == "half":
+            layers.append(fullwidth_to_halfwidth())
+        elif width == "full":
+            layers.append(halfwidth_to_fullwidth())
+        layers.extend(char_maps)
+        layers.append(mapping)
+        if collapse_whitespace:
+            layers.append(dict.fromkeys(SPACE_CHARS, " "))
+        layers.append(dict.fromkeys(remove))
+        self.table = _compose(layers)
+        self.collapse_whitespace = collapse_whitespace
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the compiled table, for stage fingerprints."""
+        payload = json.dumps([sorted(self.table.items()), self.collapse_whitespace], ensure_ascii=False)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def __call__(self, text: str) -> str:
+        text = text.translate(self.table)
+        if self.collapse_whitespace:
+            text = "\n".join(" ".join(line.split()) for line in text.split("\n"))
+        return text
+
+    def __len__(self) -> int:
+        return len(self.table)
@@ -0,0 +1,138 @@
+"""timecodes.py
+SRT timestamp codec working directly in integer milliseconds.
+
+``HH:MM:SS,mmm`` is decoded by plain integer arithmetic instead of
+``datetime.strptime``, so hours are not limited to a single day
+(``25:03:10,250`` is fine).  The bulk helpers convert a whole file's
+timing lines to/from NumPy ``int64`` arrays in one call by viewing the
+fixed-width ASCII lines as a byte matrix.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+TIMING_SEPARATOR = " --> "
+
+# Layout of a canonical "HH:MM:SS,mmm --> HH:MM:SS,mmm" line
+_TS_WIDTH = 12
+_LINE_WIDTH = 2 * _TS_WIDTH + len(TIMING_SEPARATOR)
+_END_OFFSET = _TS_WIDTH + len(TIMING_SEPARATOR)
+_DIGIT_COLS = (0, 1, 3, 4, 6, 7, 9, 10, 11)
+_ZERO = ord("0")
+
+
+# -------------------------
+# Scalar codec
+# -------------------------
+
+def parse_timestamp(ts: str) -> int:
+    """``HH:MM:SS,mmm`` (``.`` also accepted) -> integer milliseconds."""
+    hours, minutes, rest = ts.strip().split(":")
+    seconds, _, fraction = rest.replace(".", ",").partition(",")
+    # A fraction of a second, like strptime's %f: ",5" is 500 ms, ",05" is 50 ms
+    millis = int((fraction or "0").ljust(3, "0")[:3])
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + millis
+
+
+def format_timestamp(ms: int) -> str:
+    """Integer milliseconds -> ``HH:MM:SS,mmm``; negative times are clamped to 0."""
+    seconds, millis = divmod(max(int(ms), 0), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+def parse_timing_line(line: str) -> Tuple[int, int]:
+    """``start --> end [settings]`` -> ``(start_ms, end_ms)``."""
+    start, end = line.split(TIMING_SEPARATOR)[:2]
+    return parse_timestamp(start), parse_timestamp(end.split()[0])
+
+
+def format_timing_line(start: int, end: int) -> str:
+    return f"{format_timestamp(start)}{TIMING_SEPARATOR}{format_timestamp(end)}"
+
+
+# -------------------------
+# Bulk codec
+# -------------------------
+
+def _decode_columns(mat: np.ndarray, offset: int) -> np.ndarray:
+    d = mat[:, offset:offset + _TS_WIDTH].astype(np.int64) - _ZERO
+    hours = d[:, 0] * 10 + d[:, 1]
+    minutes = d[:, 3] * 10 + d[:, 4]
+    seconds = d[:, 6] * 10 + d[:, 7]
+    millis = d[:, 9] * 100 + d[:, 10] * 10 + d[:, 11]
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millis
+
+
+def _valid_rows(mat: np.ndarray) -> np.ndarray:
+    ok = np.ones(len(mat), dtype=bool)
+    for offset in (0, _END_OFFSET):
+        digits = mat[:, [offset + c for c in _DIGIT_COLS]]
+        ok &= ((digits >= _ZERO) & (digits <= _ZERO + 9)).all(axis=1)
+        ok &= mat[:, offset + 2] == ord(":")
+        ok &= mat[:, offset + 5] == ord(":")
+        ok &= (mat[:, offset + 8] == ord(",")) | (mat[:, offset + 8] == ord("."))
+    sep = np.frombuffer(TIMING_SEPARATOR.encode("ascii"), dtype=np.uint8)
+    ok &= (mat[:, _TS_WIDTH:_END_OFFSET] == sep).all(axis=1)
+    return ok
+
+
+def parse_timing_lines(lines: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode many timing lines at once into ``(starts, ends)`` int64 arrays.
+
+    Canonical fixed-width lines are decoded as one byte matrix; anything
+    else (3-digit hours, cue settings, stray spaces) falls back to
+    :func:`parse_timing_line` for that row only.
+    """
+    n = len(lines)
+    starts = np.empty(n, dtype=np.int64)
+    ends = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return starts, ends
+
+    fast = np.fromiter((len(line) == _LINE_WIDTH and line.isascii() for line in lines), dtype=bool, count=n)
+    fast_idx = np.flatnonzero(fast)
+    if len(fast_idx):
+        blob = "".join(lines[i] for i in fast_idx.tolist()).encode("ascii")
+        mat = np.frombuffer(blob, dtype=np.uint8).reshape(len(fast_idx), _LINE_WIDTH)
+        ok = _valid_rows(mat)
+        starts[fast_idx] = _decode_columns(mat, 0)
+        ends[fast_idx] = _decode_columns(mat, _END_OFFSET)
+        fast[fast_idx[~ok]] = False
+
+    for i in np.flatnonzero(~fast).tolist():
+        starts[i], ends[i] = parse_timing_line(lines[i])
+    return starts, ends
+
+
+def _encode_columns(mat: np.ndarray, offset: int, ms: np.ndarray) -> None:
+    seconds, millis = np.divmod(ms, 1000)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+    for col, value, width in ((0, hours, 2), (3, minutes, 2), (6, seconds, 2), (9, millis, 3)):
+        for k in range(width):
+            mat[:, offset + col + k] = (value // 10 ** (width - 1 - k)) % 10 + _ZERO
+    mat[:, offset + 2] = ord(":")
+    mat[:, offset + 5] = ord(":")
+    mat[:, offset + 8] = ord(",")
+
+
+def format_timing_lines(starts: Sequence[int], ends: Sequence[int]) -> List[str]:
+    """Encode ``(starts, ends)`` ms arrays into timing lines in one pass."""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    n = len(starts)
+    if n == 0:
+        return []
+    if max(int(starts.max()), int(ends.max())) >= 100 * 3600 * 1000 or min(int(starts.min()), int(ends.min())) < 0:
+        # Beyond two-digit hours (or negative) – use the scalar codec
+        return [format_timing_line(s, e) for s, e in zip(starts.tolist(), ends.tolist())]
+
+    mat = np.empty((n, _LINE_WIDTH), dtype=np.uint8)
+    _encode_columns(mat, 0, starts)
+    _encode_columns(mat, _END_OFFSET, ends)
+    mat[:, _TS_WIDTH:_END_OFFSET] = np.frombuffer(TIMING_SEPARATOR.encode("ascii"), dtype=np.uint8)
+    blob = mat.tobytes().decode("ascii")
+    return [blob[i:i + _LINE_WIDTH] for i in range(0, len(blob), _LINE_WIDTH)]
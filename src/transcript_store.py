@@ -0,0 +1,222 @@
+"""transcript_store.py
+Versioned, memory-mapped cache of raw transcription results.
+
+Replaces the single shared ``result1.pickle``.  Each entry is keyed by a
+hash of the audio *content* plus model, prompt and transcription options,
+so a transcript can never be reused for another file or configuration.
+
+An entry is a directory::
+
+    <root>/<key>/
+        meta.json       format version, model, options, language
+        words.npy       structured array: start, end, probability,
+                        segment, text_start, text_end (byte offsets)
+        segments.npy    structured array: start, end, word_lo, word_hi
+        text.bin        UTF-8 bytes of all words, sliced by the offsets
+
+The arrays are opened with ``mmap_mode="r"``, so loading is O(1) and
+segments / word texts are only materialized when accessed.  Entries are
+stored *before* any regrouping, i.e. what ``WhisperResult.reset()`` would
+restore.
+
+:func:`transcript_key` derives an entry's key from the pipeline's
+transcription settings; it lives here so tools that only read the cache
+(e.g. :mod:`sweep`) need not import the transcription pipeline.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from word_align import WordTimeline
+
+STORE_VERSION = 1
+DEFAULT_STORE_ROOT = Path.home() / ".cache" / "subtitle_pipeline" / "transcripts"
+
+# Options the pipeline transcribes with (regrouping is done later, from the cache)
+TRANSCRIBE_OPTIONS = {"regroup": False, "vad": False}
+
+WORD_DTYPE = np.dtype([
+    ("start", "f8"),
+    ("end", "f8"),
+    ("probability", "f4"),
+    ("segment", "i4"),
+    ("text_start", "i8"),
+    ("text_end", "i8"),
+])
+SEGMENT_DTYPE = np.dtype([("start", "f8"), ("end", "f8"), ("word_lo", "i8"), ("word_hi", "i8")])
+
+
+def audio_digest(audio_path: Path, chunk_size: int = 1 << 20) -> str:
+    """BLAKE2b of the audio file content."""
+    h = hashlib.blake2b(digest_size=20)
+    with Path(audio_path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class StoredTranscript:
+    """Read-only view over one store entry."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.words = np.load(self.path / "words.npy", mmap_mode="r")
+        self.segments = np.load(self.path / "segments.npy", mmap_mode="r")
+        self._text_file = (self.path / "text.bin").open("rb")
+        size = os.fstat(self._text_file.fileno()).st_size
+        self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self) -> None:
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+        self._text_file.close()
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @property
+    def language(self) -> Optional[str]:
+        return self.meta.get("language")
+
+    def word_text(self, i: int) -> str:
+        w = self.words[i]
+        return self._text[int(w["text_start"]):int(w["text_end"])].decode("utf-8")
+
+    def segment(self, i: int) -> Dict[str, Any]:
+        """Build segment *i* as a stable_whisper-compatible dict."""
+        seg = self.segments[i]
+        lo, hi = int(seg["word_lo"]), int(seg["word_hi"])
+        words = [
+            {
+                "word": self.word_text(k),
+                "start": float(self.words[k]["start"]),
+                "end": float(self.words[k]["end"]),
+                "probability": float(self.words[k]["probability"]),
+            }
+            for k in range(lo, hi)
+        ]
+        return {
+            "start": float(seg["start"]),
+            "end": float(seg["end"]),
+            "text": "".join(w["word"] for w in words),
+            "words": words,
+        }
+
+    def iter_segments(self):
+        for i in range(len(self)):
+            yield self.segment(i)
+
+    def timeline(self) -> WordTimeline:
+        """Word timestamps (ms) without building per-word objects."""
+        starts = np.rint(self.words["start"] * 1000).astype(np.int64)
+        ends = np.rint(self.words["end"] * 1000).astype(np.int64)
+        return WordTimeline(starts, ends, [self.word_text(k) for k in range(len(self.words))])
+
+    def to_whisper_result(self):
+        """Rebuild a ``stable_whisper.WhisperResult`` (unregrouped)."""
+        import stable_whisper  # type: ignore
+
+        return stable_whisper.WhisperResult({"language": self.language, "segments": list(self.iter_segments())})
+
+
+class TranscriptStore:
+    """Directory of :class:`StoredTranscript` entries."""
+
+    def __init__(self, root: Path = DEFAULT_STORE_ROOT) -> None:
+        self.root = Path(root)
+
+    def key(self, audio_path: Path, model: str, initial_prompt: str = "", **options: Any) -> str:
+        payload = json.dumps(
+            {
+                "version": STORE_VERSION,
+                "audio": audio_digest(audio_path),
+                "model": model,
+                "initial_prompt": initial_prompt,
+                "options": options,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def has(self, key: str) -> bool:
+        """True if entry *key* exists in the current format; reads only ``meta.json``."""
+        try:
+            meta = json.loads((self.root / key / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        return meta.get("version") == STORE_VERSION
+
+    def load(self, key: str) -> Optional[StoredTranscript]:
+        path = self.root / key
+        try:
+            stored = StoredTranscript(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if stored.meta.get("version") != STORE_VERSION:
+            stored.close()
+            return None
+        return stored
+
+    def save(self, key: str, result, meta: Optional[Dict[str, Any]] = None) -> StoredTranscript:
+        """Write *result* (a ``WhisperResult``) as entry *key* atomically."""
+        segments = result.segments
+        n_words = sum(len(seg.words) for seg in segments)
+        words = np.zeros(n_words, dtype=WORD_DTYPE)
+        segs = np.zeros(len(segments), dtype=SEGMENT_DTYPE)
+        text = bytearray()
+
+        k = 0
+        for i, seg in enumerate(segments):
+            segs[i] = (seg.start, seg.end, k, k + len(seg.words))
+            for w in seg.words:
+                encoded = w.word.encode("utf-8")
+                words[k] = (w.start, w.end, w.probability or 0.0, i, len(text), len(text) + len(encoded))
+                text += encoded
+                k += 1
+
+        info = dict(meta or {})
+        info.update({"version": STORE_VERSION, "key": key, "language": getattr(result, "language", None)})
+
+        final = self.root / key
+        tmp = self.root / f".{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "words.npy", words)
+        np.save(tmp / "segments.npy", segs)
+        (tmp / "text.bin").write_bytes(bytes(text))
+        (tmp / "meta.json").write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding="utf-8")
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+        return StoredTranscript(final)
+
+
+def key_options(workers: int, chunk_seconds: float, chunked: Optional[bool] = None) -> Dict[str, Any]:
+    """Transcription options that are part of the store key."""
+    # Chunking can change the transcript slightly, so it is part of the key
+    chunked = workers > 1 if chunked is None else chunked
+    return dict(TRANSCRIBE_OPTIONS, chunk_seconds=chunk_seconds) if chunked else dict(TRANSCRIBE_OPTIONS)
+
+
+def transcript_key(
+    store: TranscriptStore,
+    audio_path: Path,
+    initial_prompt: str = "",
+    model_size: str = "large-v2",
+    workers: int = 1,
+    chunk_seconds: float = 600.0,
+    chunked: Optional[bool] = None,
+) -> str:
+    """Store key of *audio_path* under the given transcription settings.
+
+    Transcripts are chunked when ``workers > 1`` unless *chunked* says otherwise.
+    """
+    return store.key(audio_path, model_size, initial_prompt, **key_options(workers, chunk_seconds, chunked))
@@ -0,0 +1,122 @@
+"""word_align.py
+Re-time LLM split segments from stable_whisper word timestamps.
+
+The transcription step saves every word's start/end next to the SRT
+(:meth:`WordTimeline.save`).  When the split stage cuts a cue into
+punctuated segments, each segment is mapped back to the words it came
+from through a character→word index, and gets those words' real
+start/end instead of an equal slice of the cue.
+
+Text is compared with punctuation and whitespace removed, so the commas
+dropped in step 2 and the punctuation added by the LLM do not shift the
+mapping.  If a cue's text no longer has the same length as its words
+(e.g. after terminology correction) character offsets are scaled
+proportionally.  Cue→word ranges for a whole file are found with one
+``searchsorted``, so alignment is linear in the file size.
+"""
+
+import json
+import unicodedata
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def _is_content_char(ch: str) -> bool:
+    return not (ch.isspace() or unicodedata.category(ch)[0] in "PZS")
+
+
+def content_length(text: str) -> int:
+    """Number of characters of *text* ignoring punctuation and whitespace."""
+    return sum(1 for ch in text if _is_content_char(ch))
+
+
+class WordTimeline:
+    """Word timestamps of a transcript: ``starts``/``ends`` in ms plus texts."""
+
+    __slots__ = ("starts", "ends", "words")
+
+    def __init__(self, starts: Sequence[int], ends: Sequence[int], words: Sequence[str]) -> None:
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.words = list(words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def from_result(cls, result) -> "WordTimeline":
+        """Collect the words of a stable_whisper ``WhisperResult``."""
+        words = result.all_words()
+        return cls(
+            [int(round(w.start * 1000)) for w in words],
+            [int(round(w.end * 1000)) for w in words],
+            [w.word for w in words],
+        )
+
+    def save(self, path: Path) -> None:
+        payload = {"starts": self.starts.tolist(), "ends": self.ends.tolist(), "words": self.words}
+        Path(path).write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "WordTimeline":
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(payload["starts"], payload["ends"], payload["words"])
+
+    def extend(self, other: "WordTimeline") -> None:
+        """Append the words of *other* (a later part of the same transcript)."""
+        self.starts = np.concatenate((self.starts, other.starts))
+        self.ends = np.concatenate((self.ends, other.ends))
+        self.words.extend(other.words)
+
+    def cue_ranges(self, cue_starts: np.ndarray, cue_ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Word index ranges ``[lo, hi)`` whose midpoints fall inside each cue."""
+        mids = (self.starts + self.ends) // 2
+        lo = np.searchsorted(mids, cue_starts, side="left")
+        hi = np.searchsorted(mids, cue_ends, side="left")
+        return lo, np.maximum(lo, hi)
+
+
+def uniform_times(start: int, end: int, n: int) -> List[Tuple[int, int]]:
+    """Equal slices of ``[start, end]`` – the fallback without word timings."""
+    step = (end - start) / n
+    return [
+        (start + int(step * i), start + int(step * (i + 1)) if i < n - 1 else end)
+        for i in range(n)
+    ]
+
+
+def align_segments(
+    segments: Sequence[str],
+    timeline: WordTimeline,
+    lo: int,
+    hi: int,
+    cue_start: int,
+    cue_end: int,
+) -> List[Tuple[int, int]]:
+    """Start/end (ms) for each of *segments* from words ``lo..hi`` of the cue."""
+    n = len(segments)
+    if n == 1:
+        return [(cue_start, cue_end)]
+    word_chars = np.fromiter((content_length(w) for w in timeline.words[lo:hi]), dtype=np.int64, count=hi - lo)
+    # char_to_word[c] = index of the word holding content character c
+    char_to_word = np.repeat(np.arange(lo, hi), word_chars)
+    seg_chars = np.fromiter((content_length(s) for s in segments), dtype=np.int64, count=n)
+    total_word_chars, total_seg_chars = len(char_to_word), int(seg_chars.sum())
+    if total_word_chars == 0 or total_seg_chars == 0:
+        return uniform_times(cue_start, cue_end, n)
+
+    scale = total_word_chars / total_seg_chars
+    offsets = np.concatenate(([0], np.cumsum(seg_chars)))
+    first = np.minimum((offsets[:-1] * scale).astype(np.int64), total_word_chars - 1)
+    last = np.clip(np.ceil(offsets[1:] * scale).astype(np.int64) - 1, first, total_word_chars - 1)
+
+    starts = timeline.starts[char_to_word[first]]
+    ends = timeline.ends[char_to_word[last]]
+    starts[0], ends[-1] = cue_start, cue_end
+    # Keep sub-cues ordered and inside the original cue
+    starts = np.clip(np.maximum.accumulate(starts), cue_start, cue_end)
+    ends = np.clip(np.maximum(ends, starts), cue_start, cue_end)
+    ends[:-1] = np.minimum(ends[:-1], starts[1:])
+    return list(zip(starts.tolist(), ends.tolist()))
@@ -0,0 +1,111 @@
+import importlib
+
+from checkpoint import CheckpointJournal
+from srt_cues import parse_srt
+from term_matcher import TermMatcher
+
+
+def journal_path(output):
+    return output.with_name(output.name + ".journal")
+
+
+def test_replay_after_torn_last_line(tmp_path):
+    output = tmp_path / "out.srt"
+    journal = CheckpointJournal(output, "key")
+    for i in range(3):
+        journal.append(i, f"text {i}")
+    journal.close()
+    # Crash in the middle of writing the fourth record
+    with journal_path(output).open("a", encoding="utf-8") as f:
+        f.write('[3, "tex')
+
+    journal = CheckpointJournal(output, "key")
+    assert journal.done == {0: "text 0", 1: "text 1", 2: "text 2"}
+    journal.append(3, "text 3")
+    journal.close()
+
+    # The torn record was cut, so the new one starts on its own line
+    assert CheckpointJournal(output, "key").done == {i: f"text {i}" for i in range(4)}
+
+
+def test_other_key_starts_over(tmp_path):
+    output = tmp_path / "out.srt"
+    journal = CheckpointJournal(output, "old")
+    journal.append(0, "x")
+    journal.close()
+    assert CheckpointJournal(output, "new").done == {}
+
+
+def test_snapshot_and_finish(tmp_path):
+    output = tmp_path / "out.srt"
+    journal = CheckpointJournal(output, "key", snapshot_seconds=0)
+    journal.append(0, "a")
+    journal.maybe_snapshot(lambda: "partial")
+    assert output.read_text(encoding="utf-8") == "partial"
+    journal.finish("final")
+    assert output.read_text(encoding="utf-8") == "final"
+    assert not journal_path(output).exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_terminology_resume_counts_replayed_corrections(tmp_path, monkeypatch, caplog):
+    stage = importlib.import_module("4_correct_terminology")
+    srt = "".join(f"{i + 1}\n00:00:0{i},000 --> 00:00:0{i},500\nabc abc\n\n" for i in range(6))
+    output = tmp_path / "fixed.srt"
+    matcher = TermMatcher({"abc": "ABC"})
+
+    calls = []
+    real = stage.apply_corrections
+
+    def interrupted(text, m):
+        calls.append(text)
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        return real(text, m)
+
+    monkeypatch.setattr(stage, "apply_corrections", interrupted)
+    try:
+        stage.process_srt_with_corrections(parse_srt(srt), matcher, str(output))
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(stage, "apply_corrections", real)
+
+    with caplog.at_level("INFO", logger="subtitle_pipeline"):
+        table = stage.process_srt_with_corrections(parse_srt(srt), matcher, str(output), renumber=True)
+    assert table.texts == ["ABC ABC"] * 6
+    assert "總共進行了 12 次修正" in caplog.text
+    assert output.read_text(encoding="utf-8").startswith("1\n00:00:00,000 --> 00:00:00,500\nABC ABC")
+    assert not journal_path(output).exists()
+
+
+def test_llm_split_snapshots_are_prefixes_of_the_output(tmp_path, monkeypatch):
+    from llm_client import LLMClient
+    from llm_stub_server import start_stub_server
+
+    stage = importlib.import_module("5_llm_split_subtitles")
+    snapshots = []
+
+    class EagerJournal(CheckpointJournal):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, snapshot_seconds=0, **kwargs)
+
+        def snapshot(self, content):
+            snapshots.append(content)
+            super().snapshot(content)
+
+    monkeypatch.setattr(stage, "CheckpointJournal", EagerJournal)
+    srt = "".join(
+        f"{i + 1}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\n{'字' * (30 if i % 3 else 5)}\n\n" for i in range(40)
+    )
+    server, url = start_stub_server()
+    try:
+        with LLMClient(url=url) as client:
+            reference = stage.process_srt_lines(srt, client=client, window=4)
+            output = stage.process_srt_lines(srt, client=client, output_filename=str(tmp_path / "out.srt"), window=4)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert output == reference
+    assert len(snapshots) > 1
+    assert all(output.startswith(snapshot) for snapshot in snapshots)
+    assert len(set(snapshots)) == len(snapshots)
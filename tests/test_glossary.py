@@ -0,0 +1,23 @@
+import pytest
+
+from glossary import GlossaryStore
+
+
+def test_later_layers_override(tmp_path):
+    base = tmp_path / "base.tsv"
+    base.write_text("a\tA\nb\tB\n", encoding="utf-8")
+    project = tmp_path / "glossary.json"
+    project.write_text('{"b": "BB"}', encoding="utf-8")
+    store = GlossaryStore([base, project], cache_dir=tmp_path / "cache")
+    assert store.mapping == {"a": "A", "b": "BB"}
+    assert store.matcher().correct("ab")[0] == "ABB"
+
+
+def test_deleted_layer_names_the_glossary(tmp_path):
+    path = tmp_path / "g.tsv"
+    path.write_text("a\tA\n", encoding="utf-8")
+    store = GlossaryStore([path], cache_dir=None)
+    store.matcher()
+    path.unlink()
+    with pytest.raises(ValueError, match="g.tsv"):
+        store.matcher()
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from llm_client import LLMClient, LLMError
+from llm_stub_server import fake_punctuate, start_stub_server
+
+TEXTS = [f"第{i}段字幕文字內容測試一二三四五" for i in range(10)]
+
+
+@pytest.fixture
+def stub(request):
+    kwargs = getattr(request, "param", {})
+    server, url = start_stub_server(**kwargs)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    return LLMClient(url=url, **kwargs)
+
+
+def _batch_sizes(server):
+    sizes = []
+    for body in server.requests:
+        try:
+            sizes.append(len(json.loads(body["messages"][-1]["content"])["texts"]))
+        except ValueError:
+            sizes.append(1)
+    return sizes
+
+
+def test_batches_preserve_order(stub):
+    server, url = stub
+    with _client(url, batch_size=4, max_workers=3) as client:
+        assert client.punctuate_many(TEXTS) == [fake_punctuate(t) for t in TEXTS]
+    assert sorted(_batch_sizes(server)) == [2, 4, 4]
+
+
+def test_batch_requests_use_json_schema(stub):
+    server, url = stub
+    with _client(url, batch_size=4) as client:
+        client.punctuate_many(TEXTS[:4])
+    (body,) = server.requests
+    assert body["response_format"]["type"] == "json_schema"
+    assert json.loads(body["messages"][-1]["content"]) == {"texts": TEXTS[:4]}
+
+
+def test_single_cue_is_sent_as_plain_text(stub):
+    server, url = stub
+    with _client(url) as client:
+        assert client.punctuate(TEXTS[0]) == fake_punctuate(TEXTS[0])
+    (body,) = server.requests
+    assert "response_format" not in body
+    assert body["messages"][-1]["content"] == TEXTS[0]
+
+
+@pytest.mark.parametrize("stub", [{"statuses": [503, 429]}], indirect=True)
+def test_retries_transient_errors(stub):
+    server, url = stub
+    with _client(url, max_retries=3) as client:
+        assert client.punctuate(TEXTS[0]) == fake_punctuate(TEXTS[0])
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize("stub", [{"statuses": [503, 503, 503]}], indirect=True)
+def test_gives_up_after_max_retries(stub):
+    server, url = stub
+    with _client(url, max_retries=3) as client:
+        with pytest.raises(LLMError):
+            client._chat(client.system_prompt, TEXTS[0])
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_fails_fast_on_client_errors(status):
+    server, url = start_stub_server(statuses=[status])
+    try:
+        with _client(url, max_retries=3) as client:
+            with pytest.raises(LLMError, match=str(status)):
+                client._chat(client.system_prompt, TEXTS[0])
+        assert len(server.requests) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_retries_connection_errors():
+    server, url = start_stub_server()
+    server.shutdown()
+    server.server_close()
+    with _client(url, max_retries=2, timeout=1) as client:
+        with pytest.raises(LLMError, match="after 2 attempts"):
+            client._chat(client.system_prompt, TEXTS[0])
+
+
+@pytest.mark.parametrize("stub", [{"malformed_batches": True}], indirect=True)
+def test_malformed_batch_falls_back_per_cue(stub):
+    server, url = stub
+    with _client(url, batch_size=4, max_workers=1) as client:
+        assert client.punctuate_many(TEXTS[:4]) == [fake_punctuate(t) for t in TEXTS[:4]]
+    assert _batch_sizes(server) == [4, 1, 1, 1, 1]
@@ -0,0 +1,39 @@
+import numpy as np
+
+from regroup import DEFAULT_REGROUP, RegroupConfig, WordArrays
+
+
+def test_regroup_empty_word_array():
+    table = WordArrays([], [], [], []).regroup()
+    assert len(table) == 0
+    assert table.starts.dtype == np.int64
+
+
+def test_regroup_empty_segments():
+    assert len(WordArrays.from_segments([{"start": 0.0, "end": 1.0, "words": []}]).regroup()) == 0
+
+
+def test_regroup_single_word():
+    table = WordArrays([1.2], [1.75], [0], [" hello"]).regroup(RegroupConfig(max_chars=1, max_duration=0.1))
+    assert table.starts.tolist() == [1200]
+    assert table.ends.tolist() == [1750]
+    assert table.texts == ["hello"]
+
+
+def test_gap_and_punctuation_breaks():
+    words = WordArrays(
+        [0.0, 0.5, 2.0, 2.4],
+        [0.4, 0.9, 2.3, 2.8],
+        [0, 0, 0, 0],
+        ["你好", "嗎？", "我", "很好"],
+    )
+    table = words.regroup(DEFAULT_REGROUP)
+    assert table.texts == ["你好嗎？", "我很好"]
+    assert table.starts.tolist() == [0, 2000]
+    assert table.ends.tolist() == [900, 2800]
+
+
+def test_max_chars_splits_greedily():
+    words = WordArrays([0.0, 0.1, 0.2, 0.3], [0.1, 0.2, 0.3, 0.4], [0, 0, 0, 0], ["ab", "cd", "ef", "gh"])
+    table = words.regroup(RegroupConfig(max_gap=None, punctuation=(), max_chars=4))
+    assert table.texts == ["abcd", "efgh"]
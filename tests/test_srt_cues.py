@@ -0,0 +1,34 @@
+import logging
+
+from srt_cues import format_srt, parse_srt
+
+SRT = (
+    "1\n00:00:01,000 --> 00:00:02,500\n第一行\n第二行\n\n"
+    "2\n00:00:03,000 --> 00:00:04,000\nhello\n"
+)
+
+
+def test_round_trip():
+    table = parse_srt(SRT)
+    assert table.ids == ["1", "2"]
+    assert table.starts.tolist() == [1000, 3000]
+    assert table.ends.tolist() == [2500, 4000]
+    assert table.texts == ["第一行\n第二行", "hello"]
+    assert format_srt(table) == SRT
+
+
+def test_renumber():
+    table = parse_srt(SRT.replace("1\n00:00:01", "7_1\n00:00:01"))
+    assert format_srt(table, renumber=True) == SRT
+
+
+def test_block_without_timing_line_is_dropped_with_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="subtitle_pipeline"):
+        table = parse_srt("NOTE from the editor\n\n" + SRT)
+    assert table.ids == ["1", "2"]
+    assert "NOTE from the editor" in caplog.text
+
+
+def test_cue_with_empty_text_is_kept():
+    table = parse_srt("1\n00:00:01,000 --> 00:00:02,000\n\n2\n00:00:03,000 --> 00:00:04,000\nx\n")
+    assert table.texts == ["", "x"]
@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from srt_cues import Cue, CueTable, format_srt
+from stream_pipeline import fix_timing_stream, iter_cues, write_srt_stream
+from timing import fix_timing
+
+POLICIES = [
+    {},
+    {"max_duration": 2.0},
+    {"min_duration": 1.2},
+    {"overlap_mode": "trim"},
+    {"overlap_mode": "midpoint", "min_duration": 1.0, "max_duration": 3.0},
+]
+
+
+def random_cues(n, seed):
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.integers(0, 2500, n)).tolist()
+    ends = [s + int(d) for s, d in zip(starts, rng.integers(1, 5000, n))]
+    return [Cue(str(i + 1), s, e, f"cue {i}") for i, (s, e) in enumerate(zip(starts, ends))]
+
+
+@pytest.mark.parametrize("window", [1, 2, 7, 64])
+@pytest.mark.parametrize("policy", POLICIES)
+def test_stream_matches_whole_file(window, policy):
+    cues = random_cues(300, window)
+    expected = list(fix_timing(CueTable.from_cues(cues), min_gap=0.5, **policy))
+    assert list(fix_timing_stream(iter(cues), min_gap=0.5, window=window, **policy)) == expected
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_stream_short_inputs(n):
+    cues = random_cues(n, 0)
+    assert list(fix_timing_stream(cues, window=4)) == list(fix_timing(CueTable.from_cues(cues)))
+
+
+def test_stream_is_lazy():
+    consumed = []
+
+    def source():
+        for cue in random_cues(1000, 1):
+            consumed.append(cue)
+            yield cue
+
+    stream = fix_timing_stream(source(), window=16)
+    next(stream)
+    assert len(consumed) <= 17
+
+
+def test_iter_cues_and_write_round_trip(tmp_path):
+    table = CueTable.from_cues(random_cues(20, 2))
+    content = format_srt(table)
+    out = tmp_path / "out.srt"
+    write_srt_stream(iter_cues(content.splitlines()), out)
+    assert out.read_text(encoding="utf-8") == content
+    assert list(itertools.islice(iter_cues(content.splitlines()), 3)) == list(table)[:3]
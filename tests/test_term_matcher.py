@@ -0,0 +1,71 @@
+import pickle
+import random
+
+import pytest
+
+from term_matcher import TermMatch, TermMatcher
+
+
+def reference_correct(text, replacements):
+    """Leftmost-longest by brute force: at each position take the longest key starting there."""
+    keys = sorted((k for k in replacements if k), key=len, reverse=True)
+    out, matches, i = [], [], 0
+    while i < len(text):
+        key = next((k for k in keys if text.startswith(k, i)), None)
+        if key is None:
+            out.append(text[i])
+            i += 1
+            continue
+        out.append(replacements[key])
+        matches.append(TermMatch(i, i + len(key), key, replacements[key]))
+        i += len(key)
+    return "".join(out), matches
+
+
+def test_longest_match_wins_regardless_of_order():
+    for mapping in ({"魔物": "X", "魔物獵人": "MH"}, {"魔物獵人": "MH", "魔物": "X"}):
+        assert TermMatcher(mapping).correct("玩魔物獵人和魔物")[0] == "玩MH和X"
+
+
+def test_leftmost_match_wins_over_longer_later_overlap():
+    matcher = TermMatcher({"ab": "1", "bcd": "2"})
+    text, matches = matcher.correct("abcd")
+    assert text == "1cd"
+    assert matches == [TermMatch(0, 2, "ab", "1")]
+
+
+def test_suffix_patterns_found_through_failure_links():
+    matcher = TermMatcher({"she": "S", "he": "H", "hers": "R"})
+    assert matcher.correct("ushers")[0] == "uSrs"
+    assert matcher.correct("hershe")[0] == "RH"
+
+
+def test_replacements_do_not_cascade():
+    assert TermMatcher({"a": "b", "b": "c"}).correct("ab")[0] == "bc"
+
+
+def test_empty_keys_and_text():
+    matcher = TermMatcher({"": "x", "a": "A"})
+    assert len(matcher) == 1
+    assert matcher.correct("") == ("", [])
+    assert matcher.correct("bbb") == ("bbb", [])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force_reference(seed):
+    rng = random.Random(seed)
+    alphabet = "abc"
+    mapping = {
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))): str(i)
+        for i in range(rng.randint(1, 8))
+    }
+    matcher = TermMatcher(mapping)
+    for _ in range(50):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert matcher.correct(text) == reference_correct(text, matcher.replacements)
+
+
+def test_pickle_round_trip():
+    matcher = TermMatcher({"魔物": "X", "獵人": "Y"})
+    clone = pickle.loads(pickle.dumps(matcher))
+    assert clone.correct("魔物獵人") == matcher.correct("魔物獵人")
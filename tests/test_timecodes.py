@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from timecodes import (
+    format_timestamp,
+    format_timing_line,
+    format_timing_lines,
+    parse_timestamp,
+    parse_timing_line,
+    parse_timing_lines,
+)
+
+
+@pytest.mark.parametrize("ms", [0, 1, 999, 1000, 59_999, 3_599_999, 3_600_000, 25 * 3_600_000 + 190_250])
+def test_scalar_round_trip(ms):
+    assert parse_timestamp(format_timestamp(ms)) == ms
+
+
+def test_hours_beyond_one_day():
+    assert parse_timestamp("25:03:10,250") == ((25 * 60 + 3) * 60 + 10) * 1000 + 250
+
+
+@pytest.mark.parametrize(
+    "text, ms",
+    [
+        ("00:00:01,5", 1500),
+        ("00:00:01.5", 1500),
+        ("00:00:01,50", 1500),
+        ("00:00:01,05", 1050),
+        ("00:00:01,500", 1500),
+        ("00:00:01,5678", 1567),
+        ("00:00:01", 1000),
+    ],
+)
+def test_short_and_long_fractions(text, ms):
+    assert parse_timestamp(text) == ms
+
+
+def test_negative_times_are_clamped():
+    assert format_timestamp(-5) == "00:00:00,000"
+    assert format_timing_lines([-5], [10]) == ["00:00:00,000 --> 00:00:00,010"]
+
+
+def test_timing_line_with_cue_settings():
+    assert parse_timing_line("00:00:01,000 --> 00:00:02,500 align:start") == (1000, 2500)
+
+
+def test_bulk_matches_scalar():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 99 * 3_600_000, 500)
+    ends = starts + rng.integers(0, 10_000, 500)
+    lines = format_timing_lines(starts, ends)
+    assert lines == [format_timing_line(s, e) for s, e in zip(starts.tolist(), ends.tolist())]
+    # Mix in lines the fixed-width decoder must hand to the scalar parser
+    lines[3] = "100:00:00,000 --> 100:00:01,000"
+    lines[7] = lines[7].replace(",", ".")
+    lines[9] = lines[9] + " line:0"
+    parsed_starts, parsed_ends = parse_timing_lines(lines)
+    expected = [parse_timing_line(line) for line in lines]
+    assert parsed_starts.tolist() == [s for s, _ in expected]
+    assert parsed_ends.tolist() == [e for _, e in expected]
+
+
+def test_bulk_beyond_two_digit_hours():
+    assert format_timing_lines([100 * 3_600_000], [100 * 3_600_000 + 1]) == [
+        "100:00:00,000 --> 100:00:00,001"
+    ]
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from srt_cues import CueTable, format_srt, parse_srt
+from timing import close_gaps, enforce_min_duration, fix_timing, limit_duration, resolve_overlaps
+
+
+def baseline_fix_timing_gaps(content):
+    """The original 3_fix_timing_gaps.process_subtitles rule, kept as the reference."""
+    def parse_time(s):
+        return datetime.strptime(s, '%H:%M:%S,%f')
+
+    subtitles = content.split('\n\n')
+    for i in range(len(subtitles) - 1):
+        current_lines = subtitles[i].split('\n')
+        next_lines = subtitles[i + 1].split('\n')
+        if len(current_lines) < 3 or len(next_lines) < 3:
+            continue
+        current_end = current_lines[1].split(' --> ')[1]
+        next_start = next_lines[1].split(' --> ')[0]
+        if parse_time(next_start) - parse_time(current_end) < timedelta(seconds=0.5):
+            current_lines[1] = current_lines[1].split(' --> ')[0] + ' --> ' + next_start
+            subtitles[i] = '\n'.join(current_lines)
+    return '\n\n'.join(subtitles)
+
+
+def random_table(n, seed):
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.integers(0, 3000, n))
+    ends = starts + rng.integers(1, 4000, n)  # some cues run into the next one
+    return CueTable(starts, ends, [f"cue {i}" for i in range(n)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_close_gaps_matches_baseline(seed):
+    table = random_table(400, seed)
+    expected = baseline_fix_timing_gaps(format_srt(table))
+    assert format_srt(fix_timing(table.copy(), min_gap=0.5)) == expected
+
+
+def test_close_gaps_threshold_is_exclusive():
+    starts = np.array([0, 1500, 3000])
+    ends = np.array([1000, 2600, 4000])
+    # gap 500 ms stays, gap 400 ms is closed
+    assert close_gaps(starts, ends, 500).tolist() == [1000, 3000, 4000]
+
+
+def test_close_gaps_trims_overlaps_and_keeps_last_end():
+    starts = np.array([0, 800])
+    ends = np.array([1000, 2000])
+    assert close_gaps(starts, ends, 500).tolist() == [800, 2000]
+
+
+def test_resolve_overlaps_trim():
+    starts, ends = resolve_overlaps(np.array([0, 800, 2000]), np.array([1000, 1500, 2500]), "trim")
+    assert starts.tolist() == [0, 800, 2000]
+    assert ends.tolist() == [800, 1500, 2500]
+
+
+def test_resolve_overlaps_midpoint():
+    starts, ends = resolve_overlaps(np.array([0, 800, 2000]), np.array([1000, 1500, 2500]), "midpoint")
+    assert starts.tolist() == [0, 900, 2000]
+    assert ends.tolist() == [900, 1500, 2500]
+
+
+def test_resolve_overlaps_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        resolve_overlaps(np.array([0]), np.array([1]), "shift")
+
+
+def test_duration_policies():
+    starts = np.array([0, 1000, 9000])
+    ends = np.array([100, 8000, 9100])
+    assert limit_duration(starts, ends, 5000).tolist() == [100, 6000, 9100]
+    # Lengthened up to the next start, never past it, and never shortened
+    assert enforce_min_duration(starts, ends, 1500).tolist() == [1000, 8000, 10500]
+
+
+def test_fix_timing_round_trips_through_srt():
+    table = random_table(50, 7)
+    content = format_srt(fix_timing(table.copy(), min_gap=0.5))
+    assert format_srt(fix_timing(parse_srt(content), min_gap=0.5)) == content